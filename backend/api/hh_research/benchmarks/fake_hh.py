@@ -0,0 +1,350 @@
+"""Local stand-in for HH API serving synthetic vacancies.
+
+Serves `/vacancies`, `/vacancies/{id}` and `/areas` with configurable latency, error
+rate and page counts, so crawls can be measured without touching `api.hh.ru`.
+`/superjob/vacancies/` emulates SuperJob search: every second vacancy is the same as in HH,
+the rest are SuperJob-only.
+
+>> python -m api.hh_research.benchmarks.fake_hh --port 8081 --vacancies 10000 --latency 0.02
+>> HH_API_URL=http://127.0.0.1:8081 SUPERJOB_API_URL=http://127.0.0.1:8081/superjob SUPERJOB_APP_ID=test \
+>>     uvicorn main:app
+
+"""
+import argparse
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
+
+AREAS = [
+	{
+		"id": "113",
+		"parent_id": None,
+		"name": "Россия",
+		"areas": [
+			{"id": "1", "parent_id": "113", "name": "Москва", "areas": []},
+			{"id": "2", "parent_id": "113", "name": "Санкт-Петербург", "areas": []},
+			{
+				"id": "1620",
+				"parent_id": "113",
+				"name": "Свердловская область",
+				"areas": [{"id": "3", "parent_id": "1620", "name": "Екатеринбург", "areas": []}],
+			},
+			{
+				"id": "1624",
+				"parent_id": "113",
+				"name": "Новосибирская область",
+				"areas": [{"id": "4", "parent_id": "1624", "name": "Новосибирск", "areas": []}],
+			},
+		],
+	}
+]
+_CITIES = [("1", "Москва"), ("2", "Санкт-Петербург"), ("3", "Екатеринбург"), ("4", "Новосибирск")]
+_EXPERIENCE = [
+	("noExperience", "Нет опыта"),
+	("between1And3", "От 1 года до 3 лет"),
+	("between3And6", "От 3 до 6 лет"),
+	("moreThan6", "Более 6 лет"),
+]
+_SCHEDULE = [("fullDay", "Полный день"), ("remote", "Удаленная работа"), ("flexible", "Гибкий график")]
+_SKILLS = [
+	"Python", "SQL", "Django", "FastAPI", "PostgreSQL", "Docker", "Git", "Linux", "Redis", "Kafka",
+	"Pandas", "NumPy", "Machine Learning", "Kubernetes", "REST API", "asyncio", "Celery", "ClickHouse",
+]
+_WORDS = [
+	"python", "developer", "backend", "services", "team", "experience", "data", "api", "design", "testing",
+	"cloud", "product", "scalable", "pipelines", "architecture", "review", "microservices", "performance",
+]
+_NOW = datetime(2025, 6, 1, 12, 0, tzinfo=timezone(timedelta(hours=3)))
+
+
+def _vacancy_summary(rnd: random.Random) -> Dict:
+	# Fields of search result items, drawn first so that items match vacancy details
+	salary = None
+	if rnd.random() < 0.6:
+		currency = rnd.choices(["RUR", "USD", "EUR"], weights=[0.9, 0.07, 0.03])[0]
+		base = rnd.lognormvariate(math.log(150_000), 0.5)
+		if currency != "RUR":
+			base /= 90
+		salary_from = int(base) if rnd.random() < 0.8 else None
+		salary_to = int(base * rnd.uniform(1.1, 1.6)) if rnd.random() < 0.7 or salary_from is None else None
+		salary = {"from": salary_from, "to": salary_to, "currency": currency, "gross": rnd.random() < 0.5}
+
+	area_id, area_name = rnd.choice(_CITIES)
+	experience_id, experience_name = rnd.choice(_EXPERIENCE)
+	schedule_id, schedule_name = rnd.choice(_SCHEDULE)
+	published = _NOW - timedelta(minutes=rnd.randrange(180 * 24 * 60))
+	return {
+		"area": {"id": area_id, "name": area_name},
+		"salary": salary,
+		"experience": {"id": experience_id, "name": experience_name},
+		"schedule": {"id": schedule_id, "name": schedule_name},
+		"published_at": published.strftime("%Y-%m-%dT%H:%M:%S%z"),
+	}
+
+
+def make_search_item(vacancy_id: int, seed: int = 0) -> Dict:
+	"""Search result item of a vacancy (a subset of its details, as in HH API)."""
+	rnd = random.Random(vacancy_id * 1_000_003 + seed)
+	return {"id": str(vacancy_id), **_vacancy_summary(rnd)}
+
+
+def make_vacancy(vacancy_id: int, seed: int = 0) -> Dict:
+	"""Deterministic synthetic vacancy detail in HH API format."""
+	rnd = random.Random(vacancy_id * 1_000_003 + seed)
+	summary = _vacancy_summary(rnd)
+	paragraphs = "".join(
+		f"<p><strong>{rnd.choice(_WORDS).title()}</strong> &amp; {' '.join(rnd.choices(_WORDS, k=40))} &quot;</p>"
+		for _ in range(rnd.randint(3, 8))
+	)
+	return {
+		"id": str(vacancy_id),
+		"name": f"{rnd.choice(['Junior', 'Middle', 'Senior', 'Lead'])} Python Developer",
+		"employer": {"id": str(rnd.randrange(500)), "name": f"Employer {rnd.randrange(500)}"},
+		**summary,
+		"key_skills": [{"name": x} for x in rnd.sample(_SKILLS, rnd.randint(2, 8))],
+		"description": f"<div>{paragraphs}<ul><li>{rnd.choice(_SKILLS)}</li></ul></div>",
+	}
+
+
+def make_superjob_vacancy(vacancy_id: int, seed: int = 0) -> Dict:
+	"""SuperJob search item. Odd IDs repeat HH vacancies, even IDs are SuperJob-only."""
+	hh = make_vacancy(vacancy_id if vacancy_id % 2 else vacancy_id + 10_000_000, seed)
+	salary = hh["salary"] or {}
+	# SuperJob shows salaries after taxes
+	net = 0.87 if salary.get("gross") else 1
+	experience_ids = {"between1And3": 2, "between3And6": 3, "moreThan6": 4, "noExperience": 5}
+	return {
+		"id": vacancy_id,
+		"profession": hh["name"],
+		"firm_name": hh["employer"]["name"],
+		"payment_from": int((salary.get("from") or 0) * net),
+		"payment_to": int((salary.get("to") or 0) * net),
+		"currency": "rub" if salary.get("currency", "RUR") == "RUR" else salary["currency"].lower(),
+		"experience": {"id": experience_ids[hh["experience"]["id"]]},
+		"town": {"id": int(hh["area"]["id"]), "title": hh["area"]["name"]},
+		"vacancyRichText": hh["description"],
+		"date_published": int(datetime.strptime(hh["published_at"], "%Y-%m-%dT%H:%M:%S%z").timestamp()),
+	}
+
+
+def _subtree(area_id: str) -> Set[str]:
+	"""IDs of an area and all its descendants in `AREAS`."""
+	def walk(items: List[Dict], inside: bool) -> Set[str]:
+		found = set()
+		for item in items:
+			matched = inside or item["id"] == area_id
+			if matched:
+				found.add(item["id"])
+			found |= walk(item.get("areas") or [], matched)
+		return found
+
+	return walk(AREAS, False)
+
+
+class FakeHHServer:
+	r"""Threaded HTTP server emulating HH API.
+
+	Parameters
+	----------
+	vacancies : int
+		Number of vacancies found by any search query.
+	max_per_page : int
+		Upper bound for `per_page` (HH API allows up to 100).
+	depth_limit : int, optional
+		Max number of search results reachable through pagination (2000 for HH API).
+		Unlimited if not set.
+	filters : bool
+		Apply `area` (with its subtree) and `date_from` / `date_to` search params. Otherwise
+		every query finds all vacancies.
+	latency : float
+		Mean response delay in seconds.
+	jitter : float
+		Uniform random addition to the delay in seconds.
+	error_rate : float
+		Share of requests answered with `503` error.
+	seed : int
+		Seed of synthetic data.
+	host, port : str, int
+		Address to bind. Port 0 selects a free port.
+
+	"""
+
+	def __init__(
+			self,
+			vacancies: int = 1000,
+			max_per_page: int = 100,
+			depth_limit: Optional[int] = None,
+			filters: bool = False,
+			latency: float = 0.0,
+			jitter: float = 0.0,
+			error_rate: float = 0.0,
+			seed: int = 0,
+			host: str = "127.0.0.1",
+			port: int = 0,
+	):
+		self.vacancies = vacancies
+		self.max_per_page = max_per_page
+		self.depth_limit = depth_limit
+		self.filters = filters
+		self.latency = latency
+		self.jitter = jitter
+		self.error_rate = error_rate
+		self.seed = seed
+		self.requests_served = 0
+		self.bytes_sent = 0
+		self._counter_lock = threading.Lock()
+		self._summaries: Optional[List[Tuple[str, datetime]]] = None
+		self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+		self._httpd.daemon_threads = True
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def url(self) -> str:
+		host, port = self._httpd.server_address[:2]
+		return f"http://{host}:{port}"
+
+	def start(self) -> str:
+		self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+		self._thread.start()
+		return self.url
+
+	def serve_forever(self):
+		try:
+			self._httpd.serve_forever()
+		finally:
+			self._httpd.server_close()
+
+	def stop(self):
+		self._httpd.shutdown()
+		self._httpd.server_close()
+
+	def __enter__(self):
+		self.start()
+		return self
+
+	def __exit__(self, *exc):
+		self.stop()
+
+	def search(self, params: Dict) -> Dict:
+		per_page = min(int(params.get("per_page", 20)), self.max_per_page)
+		page = int(params.get("page", 0))
+		ids = self._filter(params) if self.filters else None
+		found = self.vacancies if ids is None else len(ids)
+		reachable = found if self.depth_limit is None else min(found, self.depth_limit)
+		start = page * per_page
+		stop = min(start + per_page, reachable)
+		return {
+			"items": [
+				make_search_item(x + 1 if ids is None else ids[x], self.seed) for x in range(start, stop)
+			],
+			"found": found,
+			"pages": math.ceil(reachable / per_page),
+			"page": page,
+			"per_page": per_page,
+		}
+
+	def _filter(self, params: Dict) -> Optional[List[int]]:
+		# IDs of vacancies matching `area` and `date_from` / `date_to`, None if not filtered
+		if not any(params.get(x) for x in ("area", "date_from", "date_to")):
+			return None
+		with self._counter_lock:
+			if self._summaries is None:
+				self._summaries = []
+				for vacancy_id in range(1, self.vacancies + 1):
+					item = make_search_item(vacancy_id, self.seed)
+					published = datetime.strptime(item["published_at"], "%Y-%m-%dT%H:%M:%S%z")
+					self._summaries.append((item["area"]["id"], published))
+		areas = _subtree(str(params["area"])) if params.get("area") else None
+		date_from = datetime.strptime(params["date_from"], "%Y-%m-%dT%H:%M:%S%z") if params.get("date_from") else None
+		date_to = datetime.strptime(params["date_to"], "%Y-%m-%dT%H:%M:%S%z") if params.get("date_to") else None
+		return [
+			idx + 1 for idx, (area_id, published) in enumerate(self._summaries)
+			if (areas is None or area_id in areas)
+			and (date_from is None or published >= date_from)
+			and (date_to is None or published <= date_to)
+		]
+
+	def superjob_search(self, params: Dict) -> Dict:
+		count = min(int(params.get("count", 20)), 100)
+		page = int(params.get("page", 0))
+		total = min(self.vacancies, 500)
+		start = page * count
+		stop = min(start + count, total)
+		return {
+			"objects": [make_superjob_vacancy(x + 1, self.seed) for x in range(start, stop)],
+			"total": self.vacancies,
+			"more": stop < total,
+		}
+
+	def route(self, path: str, params: Dict) -> Tuple[int, Dict]:
+		parts = [x for x in path.split("/") if x]
+		if parts == ["superjob", "vacancies"]:
+			return 200, self.superjob_search(params)
+		if parts == ["areas"]:
+			return 200, AREAS
+		if parts == ["vacancies"]:
+			return 200, self.search(params)
+		if len(parts) == 2 and parts[0] == "vacancies" and parts[1].isdigit():
+			vacancy_id = int(parts[1])
+			if 1 <= vacancy_id <= self.vacancies:
+				return 200, make_vacancy(vacancy_id, self.seed)
+		return 404, {"errors": [{"type": "not_found"}]}
+
+	def _make_handler(self):
+		server = self
+
+		class Handler(BaseHTTPRequestHandler):
+			protocol_version = "HTTP/1.1"
+
+			def do_GET(self):
+				delay = server.latency + random.uniform(0, server.jitter)
+				if delay > 0:
+					time.sleep(delay)
+				url = urlparse(self.path)
+				if server.error_rate and random.random() < server.error_rate:
+					code, payload = 503, {"errors": [{"type": "service_unavailable"}]}
+				else:
+					params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+					code, payload = server.route(url.path, params)
+				body = json.dumps(payload, ensure_ascii=False).encode()
+				self.send_response(code)
+				self.send_header("Content-Type", "application/json; charset=utf-8")
+				self.send_header("Content-Length", str(len(body)))
+				self.end_headers()
+				self.wfile.write(body)
+				with server._counter_lock:
+					server.requests_served += 1
+					server.bytes_sent += len(body)
+
+			def log_message(self, *args):
+				pass
+
+		return Handler
+
+
+if __name__ == "__main__":
+	parser = argparse.ArgumentParser(description="Fake HH API server with synthetic vacancies")
+	parser.add_argument("--host", type=str, default="127.0.0.1")
+	parser.add_argument("--port", type=int, default=8081)
+	parser.add_argument("--vacancies", type=int, default=1000, help="Number of vacancies found by a query")
+	parser.add_argument("--max_per_page", type=int, default=100, help="Upper bound for per_page")
+	parser.add_argument("--depth_limit", type=int, default=None, help="Max reachable search results (HH: 2000)")
+	parser.add_argument("--filters", action="store_true", help="Apply area and date_from/date_to search params")
+	parser.add_argument("--latency", type=float, default=0.0, help="Mean response delay, seconds")
+	parser.add_argument("--jitter", type=float, default=0.0, help="Random addition to the delay, seconds")
+	parser.add_argument("--error_rate", type=float, default=0.0, help="Share of 503 responses")
+	parser.add_argument("--seed", type=int, default=0)
+	args = parser.parse_args()
+
+	fake = FakeHHServer(**vars(args))
+	print(f"[INFO]: Fake HH API is running on {fake.url}")
+	try:
+		fake.serve_forever()
+	except KeyboardInterrupt:
+		pass
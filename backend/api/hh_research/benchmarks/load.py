@@ -0,0 +1,189 @@
+"""End-to-end load benchmark of `/get_statistics` against the fake HH API.
+
+Each (scenario, size) case runs in a fresh process with its own empty cache, so that
+peak RSS is measured per case:
+
+- cold: every call uses a new query, so the whole crawl is done each time;
+- warm: the same query is repeated, the dataset is served from cache;
+- refresh: the same query is repeated with `refresh=true`.
+
+Warm and refresh cases make one unmeasured priming call, it is included in the number
+of requests received by the fake API.
+
+Run from the `backend` directory:
+
+>> python -m api.hh_research.benchmarks.load --sizes 1000 10000 --save bench.json
+>> python -m api.hh_research.benchmarks.load --sizes 1000 10000 --baseline bench.json
+
+"""
+import argparse
+import json
+import math
+import multiprocessing as mp
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional
+
+from .fake_hh import FakeHHServer
+
+SCENARIOS = ("cold", "warm", "refresh")
+
+
+def percentile(values: List[float], q: float) -> float:
+	"""Nearest-rank percentile, `q` in [0, 100]."""
+	ordered = sorted(values)
+	rank = max(1, math.ceil(q / 100 * len(ordered)))
+	return ordered[rank - 1]
+
+
+def _free_port() -> int:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		return sock.getsockname()[1]
+
+
+def _run_case(scenario: str, repeat: int, params: Dict, results: mp.Queue):
+	"""Child process: start the API app and measure `/get_statistics` calls."""
+	try:
+		results.put(_measure(scenario, repeat, params))
+	except Exception:
+		results.put({"error": traceback.format_exc()})
+
+
+def _measure(scenario: str, repeat: int, params: Dict) -> Dict:
+	import requests
+	import uvicorn
+	from main import app
+
+	port = _free_port()
+	server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+	thread = threading.Thread(target=server.run, daemon=True)
+	thread.start()
+	while not server.started:
+		time.sleep(0.05)
+
+	url = f"http://127.0.0.1:{port}/get_statistics"
+
+	def call(text: str, refresh: bool = False) -> float:
+		start = time.perf_counter()
+		response = requests.get(url, params={**params, "text": text, "refresh": str(refresh).lower()})
+		elapsed = time.perf_counter() - start
+		response.raise_for_status()
+		return elapsed
+
+	if scenario != "cold":
+		call("bench")
+
+	latencies = []
+	for idx in range(repeat):
+		if scenario == "cold":
+			latencies.append(call(f"bench-{idx}"))
+		else:
+			latencies.append(call("bench", refresh=scenario == "refresh"))
+
+	server.should_exit = True
+	thread.join()
+	# ru_maxrss is in kilobytes on Linux
+	return {"latencies": latencies, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+
+
+def run_case(fake: FakeHHServer, scenario: str, size: int, repeat: int, params: Dict) -> Dict:
+	# The child process reads the settings from environment on import
+	os.environ["HH_API_URL"] = fake.url
+	os.environ["HH_CACHE_DIR"] = tempfile.mkdtemp(prefix="hh-bench-")
+
+	ctx = mp.get_context("spawn")
+	results = ctx.Queue()
+	served = fake.requests_served
+	proc = ctx.Process(target=_run_case, args=(scenario, repeat, params, results))
+	proc.start()
+	data = results.get()
+	proc.join()
+	if "error" in data:
+		raise RuntimeError(f"Benchmark case {scenario}/{size} failed:\n{data['error']}")
+
+	latencies = data["latencies"]
+	total = sum(latencies)
+	return {
+		"scenario": scenario,
+		"size": size,
+		"calls": len(latencies),
+		"calls_per_s": len(latencies) / total,
+		"vacancies_per_s": size * len(latencies) / total,
+		"p50_ms": percentile(latencies, 50) * 1000,
+		"p99_ms": percentile(latencies, 99) * 1000,
+		"peak_rss_mb": data["peak_rss_mb"],
+		"api_requests": fake.requests_served - served,
+	}
+
+
+def compare(results: List[Dict], baseline: List[Dict], tolerance: float) -> List[str]:
+	"""Return descriptions of cases which got slower or heavier than the baseline."""
+	previous = {(x["scenario"], x["size"]): x for x in baseline}
+	regressions = []
+	for res in results:
+		base = previous.get((res["scenario"], res["size"]))
+		if base is None:
+			continue
+		for metric in ("p50_ms", "p99_ms", "peak_rss_mb"):
+			if res[metric] > base[metric] * (1 + tolerance):
+				regressions.append(
+					f"{res['scenario']}/{res['size']}: {metric} {base[metric]:.1f} -> {res[metric]:.1f}"
+				)
+	return regressions
+
+
+def main(args: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description="Load benchmark of /get_statistics against the fake HH API")
+	parser.add_argument("--sizes", type=int, nargs="*", default=[1000, 10000, 100000], help="Vacancies per query")
+	parser.add_argument("--scenarios", nargs="*", default=list(SCENARIOS), choices=SCENARIOS)
+	parser.add_argument("--repeat", type=int, default=5, help="Measured calls per case")
+	parser.add_argument("--per_page", type=int, default=100)
+	parser.add_argument("--no_plots", action="store_true", help="Request statistics without plots")
+	parser.add_argument("--latency", type=float, default=0.0, help="Fake API response delay, seconds")
+	parser.add_argument("--jitter", type=float, default=0.0, help="Fake API random delay addition, seconds")
+	parser.add_argument("--error_rate", type=float, default=0.0, help="Share of fake API 503 responses")
+	parser.add_argument("--save", type=str, default=None, help="Save results to JSON file")
+	parser.add_argument("--baseline", type=str, default=None, help="Compare results with saved JSON file")
+	parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed relative regression")
+	opts = parser.parse_args(args)
+
+	params = {"area": "Москва", "per_page": opts.per_page}
+	# Plots are opt-in in the API, request them explicitly to keep results comparable
+	params["include_plots"] = "false" if opts.no_plots else "true"
+
+	results = []
+	print(f"{'scenario':<8} {'size':>7} {'calls':>5} {'calls/s':>8} {'vac/s':>10} "
+		  f"{'p50 ms':>9} {'p99 ms':>9} {'RSS MB':>7} {'API req':>8}")
+	for size in opts.sizes:
+		with FakeHHServer(
+				vacancies=size, latency=opts.latency, jitter=opts.jitter, error_rate=opts.error_rate
+		) as fake:
+			for scenario in opts.scenarios:
+				res = run_case(fake, scenario, size, opts.repeat, params)
+				results.append(res)
+				print(f"{res['scenario']:<8} {res['size']:>7} {res['calls']:>5} {res['calls_per_s']:>8.2f} "
+					  f"{res['vacancies_per_s']:>10.0f} {res['p50_ms']:>9.1f} {res['p99_ms']:>9.1f} "
+					  f"{res['peak_rss_mb']:>7.0f} {res['api_requests']:>8}", flush=True)
+
+	if opts.save:
+		with open(opts.save, "w") as f:
+			json.dump(results, f, indent=2)
+
+	if opts.baseline:
+		with open(opts.baseline) as f:
+			regressions = compare(results, json.load(f), opts.tolerance)
+		for line in regressions:
+			print(f"[FAIL]: Regression {line}")
+		return 1 if regressions else 0
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,96 @@
+"""Startup benchmark of the API app.
+
+Measures in fresh interpreters:
+
+- import time and peak RSS of `main` (the FastAPI app with the hh router);
+- time from launching uvicorn to the first successful `/status` response.
+
+Heavy modules which must be imported lazily (matplotlib, seaborn, sklearn, nltk...) are
+reported; `--check` exits with code 1 if any of them is loaded on startup.
+Run from the `backend` directory:
+
+>> python -m api.hh_research.benchmarks.startup --repeat 5 --check
+
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+HEAVY_MODULES = ("matplotlib", "seaborn", "sklearn", "scipy", "nltk", "pandas", "numpy")
+
+_IMPORT_PROBE = f"""
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({{
+	"seconds": elapsed,
+	"peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+	"heavy_modules": [x for x in {HEAVY_MODULES!r} if x in sys.modules],
+}}))
+"""
+
+
+def measure_import() -> Dict:
+	output = subprocess.run(
+		[sys.executable, "-c", _IMPORT_PROBE], capture_output=True, text=True, check=True, cwd=os.getcwd()
+	).stdout
+	return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_first_response(timeout: float = 60.0) -> float:
+	with socket.socket() as sock:
+		sock.bind(("127.0.0.1", 0))
+		port = sock.getsockname()[1]
+
+	start = time.perf_counter()
+	proc = subprocess.Popen(
+		[sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port), "--log-level",
+		 "warning"],
+		stdout=subprocess.DEVNULL,
+		stderr=subprocess.DEVNULL,
+	)
+	try:
+		while time.perf_counter() - start < timeout:
+			try:
+				with urllib.request.urlopen(f"http://127.0.0.1:{port}/status", timeout=1) as response:
+					if response.status == 200:
+						return time.perf_counter() - start
+			except OSError:
+				time.sleep(0.01)
+		raise TimeoutError("API did not answer /status")
+	finally:
+		proc.terminate()
+		proc.wait()
+
+
+def main(args: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description="Startup benchmark of the API app")
+	parser.add_argument("--repeat", type=int, default=5, help="Number of measured launches")
+	parser.add_argument("--check", action="store_true", help="Fail if heavy modules are imported on startup")
+	opts = parser.parse_args(args)
+
+	imports = [measure_import() for _ in range(opts.repeat)]
+	first_responses = [measure_first_response() for _ in range(opts.repeat)]
+	heavy = sorted({x for res in imports for x in res["heavy_modules"]})
+
+	print(f"import main         : {statistics.median(x['seconds'] for x in imports) * 1000:.0f} ms (median)")
+	print(f"peak RSS            : {statistics.median(x['peak_rss_mb'] for x in imports):.0f} MB (median)")
+	print(f"first /status answer: {statistics.median(first_responses) * 1000:.0f} ms (median)")
+	print(f"heavy modules       : {', '.join(heavy) or '-'}")
+
+	if opts.check and heavy:
+		print(f"[FAIL]: Heavy modules are imported on startup: {', '.join(heavy)}")
+		return 1
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main())
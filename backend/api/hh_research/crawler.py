@@ -0,0 +1,180 @@
+"""Batch crawler: refresh datasets of many queries outside of the API.
+
+Queries are read from a file, one per line: search text, optionally followed by a tab and an
+area, or a JSON object with the params of `/get_statistics` (`text`, `area`, `per_page`,
+`experience`, `age_from`, `age_to`, `key_skills`). Lines starting with `#` are skipped.
+
+Queries are sharded across worker processes, every process crawls its shard with its own pool
+of `num_workers` threads. Datasets are written to the same cache and vacancy store the API
+reads (`HH_CACHE_DIR`, `HH_CACHE_BACKEND`), so API requests of crawled queries are cache hits.
+Finished queries are appended to a checkpoint file, a rerun after an interruption skips them;
+the checkpoint is removed when all queries are done.
+
+Run from the `backend` directory:
+
+	python -m api.hh_research.crawler queries.txt --areas Москва Санкт-Петербург --processes 4
+
+"""
+import argparse
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.util import Finalize
+from typing import Dict, List, Optional, Sequence, Set
+
+from .researcher import ResearcherHH, build_options
+from .src.config import CACHE_BACKEND
+from .src.logs import setup_logging, stop_logging
+
+logger = logging.getLogger(f"{__package__}.crawler")
+
+_DEFAULTS = {"area": "Москва", "per_page": 50}
+
+
+def read_queries(path: str, areas: Sequence[str] = ()) -> List[Dict]:
+	"""Read queries from a file, queries without an area are repeated for every area of `areas`."""
+	queries = []
+	with open(path, encoding="utf-8") as f:
+		for line in f:
+			line = line.strip()
+			if not line or line.startswith("#"):
+				continue
+			if line.startswith("{"):
+				params = json.loads(line)
+			else:
+				text, _, area = line.partition("\t")
+				params = {"text": text.strip()}
+				if area.strip():
+					params["area"] = area.strip()
+			if "area" in params or not areas:
+				queries.append(params)
+			else:
+				queries.extend({**params, "area": area} for area in areas)
+	return queries
+
+
+def query_id(params: Dict, sources: Sequence[str]) -> str:
+	"""Checkpoint key of a query."""
+	return json.dumps({"params": params, "sources": list(sources)}, ensure_ascii=False, sort_keys=True)
+
+
+def read_checkpoint(path: str) -> Set[str]:
+	"""Keys of finished queries."""
+	if not os.path.exists(path):
+		return set()
+	done = set()
+	with open(path, "r+", encoding="utf-8") as f:
+		content = f.read()
+		for line in content.splitlines():
+			try:
+				record = json.loads(line)
+			except ValueError:
+				# A line cut off by an interruption
+				continue
+			done.add(record["query"])
+		if content and not content.endswith("\n"):
+			# New records start on a new line
+			f.write("\n")
+	return done
+
+
+def _init_worker():
+	setup_logging()
+	# Worker processes skip atexit handlers, queued records are written by a multiprocessing finalizer
+	Finalize(None, stop_logging, exitpriority=0)
+
+
+def crawl_shard(
+		queries: List[Dict], sources: Sequence[str], num_workers: int, full: bool, checkpoint: str
+) -> List[Dict]:
+	"""Crawl queries one by one in a worker process, every finished query is checkpointed.
+
+	Returns
+	-------
+	list of dict
+		`query`, `status` (done / failed), number of `vacancies`, `seconds` and `error` per query.
+
+	"""
+	results = []
+	for params in queries:
+		start = time.perf_counter()
+		result = {"query": query_id(params, sources)}
+		try:
+			options = build_options(**{**_DEFAULTS, **params})
+			hh_analyzer = ResearcherHH(options=options, refresh=True, num_workers=num_workers, sources=sources)
+			hh_analyzer.update()
+			# Only new vacancies are fetched unless `full`, as in background cache refresh
+			vacancies = hh_analyzer.collector.collect_vacancies(
+				query=options, refresh=True, num_workers=num_workers, incremental=not full
+			)
+			result.update(status="done", vacancies=len(vacancies["Ids"]))
+		except Exception as e:
+			logger.warning("Crawling of %s failed: %s", params, e)
+			result.update(status="failed", error=str(e))
+		result["seconds"] = round(time.perf_counter() - start, 3)
+		if result["status"] == "done":
+			# Appends of short lines are atomic, processes share one checkpoint file
+			with open(checkpoint, "a", encoding="utf-8") as f:
+				f.write(json.dumps(result, ensure_ascii=False) + "\n")
+		results.append(result)
+	return results
+
+
+def crawl(
+		queries: List[Dict],
+		sources: Sequence[str] = ("hh",),
+		processes: int = 1,
+		num_workers: int = 10,
+		full: bool = False,
+		checkpoint: Optional[str] = None,
+) -> List[Dict]:
+	"""Crawl queries in `processes` worker processes, skipping queries finished in the checkpoint."""
+	done = read_checkpoint(checkpoint) if checkpoint else set()
+	pending = [x for x in queries if query_id(x, sources) not in done]
+	if done:
+		logger.info("Resume from %s: %d of %d queries are done", checkpoint, len(queries) - len(pending), len(queries))
+	if not pending:
+		return []
+
+	processes = max(min(processes, len(pending)), 1)
+	shards = [pending[idx::processes] for idx in range(processes)]
+	with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker) as executor:
+		futures = [executor.submit(crawl_shard, x, sources, num_workers, full, checkpoint) for x in shards]
+		return [x for future in futures for x in future.result()]
+
+
+def main(args: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description="Batch crawler of vacancy datasets")
+	parser.add_argument("queries", type=str, help="File with queries: text[<TAB>area] or JSON per line")
+	parser.add_argument("--areas", nargs="*", default=(), help="Areas of queries without an area")
+	parser.add_argument("--sources", nargs="*", default=["hh"], help="Vacancy sources (hh, superjob)")
+	parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+	parser.add_argument("-n", "--num_workers", type=int, default=10, help="Threads per process")
+	parser.add_argument("--full", action="store_true", help="Refetch all vacancies, not only new ones")
+	parser.add_argument("--checkpoint", type=str, default=None, help="Checkpoint file (<queries>.checkpoint)")
+	params = parser.parse_args(args)
+
+	setup_logging()
+	if CACHE_BACKEND == "memory":
+		logger.warning("HH_CACHE_BACKEND=memory is not shared with the API, crawled datasets are lost on exit")
+	checkpoint = params.checkpoint or f"{params.queries}.checkpoint"
+	queries = read_queries(params.queries, params.areas)
+	start = time.perf_counter()
+	results = crawl(queries, params.sources, params.processes, params.num_workers, params.full, checkpoint)
+	failed = [x for x in results if x["status"] == "failed"]
+	logger.info(
+		"Crawled %d queries (%d vacancies) in %.1f s, failed: %d", len(results) - len(failed),
+		sum(x.get("vacancies", 0) for x in results), time.perf_counter() - start, len(failed),
+	)
+	if failed:
+		# Checkpoint is kept, a rerun retries failed queries only
+		return 1
+	if os.path.exists(checkpoint):
+		os.remove(checkpoint)
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
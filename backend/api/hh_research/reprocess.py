@@ -0,0 +1,98 @@
+"""Rebuild the vacancy store from the archive of raw responses without crawling.
+
+Vacancies are parsed again from the raw HH API responses archived by crawls (`HH_ARCHIVE_DIR`,
+see `src/archive.py`), so a new or changed field of `DataCollector.parse_vacancy` is applied to
+all known vacancies offline. Chunks of the archive are parsed in parallel by worker processes,
+only the latest archived response of every vacancy is used. Parsed vacancies are upserted into
+the store; query results and dataset versions are kept as they are.
+
+Run from the `backend` directory:
+
+	HH_ARCHIVE_DIR=/data/hh-archive python -m api.hh_research.reprocess --processes 8
+
+"""
+import argparse
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Mapping, Optional, Set, Tuple
+
+from .src.archive import RawArchive, iter_blocks
+from .src.config import ARCHIVE_DIR
+from .src.currency_exchange import RATES
+from .src.data_collector import DataCollector
+from .src.logs import setup_logging
+from .src.storage import STORE_PATH, VacancyStore
+
+logger = logging.getLogger(f"{__package__}.reprocess")
+
+
+def reprocess_chunk(path: str, latest: Set[Tuple[int, int]], rates: Mapping) -> Dict:
+	"""Parse the latest vacancy records of a chunk file, returns a dataset (see `DataCollector.parse_vacancies`)."""
+	collector = DataCollector(dict(rates))
+	vacancies = []
+	for offset, records in iter_blocks(path):
+		for position, record in enumerate(records):
+			if record["kind"] == "vacancy" and (offset, position) in latest:
+				vacancies.append(record["data"])
+	return collector.parse_vacancies(vacancies)
+
+
+def reprocess(
+		archive: RawArchive, store: VacancyStore, processes: int = 1, rates: Optional[Mapping] = None,
+) -> Dict:
+	"""Upsert vacancies of all chunks of the archive into the store, chunks are parsed in `processes` processes.
+
+	Returns
+	-------
+	dict
+		Numbers of `chunks` and `vacancies` and `seconds` spent.
+
+	"""
+	start = time.perf_counter()
+	rates = dict(rates or RATES.get())
+	latest = archive.latest("vacancy")
+	chunks = [x for x in archive.chunks() if x in latest]
+	summary = {"chunks": len(chunks), "vacancies": 0}
+	if chunks:
+		with ProcessPoolExecutor(max_workers=max(min(processes, len(chunks)), 1)) as executor:
+			futures = [
+				executor.submit(reprocess_chunk, os.path.join(archive.path, x), latest[x], rates) for x in chunks
+			]
+			# The store has one writer, parsed chunks are upserted as they are ready
+			for future in as_completed(futures):
+				dataset = future.result()
+				store.upsert(dataset)
+				summary["vacancies"] += len(dataset["Ids"])
+	summary["seconds"] = round(time.perf_counter() - start, 3)
+	return summary
+
+
+def main(args: Optional[List[str]] = None) -> int:
+	parser = argparse.ArgumentParser(description="Rebuild the vacancy store from the archive of raw responses")
+	parser.add_argument("--archive", type=str, default=ARCHIVE_DIR, help="Archive directory (HH_ARCHIVE_DIR)")
+	parser.add_argument("--store", type=str, default=STORE_PATH, help="Vacancy store (SQLite file)")
+	parser.add_argument("--processes", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+	params = parser.parse_args(args)
+
+	setup_logging()
+	if not params.archive or not os.path.isdir(params.archive):
+		logger.error("Archive directory is not found: %s", params.archive)
+		return 1
+	archive = RawArchive(params.archive)
+	store = VacancyStore(params.store)
+	try:
+		summary = reprocess(archive, store, params.processes)
+	finally:
+		store.close()
+		archive.close()
+	logger.info(
+		"Reprocessed %d vacancies of %d chunks in %.1f s", summary["vacancies"], summary["chunks"],
+		summary["seconds"], extra={"reprocess": summary},
+	)
+	return 0
+
+
+if __name__ == "__main__":
+	raise SystemExit(main())
@@ -1,4 +1,3 @@
-import json
 import base64
 import io
 # Authors       : Alexander Kapitanov
@@ -6,123 +5,198 @@ import io
 # Contacts      : <empty>
 # License       : GNU GENERAL PUBLIC LICENSE
 
+import copy
+import logging
 import os
-import numpy as np
-import matplotlib.pyplot as plt
-import seaborn as sns
-from typing import Optional, Dict, List, Union, Tuple, Any
-import numbers
+import queue
+import time
+from typing import Optional, Dict, Iterator, List, Tuple, Any, Sequence, TYPE_CHECKING
 
-from .src.analyzer import Analyzer
+from .src.aggregates import RunningStatistics
+from .src.analyzer import Analyzer, english_stop_words
+from .src.city_validator import find_city_id
 from .src.currency_exchange import Exchanger
 from .src.data_collector import DataCollector
+from .src.dedup import find_duplicates
+from .src.distribution import distribution
+from .src.logs import setup_logging
+from .src.metrics import stage
 from .src.parser import Settings
-from .src.predictor import Predictor
+from .src.plotting import pyplot, seaborn
+from .src.progress import CRAWLS
+from .src.sampling import estimate
+from .src.services import SERVICES, SearchQuery, Services
+
+# matplotlib, seaborn, numpy, pandas, sklearn и nltk загружаются при первом использовании,
+# чтобы импорт роутера (старт и перезапуск воркеров API) не тянул тяжелые модули
+if TYPE_CHECKING:
+	import matplotlib.pyplot as plt
+	from .src.predictor import Predictor
+
+# Имя не зависит от запуска модулем (__main__), логи идут через логгер пакета
+logger = logging.getLogger(f"{__package__}.researcher")
 
 CACHE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache")
 
 
-def _to_builtin_type(obj: Any) -> Any:
-	"""Рекурсивно преобразует numpy-типы к стандартным python-типам."""
-	if isinstance(obj, dict):
-		return {k: _to_builtin_type(v) for k, v in obj.items()}
-	elif isinstance(obj, (list, tuple)):
-		return [_to_builtin_type(v) for v in obj]
-	elif isinstance(obj, (np.integer, np.int_, np.intc, np.intp, np.int8, np.int16, np.int32, np.int64)):
-		return int(obj)
-	# Исправлено: np.float_ заменено на np.float64
-	elif isinstance(obj, (np.floating, np.float16, np.float32, np.float64)):
-		return float(obj)
-	elif isinstance(obj, np.ndarray):
-		return obj.tolist()
-	else:
-		return obj
+def build_options(
+		text: str,
+		area: str,
+		per_page: int,
+		experience: Optional[List[str]] = None,
+		age_from: Optional[int] = None,
+		age_to: Optional[int] = None,
+		key_skills: Optional[List[str]] = None,
+) -> Dict:
+	"""Подготовка параметров запроса к HH API для ResearcherHH. API и пакетный сборщик (`crawler.py`)
+	строят параметры одинаково, поэтому ключи наборов вакансий в кеше совпадают"""
+	with stage("area_lookup"):
+		area_id = find_city_id(area) or '1'
+	options = {
+		"text": text,
+		"area": area_id,
+		"per_page": per_page,
+		"professional_roles": [0]
+	}
+	
+	# Добавляем фильтры, если они указаны
+	if experience:
+		options["experience"] = experience
+	if age_from is not None or age_to is not None:
+		options["age"] = {
+			"from": age_from,
+			"to": age_to
+		}
+	if key_skills:
+		options["key_skills"] = key_skills
+	return options
 
 
 class ResearcherHH:
 	"""Main class for searching vacancies and analyze them."""
 	
 	def __init__(
-			self, options: dict, refresh: bool = True, num_workers: int = 10, save_result: bool = True,
-			rates: dict = {
-				"USD": 0.012641,
-				"EUR": 0.010831,
-				"UAH": 0.35902,
-				"RUR": 1  # Не меняйте на RUB, т.к. это не валюта, а код валюты
-			},
+			self, options: dict, refresh: bool = True, num_workers: int = 10, save_result: bool = False,
+			sources: Sequence[str] = ("hh",),
+			rates: Optional[Dict] = None,
+			services: Services = SERVICES,
 	):
-		self.settings = Settings(
-			options=options, refresh=refresh, num_workers=num_workers, save_result=save_result, rates=rates
+		"""Параметры запроса неизменяемы (`SearchQuery`), коллектор, анализатор, хранилище и модель
+		предсказания зарплат (создается при первом использовании) - общие сервисы процесса (`services`). Курсы валют `rates` (нулевые запрашиваются
+		с сервера) нужны только для своего коллектора, по умолчанию используются общие курсы."""
+		self.query = SearchQuery.create(
+			options, refresh=refresh, num_workers=num_workers, sources=sources, save_result=save_result
 		)
-		print(self.settings)
+		logger.debug("Query: %s", self.query)
 		
-		self.exchanger = Exchanger()
+		self.services = services
+		self.rates = rates
+		self.store = services.store
 		self.collector: Optional[DataCollector] = None
 		self.analyzer: Optional[Analyzer] = None
-		self.predictor = Predictor()
+		# Версия набора вакансий, по которой посчитана последняя статистика (см. `get_statistics`)
+		self.statistics_version: Optional[str] = None
+	
+	@property
+	def predictor(self) -> "Predictor":
+		# sklearn, scipy и nltk нужны только для предсказания зарплат
+		return self.services.predictor
 	
 	def update(self, **kwargs):
-		self.settings.update_params(**kwargs)
-		if not any(self.settings.rates.values()):
-			print("[INFO]: Trying to get exchange rates from remote server...")
-			self.exchanger.update_exchange_rates(self.settings.rates)
+		rates = kwargs.pop("rates", None)
+		if rates is not None:
+			self.rates = rates
+		params = {key: value for key, value in kwargs.items() if key in SearchQuery._fields and value is not None}
+		if params:
+			self.query = SearchQuery.create(**{**self.query._asdict(), **params})
 		
-		print(f"[INFO]: Get exchange rates: {self.settings.rates}")
-		self.collector = DataCollector(self.settings.rates)
-		self.analyzer = Analyzer(self.settings.save_result)
+		if self.rates is None:
+			with stage("rate_fetch"):
+				rates = self.services.rates.get()
+			self.collector = self.services.collector(self.query.sources)
+		else:
+			if not any(self.rates.values()):
+				logger.info("Trying to get exchange rates from remote server")
+				with stage("rate_fetch"):
+					self.rates = Exchanger().get_rates(self.rates)
+			rates = self.rates
+			self.collector = DataCollector(rates, store=self.store, sources=self.query.sources)
+		logger.debug("Get exchange rates: %s", dict(rates))
+		# Сохранение CSV - только для CLI, общий анализатор ничего не пишет на диск
+		self.analyzer = Analyzer(save_csv=True) if self.query.save_result else self.services.analyzer
 	
-	# def get_vacancies(self, limit: Optional[int] = 500, filters: Optional[dict] = None):
-	# 	"""Возвращает данные вакансий в формате dict (JSON) с ограничением по количеству и фильтрами."""
-	# 	print("[INFO]: Сбор данных для JSON...")
-	# 	vacancies = self.collector.collect_vacancies(
-	# 		query=self.settings.options,
-	# 		refresh=self.settings.refresh,
-	# 		num_workers=self.settings.num_workers,
-	# 		filters=filters,
-	# 		limit=limit
-	# 	)
-	# 	print("[INFO]: Подготовка DataFrame...")
-	# 	df = self.analyzer.prepare_df(vacancies)
-	# 	json_data = df.to_json(orient="records", force_ascii=False)
-	# 	print("[INFO]: Данные подготовлены в формате JSON.")
-	# 	return json.loads(json_data)
+	def record_request(self):
+		"""Учитывает запрос пользователя в популярности запросов (см. `src.warmer.CacheWarmer`)."""
+		self.store.record_request(
+			self.collector.dataset_key(self.query.options), self.query.options, self.query.sources
+		)
 	
-	def _generate_salary_plot(self, df) -> Tuple[plt.Figure, Dict[str, plt.Axes]]:
-		"""Создает и возвращает графики распределения зарплат From, To и Avg"""
-		fig, axs = plt.subplots(1, 3, figsize=(18, 5))
-		axes = {'from_hist': axs[0], 'to_hist': axs[1], 'avg_hist': axs[2]}
-		plt.suptitle("Salary Distribution")
-		
-		sns.histplot(df["From"].dropna() / 1000, bins=14, color="C0", kde=True, ax=axes['from_hist'])
-		axes['from_hist'].set_title("From: Distribution")
-		axes['from_hist'].grid(True)
-		axes['from_hist'].set_xlabel("Salary x 1000 [RUB]")
-		axes['from_hist'].set_xlim([-50, df["From"].max() / 1000])
-		axes['from_hist'].set_yticks([])
-		
-		sns.histplot(df["To"].dropna() / 1000, bins=14, color="C1", kde=True, ax=axes['to_hist'])
-		axes['to_hist'].set_title("To: Distribution")
-		axes['to_hist'].grid(True)
-		axes['to_hist'].set_xlim([-50, df["To"].max() / 1000])
-		axes['to_hist'].set_xlabel("Salary x 1000 [RUB]")
-		axes['to_hist'].set_yticks([])
-		
-		# Новый график: распределение средней зарплаты (avg)
-		avg_salary = df[["From", "To"]].dropna()
-		avg_salary = avg_salary.mean(axis=1) / 1000
-		sns.histplot(avg_salary, bins=14, color="C2", kde=True, ax=axes['avg_hist'])
-		axes['avg_hist'].set_title("Avg: Distribution")
-		axes['avg_hist'].grid(True)
-		axes['avg_hist'].set_xlabel("Salary x 1000 [RUB]")
-		if not avg_salary.empty:
-			axes['avg_hist'].set_xlim([-50, avg_salary.max()])
-		axes['avg_hist'].set_yticks([])
+	def warm(self):
+		"""Обновляет набор вакансий запроса в кеше, запрашивая подробности только новых вакансий."""
+		self.collector.collect_vacancies(
+			query=self.query.options, refresh=True, num_workers=self.query.num_workers, incremental=True
+		)
+	
+	def dataset_version(self) -> Optional[str]:
+		"""Версия набора вакансий запроса в кеше (время сбора) или None, если набора нет в кеше.
+		Устаревший набор обновляется в фоне (см. `DataCollector.dataset_version`)."""
+		return self.collector.dataset_version(self.query.options, self.query.num_workers)
+	
+	def iter_vacancies(self, **kwargs) -> Iterator[Dict]:
+		"""Возвращает итератор по вакансиям запроса из хранилища (см. `VacancyStore.iter_vacancies`).
+		Вакансии собираются, только если запрос еще не выполнялся или задан refresh. Набор из кеша,
+		собранный другим узлом, сначала сохраняется в хранилище."""
+		query_key = self.collector.dataset_key(self.query.options)
+		version = self.dataset_version()
+		if (
+			self.query.refresh or not self.store.has_query(query_key)
+			or (version is not None and version != self.store.dataset_version(query_key))
+		):
+			self.collector.collect_vacancies(
+				query=self.query.options, refresh=self.query.refresh, num_workers=self.query.num_workers
+			)
+		return self.store.iter_vacancies(query_key, **kwargs)
+	
+	def _store_aggregates(self, query_key: str, version: str, exclude: Dict) -> Optional[Tuple[int, Dict, Dict]]:
+		"""Количество вакансий, статистика по зарплатам и топ ключевых навыков из хранилища или None,
+		если версия набора в хранилище не `version` (до или после чтения агрегатов)"""
+		if self.store.dataset_version(query_key) != version:
+			return None
+		count = self.store.count(query_key, exclude=exclude)
+		salary_stats = self.store.salary_stats(query_key, exclude=exclude)
+		with stage("keyword_count"):
+			top_keywords = self.store.top_skills(query_key, top_n=20, exclude=exclude)
+		if self.store.dataset_version(query_key) != version:
+			return None
+		return count, salary_stats, top_keywords
+	
+	@staticmethod
+	def _frame_salary_stats(df) -> Dict:
+		"""Статистика по зарплатам в раскладке `VacancyStore.salary_stats`, посчитанная по DataFrame"""
+		def column_stats(values):
+			values = values.dropna()
+			if values.empty:
+				return dict.fromkeys(("min", "max", "mean", "median"))
+			return {name: int(getattr(values, name)()) for name in ("min", "max", "mean", "median")}
 		
-		plt.tight_layout()
-		return fig, axes
+		from_to = df[["From", "To"]].astype(float)
+		salary_stats = column_stats(from_to[df["Salary"].astype(bool)].mean(axis=1))
+		salary_stats["from_stats"] = column_stats(from_to["From"])
+		salary_stats["to_stats"] = column_stats(from_to["To"])
+		return salary_stats
 	
-	def _generate_salary_plots(self, df) -> Dict[str, plt.Figure]:
+	@staticmethod
+	def _salary_values(df) -> Dict[str, Any]:
+		"""Зарплаты From, To и средняя (по вакансиям, где указаны обе границы) для распределений"""
+		return {
+			"from_hist": df["From"].to_numpy(),
+			"to_hist": df["To"].to_numpy(),
+			"avg_hist": df[["From", "To"]].dropna().mean(axis=1).to_numpy(),
+		}
+	
+	def _generate_salary_plots(self, df) -> Dict[str, "plt.Figure"]:
 		"""Создает и возвращает отдельные графики распределения зарплат From, To и Avg"""
+		plt, sns = pyplot(), seaborn()
 		plots = {}
 		
 		# График распределения From
@@ -172,9 +246,18 @@ class ResearcherHH:
 			experience: Optional[List[str]] = None,
 			age: Optional[List[int]] = None,
 			key_skills: Optional[List[str]] = None,
+			dedup: bool = False,
+			dedup_threshold: float = 0.8,
+			bins: int = 14,
+			log_scale: bool = False,
+			plots: Optional[Sequence[str]] = None,
+			sample_size: Optional[int] = None,
+			confidence: float = 0.95,
+			time_budget: Optional[float] = None,
 	) -> Dict:
 		"""Собирает статистику по вакансиям и возвращает её в виде словаря.
-		При необходимости сохраняет графики в файлы.
+		Распределения зарплат возвращаются данными (гистограмма и KDE), графики
+		matplotlib строятся только по запросу.
 
 		Parameters
 		----------
@@ -182,32 +265,86 @@ class ResearcherHH:
 			Директория для сохранения графиков, по умолчанию используется 
 			директория кэша
 		save_plots : bool, optional
-			Флаг сохранения графиков, по умолчанию True
+			Флаг сохранения графиков в PNG, по умолчанию True (CLI). API передает False
 		include_base64 : bool, optional
 			Включить графики в формате base64 в ответ, по умолчанию False
 		limit : int, optional
 			Ограничение количества вакансий для анализа
+		dedup : bool, optional
+			Исключить из статистики почти одинаковые вакансии (совпадающие описания,
+			MinHash + LSH), по умолчанию False
+		dedup_threshold : float, optional
+			Порог сходства описаний (оценка коэффициента Жаккара), начиная с которого
+			вакансии считаются дубликатами
+		bins : int, optional
+			Количество интервалов гистограмм зарплат
+		log_scale : bool, optional
+			Гистограммы и KDE в логарифмической шкале
+		plots : sequence of str, optional
+			Требуемые распределения (from_hist, to_hist, avg_hist), по умолчанию все
+		sample_size : int, optional
+			Приближенный режим: подробности запрашиваются только для стратифицированной
+			случайной выборки такого размера, статистика оценивается с доверительными
+			интервалами (см. `_sampled_statistics`). Не совместим с dedup
+		confidence : float, optional
+			Уровень доверия интервалов приближенного режима
+		time_budget : float, optional
+			Ограничение времени сбора вакансий в секундах: если сбор не успевает, статистика
+			считается по уже полученным вакансиям, а сбор продолжается в фоне и дополняет кеш
 
 		Returns
 		-------
 		Dict
 			Словарь со статистикой, содержащий следующие ключи:
 			- vacancy_count: общее количество вакансий
+			- duplicate_count: количество исключенных дубликатов (если dedup=True)
+			- partial, coverage: признак неполного набора и доля полученных вакансий
+			  (fetched, expected, ratio), если сбор не уложился в time_budget
 			- salary_stats: статистика по зарплатам (min, max, mean, median)
 			- top_keywords: наиболее часто встречающиеся ключевые навыки
 			- top_description_words: наиболее часто встречающиеся слова в описаниях
+			- salary_distributions: гистограммы (bin_edges, counts) и KDE (x, density) зарплат
+			  From, To и Avg в рублях (см. `src.distribution.distribution`)
 			- plot_paths: пути к сохраненным графикам (если save_plots=True)
 			- plot_images: графики в формате base64 (если include_base64=True)
 		"""
-		print("[INFO]: Сбор вакансий для анализа...")
-		vacancies = self.collector.collect_vacancies(
-			query=self.settings.options,
-			refresh=self.settings.refresh,
-			num_workers=self.settings.num_workers,
-			limit=limit  # Передаем limit в collect_vacancies
-		)
-		print("[INFO]: Подготовка DataFrame...")
-		df = self.analyzer.prepare_df(vacancies)
+		if sample_size:
+			if dedup:
+				raise ValueError("dedup is not supported with sample_size")
+			return self._sampled_statistics(sample_size, confidence, bins=bins, log_scale=log_scale, plots=plots)
+		
+		logger.info("Сбор вакансий для анализа")
+		coverage = None
+		if time_budget is not None:
+			# Не дольше time_budget секунд: неполный набор, сбор продолжается в фоне
+			vacancies, coverage, version = self.collector.collect_within(
+				query=self.query.options,
+				budget=time_budget,
+				refresh=self.query.refresh,
+				num_workers=self.query.num_workers,
+				limit=limit,
+			)
+		else:
+			vacancies, version = self.collector.collect_dataset(
+				query=self.query.options,
+				refresh=self.query.refresh,
+				num_workers=self.query.num_workers,
+				limit=limit  # Передаем limit в collect_dataset
+			)
+		self.statistics_version = version
+		logger.info("Подготовка DataFrame")
+		with stage("dataframe_prep"):
+			df = self.analyzer.prepare_df(vacancies)
+		
+		query_key = self.collector.dataset_key(self.query.options)
+		duplicates = {}
+		if dedup:
+			# Сигнатуры описаний кешируются по набору данных, считаются только для новых вакансий
+			with stage("deduplication"):
+				duplicates = find_duplicates(
+					df["Ids"].to_list(), df["Description"].to_list(), threshold=dedup_threshold, dataset_key=query_key
+				)
+			df = df[~df["Ids"].astype(str).isin(duplicates)]
 		
 		# Подготовка директории для графиков
 		if save_plots:
@@ -215,58 +352,68 @@ class ResearcherHH:
 				output_dir = os.path.join(CACHE_DIR, "plots")
 			os.makedirs(output_dir, exist_ok=True)
 		
-		# Собираем статистику
+		# Собираем статистику: агрегаты по зарплатам и навыкам считаются SQL-запросами к хранилищу вакансий, если
+		# в нем та же версия набора, что и в DataFrame. Неполный набор еще не сохранен в хранилище, limit берет часть
+		# набора, а хранилище могло быть обновлено фоновым сбором - тогда агрегаты считаются по DataFrame
 		statistics = {}
-		statistics["vacancy_count"] = df["Ids"].count()
-		
-		# Статистика по зарплатам
-		salary_stats = {}
-		comb_ft = np.nanmean(df[df["Salary"]][["From", "To"]].to_numpy(), axis=1)
-		salary_stats["min"] = int(np.min(comb_ft))
-		salary_stats["max"] = int(np.max(comb_ft))
-		salary_stats["mean"] = int(np.mean(comb_ft))
-		salary_stats["median"] = int(np.median(comb_ft))
-		
-		# Добавляем статистические показатели
-		df_stat = df[["From", "To"]].describe().applymap(np.int32)
-		for col in ["From", "To"]:
-			salary_stats[f"{col.lower()}_stats"] = {
-				"min": int(df_stat.loc["min", col]),
-				"max": int(df_stat.loc["max", col]),
-				"mean": int(df_stat.loc["mean", col]),
-				"median": int(df_stat.loc["50%", col])
-			}
+		with stage("salary_aggregation"):
+			aggregates = None
+			if coverage is None and limit is None and version is not None:
+				aggregates = self._store_aggregates(query_key, version, duplicates)
+			if aggregates is None:
+				aggregates = len(df), self._frame_salary_stats(df), None
+			statistics["vacancy_count"], salary_stats, top_keywords = aggregates
+		if coverage is not None:
+			statistics["partial"] = True
+			statistics["coverage"] = coverage
+		if dedup:
+			statistics["duplicate_count"] = len(duplicates)
 		
 		statistics["salary_stats"] = salary_stats
 		
 		# Топ ключевых слов
-		most_keys = self.analyzer.find_top_words_from_keys(df["Keys"].to_list())
-		statistics["top_keywords"] = most_keys[:20].to_dict()
+		if top_keywords is None:
+			with stage("keyword_count"):
+				top_keywords = self.analyzer.find_top_words_from_keys(df["Keys"].to_list())[:20].to_dict()
+		statistics["top_keywords"] = top_keywords
 		
 		# Топ слов из описаний
-		most_words = self.analyzer.find_top_words_from_description(df["Description"].to_list())
+		with stage("description_count"):
+			most_words = self.analyzer.find_top_words_from_description(df["Description"].to_list())
 		statistics["top_description_words"] = most_words[:20].to_dict()
 		
-		# Работа с графиками
+		# Распределения зарплат: векторизованные гистограммы и KDE, графики строит клиент
+		with stage("salary_distributions"):
+			values = self._salary_values(df)
+			if plots:
+				values = {name: x for name, x in values.items() if name in plots}
+			statistics["salary_distributions"] = {
+				name: distribution(x, bins=bins, log=log_scale) for name, x in values.items()
+			}
+		
+		# Графики matplotlib (медленно) только по явному запросу
 		plot_paths = {}
 		plot_images = {}
-		
-		# Генерируем отдельные графики
-		figures = self._generate_salary_plots(df)
-		
-		for plot_name, fig in figures.items():
-			if include_base64:
-				buffer = io.BytesIO()
-				fig.savefig(buffer, format='png')
-				buffer.seek(0)
-				plot_images[plot_name] = base64.b64encode(buffer.getvalue()).decode('utf-8')
-			
-			if save_plots:
-				plot_path = os.path.join(output_dir, f"{plot_name}.png")
-				fig.savefig(plot_path)
-				plot_paths[plot_name] = plot_path
-			
-			plt.close(fig)
+		if save_plots or include_base64:
+			with stage("plot_rendering"):
+				figures = self._generate_salary_plots(df)
+				
+				for plot_name, fig in figures.items():
+					if plots and plot_name not in plots:
+						pyplot().close(fig)
+						continue
+					if include_base64:
+						buffer = io.BytesIO()
+						fig.savefig(buffer, format='png')
+						buffer.seek(0)
+						plot_images[plot_name] = base64.b64encode(buffer.getvalue()).decode('utf-8')
+					
+					if save_plots:
+						plot_path = os.path.join(output_dir, f"{plot_name}.png")
+						fig.savefig(plot_path)
+						plot_paths[plot_name] = plot_path
+					
+					pyplot().close(fig)
 		
 		if save_plots:
 			statistics["plot_paths"] = plot_paths
@@ -274,30 +421,210 @@ class ResearcherHH:
 		if include_base64:
 			statistics["plot_images"] = plot_images
 		
-		return _to_builtin_type(statistics)
+		return statistics
+	
+	def _sampled_statistics(
+			self, sample_size: int, confidence: float = 0.95, bins: int = 14, log_scale: bool = False,
+			plots: Optional[Sequence[str]] = None,
+	) -> Dict:
+		"""Приближенная статистика по стратифицированной случайной выборке вакансий
+		(`DataCollector.collect_sample`).
+
+		Оценки взвешены весами выборки (размер страты / размер выборки из страты), интервалы -
+		стратифицированный бутстреп (`src.sampling.estimate`). Ключи совпадают с `get_statistics`,
+		дополнительно возвращаются:
+			- sampling: размер выборки, число найденных вакансий, доля выборки, уровень доверия
+			- salary_ci: доверительные интервалы mean и median в раскладке salary_stats
+			- top_keywords_ci: доверительные интервалы количества вакансий с навыком
+		Количество вакансий точное (по страницам поиска), top_keywords и top_description_words -
+		оценки для всех вакансий запроса, salary_distributions построены по выборке.
+		"""
+		import numpy as np
+		
+		with stage("sampling"):
+			sample = self.collector.collect_sample(
+				self.query.options, size=sample_size, num_workers=self.query.num_workers,
+				refresh=self.query.refresh,
+			)
+		with stage("dataframe_prep"):
+			df = self.analyzer.prepare_df(sample["vacancies"])
+		codes = np.asarray(sample["codes"], dtype=int)
+		weights = np.asarray(sample["weights"], dtype=float)
+		population = sample["population"]
+		
+		def interval(values, statistic="mean", scale=1.0):
+			result = estimate(
+				values, codes, weights, statistic=statistic, fraction=sample["fraction"], confidence=confidence
+			)
+			return {k: np.asarray(v) * scale for k, v in result.items()}
+		
+		def to_int(value):
+			return None if np.isnan(value) else int(round(float(value)))
+		
+		def column_stats(values):
+			mean, median = interval(values), interval(values, "median")
+			present = values[~np.isnan(values)]
+			stats = {
+				"min": to_int(present.min()) if len(present) else None,
+				"max": to_int(present.max()) if len(present) else None,
+				"mean": to_int(mean["estimate"]),
+				"median": to_int(median["estimate"]),
+			}
+			ci = {name: [to_int(x["low"]), to_int(x["high"])] for name, x in (("mean", mean), ("median", median))}
+			return stats, ci
+		
+		statistics = {
+			"vacancy_count": population,
+			"sampling": {
+				"sample_size": len(df),
+				"population": population,
+				"fraction": round(sample["fraction"], 4),
+				"confidence": confidence,
+			},
+		}
+		
+		with stage("salary_aggregation"):
+			from_to = df[["From", "To"]].astype(float)
+			salary_stats, salary_ci = column_stats(from_to.mean(axis=1).to_numpy())
+			from_to = from_to.to_numpy()
+			for name, idx in (("from_stats", 0), ("to_stats", 1)):
+				salary_stats[name], salary_ci[name] = column_stats(from_to[:, idx])
+		statistics["salary_stats"] = salary_stats
+		statistics["salary_ci"] = salary_ci
+		
+		# Навыки: взвешенные частоты, для топ-20 - доля вакансий с навыком и интервал
+		with stage("keyword_count"):
+			keys = [{x.lower().replace("'", "") for x in row if x} for row in df["Keys"]]
+			counts = {}
+			for row, weight in zip(keys, weights):
+				for key in row:
+					counts[key] = counts.get(key, 0) + weight
+			top_keys = sorted(counts, key=counts.get, reverse=True)[:20]
+			shares = interval(
+				np.array([[key in row for key in top_keys] for row in keys], dtype=float).reshape(len(keys), -1),
+				scale=population,
+			)
+		statistics["top_keywords"] = {key: to_int(x) for key, x in zip(top_keys, shares["estimate"])}
+		statistics["top_keywords_ci"] = {
+			key: [to_int(low), to_int(high)] for key, low, high in zip(top_keys, shares["low"], shares["high"])
+		}
+		
+		# Слова описаний: частоты по стратам, умноженные на вес страты
+		with stage("description_count"):
+			words = {}
+			for code in np.unique(codes):
+				mask = codes == code
+				stratum_words = self.analyzer.find_top_words_from_description(df["Description"][mask].to_list())
+				for word, count in stratum_words.items():
+					words[word] = words.get(word, 0) + count * weights[mask][0]
+		statistics["top_description_words"] = {
+			word: int(round(words[word])) for word in sorted(words, key=words.get, reverse=True)[:20]
+		}
+		
+		with stage("salary_distributions"):
+			values = self._salary_values(df)
+			if plots:
+				values = {name: x for name, x in values.items() if name in plots}
+			statistics["salary_distributions"] = {
+				name: distribution(x, bins=bins, log=log_scale) for name, x in values.items()
+			}
+		return statistics
+	
+	def iter_statistics(
+			self, every: int = 50, interval: float = 1.0, limit: Optional[int] = None, **kwargs
+	) -> Iterator[Tuple[str, Dict]]:
+		"""Статистика по мере сбора вакансий: события (тип, данные).
+
+		Пока идет сбор, каждые `every` полученных вакансий или `interval` секунд (если есть новые
+		вакансии) возвращается событие "progress": vacancy_count, salary_stats, top_keywords,
+		top_description_words и coverage (fetched, expected, ratio). Агрегаты обновляются
+		инкрементально по каждой вакансии (`src.aggregates.RunningStatistics`), а не
+		пересчитываются. В конце возвращается событие "result" с полной статистикой
+		`get_statistics` (параметры `kwargs`).
+		"""
+		query = self.query.options
+		future = self.collector.collect_in_background(
+			query, refresh=self.query.refresh, num_workers=self.query.num_workers, limit=limit
+		)
+		# Ждем начала сбора (у набора из кеша сбора нет)
+		query_key = self.collector.dataset_key(query)
+		progress = None
+		while progress is None and not future.done():
+			progress = CRAWLS.get(query_key)
+			if progress is None:
+				time.sleep(0.05)
+		
+		if progress is not None:
+			running = RunningStatistics(stop_words=english_stop_words())
+			updates = progress.subscribe()
+			pending, deadline = 0, time.monotonic() + interval
+			while True:
+				try:
+					vacancy = updates.get(timeout=max(deadline - time.monotonic(), 0.01))
+				except queue.Empty:
+					vacancy = ()
+				if vacancy is None:
+					break
+				if vacancy:
+					running.add(vacancy)
+					pending += 1
+				if pending >= every or (pending and time.monotonic() >= deadline):
+					yield "progress", {**running.snapshot(), "coverage": progress.coverage()}
+					pending = 0
+				if time.monotonic() >= deadline:
+					deadline = time.monotonic() + interval
+		
+		future.result()
+		# Набор уже собран и сохранен в кеш, повторный сбор не нужен
+		collected = copy.copy(self)
+		collected.query = self.query._replace(refresh=False)
+		yield "result", collected.get_statistics(limit=limit, **kwargs)
+	
+	def get_salary_trend(self, bucket: str = "month", periods: int = 6) -> List[Dict]:
+		"""Возвращает динамику зарплат по дате публикации вакансий, найденных этим запросом
+		за всё время наблюдений (см. `VacancyStore.salary_trend`)."""
+		return self.store.salary_trend(
+			query_key=self.collector.dataset_key(self.query.options), bucket=bucket, periods=periods
+		)
+	
+	def get_snapshots(self) -> List[Dict]:
+		"""Возвращает сохраненные версии набора вакансий запроса (см. `VacancyStore.save_snapshot`)."""
+		return self.store.snapshots(self.collector.dataset_key(self.query.options))
+	
+	def diff_snapshots(
+			self, from_version: Optional[str] = None, to_version: Optional[str] = None, top_n: int = 20
+	) -> Optional[Dict]:
+		"""Возвращает изменения набора вакансий запроса между версиями: новые, удаленные и измененные
+		вакансии, сдвиг квантилей зарплат и количества навыков (см. `VacancyStore.diff_snapshots`)."""
+		return self.store.diff_snapshots(
+			self.collector.dataset_key(self.query.options), from_version, to_version, top_n
+		)
 	
-	def __call__(self):
-		print("[INFO]: Collect data from JSON. Create list of vacancies...")
+	def __call__(self, filters: Optional[Dict] = None, limit: Optional[int] = None):
+		logger.info("Collect data from JSON. Create list of vacancies")
 		vacancies = self.collector.collect_vacancies(
-			query=self.settings.options, refresh=self.settings.refresh, num_workers=self.settings.num_workers
+			query=self.query.options, refresh=self.query.refresh, num_workers=self.query.num_workers,
+			filters=filters, limit=limit,
 		)
-		print("[INFO]: Prepare dataframe...")
+		logger.info("Prepare dataframe")
 		df = self.analyzer.prepare_df(vacancies)
 		# df.to_csv(os.path.join(CACHE_DIR, "vacancies.csv"))
-		print("\n[INFO]: Analyze dataframe...")
+		logger.info("Analyze dataframe")
 		self.analyzer.analyze_df(df)
-		print("\n[INFO]: Predict None salaries...")
+		logger.info("Predict None salaries")
 		# total_df = self.predictor.predict(df)
 		# self.predictor.plot_results(total_df)
-		print("[INFO]: Done! Exit()")
+		logger.info("Done")
 
 
 if __name__ == "__main__":
-	hh_analyzer = ResearcherHH(options={
-		"text": "Python",
-		"area": 1,
-		"per_page": 10,
-	})
+	# python -m api.hh_research.researcher --text "Python Developer" --refresh
+	# Для пакетного сбора многих запросов см. `crawler.py`
+	setup_logging()
+	settings = Settings.from_args(options={"area": 1, "per_page": 50})
+	hh_analyzer = ResearcherHH(
+		options=settings.options, refresh=settings.refresh, num_workers=settings.num_workers,
+		save_result=settings.save_result, sources=settings.sources,
+	)
 	hh_analyzer.update()
-	# hh_analyzer()
-	print(hh_analyzer.get_statistics(include_base64=True))
+	hh_analyzer(filters=settings.filters, limit=settings.limit)
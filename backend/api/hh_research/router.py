@@ -1,9 +1,18 @@
+import hashlib
+from contextlib import asynccontextmanager, nullcontext
 from typing import Annotated, Sequence, List, Optional, Dict
-from fastapi import APIRouter, Depends, status, Query, HTTPException
-from .researcher import ResearcherHH
-from .src.city_validator import find_city_id
-
-router = APIRouter(tags=["hh"])
+from fastapi import APIRouter, Depends, status, Query, HTTPException, Header, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from .researcher import ResearcherHH, build_options
+from .src.cache import STATISTICS_CACHE
+from .src.logs import new_request_id, setup_logging, stop_logging
+from .src.metrics import METRICS, job, stage
+from .src.profiling import is_profiling_allowed, load_profile, profile_request
+from .src.responses import caching_headers, dumps, is_not_modified, json_response, sse_event
+from .src.services import SERVICES
+from .src.sources import SOURCES
+from .src.storage import VACANCY_COLUMNS
+from .src.warmer import CacheWarmer
 
 EXPERIENCE_MAPPING = {
 	"noExperience": "Без опыта",
@@ -13,38 +22,103 @@ EXPERIENCE_MAPPING = {
 }
 
 
-# @router.get("/get_vacancies", status_code=status.HTTP_201_CREATED)
-# async def get_vacancies(
-# 		text: str = Query(..., description="Поисковый запрос для вакансий"),
-# 		area: int = Query(1, description="Локация поискового запроса"),
-# 		per_page: int = Query(50, description="Количество вакансий на страницу"),
-# 		professional_roles: Sequence[int] = Query(
-# 			[96, 10], description="Фильтр по роли в запросе"
-# 		),
-# 		refresh: bool = Query(False, description="Обновление кешируемых данных")
-# ):
-# 	hh_analyzer = ResearcherHH(options={
-# 		"text": text,
-# 		"area": area,
-# 		"per_page": per_page,
-# 		"professional_roles": professional_roles
-# 	}, refresh=refresh, )
-# 	hh_analyzer.update()
-# 	hh_analyzer()
-# 	return hh_analyzer.get_vacancies(limit=500)
+def _warm_query(options: Dict, sources: Sequence[str]):
+	hh_analyzer = ResearcherHH(options=options, refresh=True, sources=sources)
+	hh_analyzer.update()
+	hh_analyzer.warm()
+	# Снимок агрегатов обновленного набора: статистика с параметрами по умолчанию сразу есть в кеше
+	hh_analyzer.update(refresh=False)
+	params = _statistics_params()
+	statistics = hh_analyzer.get_statistics(save_plots=False, **params)
+	if hh_analyzer.statistics_version:
+		STATISTICS_CACHE.set(_statistics_key(hh_analyzer, hh_analyzer.statistics_version, params), statistics)
+
+
+@asynccontextmanager
+async def lifespan(app):
+	"""Общие сервисы (пул HTTP-соединений, справочник регионов, курсы валют, анализатор, хранилище)
+	создаются один раз на процесс и переиспользуются запросами (см. `src.services.Services`)"""
+	# Логи пишет фоновый поток через очередь, обработчики запросов не ждут вывода в консоль
+	setup_logging()
+	SERVICES.start()
+	# Фоновое обновление кеша популярных запросов в непиковые часы (настройки HH_WARMER_* в src/config.py).
+	# Популярность запросов берется из общего хранилища, оно открывается здесь, а не при импорте роутера
+	cache_warmer = CacheWarmer(warm=_warm_query, store=SERVICES.store)
+	cache_warmer.start()
+	try:
+		yield
+	finally:
+		cache_warmer.stop()
+		SERVICES.close()
+		stop_logging()
+
+
+async def _request_context(x_request_id: Optional[str] = Header(None, include_in_schema=False)):
+	"""ID запроса в логах: из заголовка X-Request-ID или случайный"""
+	new_request_id(x_request_id)
+
+
+router = APIRouter(tags=["hh"], lifespan=lifespan, dependencies=[Depends(_request_context)])
 
 
+def _dataset_caching_headers(hh_analyzer: ResearcherHH, request: Request) -> Optional[Dict[str, str]]:
+	"""Заголовки HTTP-кеширования по версии набора вакансий запроса (None, если набора нет в кеше)"""
+	version = hh_analyzer.dataset_version()
+	return caching_headers(version, request) if version else None
+
+
+def _statistics_params(
+		include_plots: bool = False,
+		limit: Optional[int] = None,
+		experience: Optional[List[str]] = None,
+		age_from: Optional[int] = None,
+		age_to: Optional[int] = None,
+		key_skills: Optional[List[str]] = None,
+		dedup: bool = False,
+		dedup_threshold: float = 0.8,
+		bins: int = 14,
+		log_scale: bool = False,
+		plots: Optional[List[str]] = None,
+) -> Dict:
+	"""Параметры `ResearcherHH.get_statistics`, от которых зависит кешируемая статистика
+	(значения по умолчанию - как у /get_statistics)"""
+	return {
+		"include_base64": include_plots,
+		"limit": limit,
+		"experience": experience,
+		"age": [age_from, age_to],
+		"key_skills": key_skills,
+		"dedup": dedup,
+		"dedup_threshold": dedup_threshold,
+		"bins": bins,
+		"log_scale": log_scale,
+		"plots": plots,
+	}
+
+
+def _statistics_key(hh_analyzer: ResearcherHH, version: str, params: Dict) -> str:
+	"""Ключ кеша статистики: набор вакансий запроса, его версия и параметры расчета. Ключ не зависит
+	от строки запроса, поэтому кеш заполняется и фоновым прогревом (см. `_warm_query`)"""
+	dataset_key = hh_analyzer.collector.dataset_key(hh_analyzer.query.options)
+	return hashlib.md5(f"{dataset_key}|{version}|{sorted(params.items())}".encode()).hexdigest()
+
+
+# Обычная функция: FastAPI выполняет ее в пуле потоков, поэтому сбор вакансий и расчет статистики
+# (в том числе ожидание time_budget) не блокируют цикл событий
 @router.get("/get_statistics", status_code=status.HTTP_200_OK)
-async def get_statistics(
+def get_statistics(
+		request: Request,
 		text: str = Query(..., description="Поисковый запрос для статистики"),
 		area: str = Query('Москва', description="Локация поискового запроса"),
 		per_page: int = Query(50, description="Количество вакансий на страницу"),
 		refresh: bool = Query(False, description="Обновление кешируемых данных"),
-		include_plots: bool = Query(True, description="Включить графики в формате base64 в ответ"),
+		include_plots: bool = Query(False, description="Включить графики matplotlib в формате base64 в ответ"),
 		plots: List[str] = Query(
 			None,
-			description="Список требуемых графиков (from_hist, to_hist, avg_hist). Если не указан, будут возвращены все."
+			description="Список требуемых распределений и графиков (from_hist, to_hist, avg_hist). Если не указан, будут возвращены все."
 		),
+		bins: int = Query(14, ge=2, le=200, description="Количество интервалов гистограмм зарплат"),
+		log_scale: bool = Query(False, description="Гистограммы и KDE зарплат в логарифмической шкале"),
 		limit: int = Query(None, description="Ограничение количества вакансий для анализа"),
 		experience: List[str] = Query(
 			None,
@@ -55,7 +129,24 @@ async def get_statistics(
 		key_skills: List[str] = Query(
 			None,
 			description="Фильтр по ключевым навыкам"
-		)
+		),
+		sources: List[str] = Query(
+			None,
+			description="Источники вакансий (hh, superjob). По умолчанию только hh"
+		),
+		dedup: bool = Query(False, description="Исключить почти одинаковые вакансии (по описанию)"),
+		dedup_threshold: float = Query(
+			0.8, ge=0.5, le=1.0, description="Порог сходства описаний для исключения дубликатов"
+		),
+		sample_size: Optional[int] = Query(
+			None, ge=10, le=2000, description="Приближенная статистика по случайной выборке такого размера"
+		),
+		confidence: float = Query(0.95, ge=0.5, le=0.999, description="Уровень доверия интервалов выборки"),
+		time_budget: Optional[float] = Query(
+			None, gt=0, le=300, description="Ограничение времени сбора вакансий, секунды (неполный результат)"
+		),
+		profile: bool = Query(False, description="Профилирование запроса (требуется заголовок X-Profile-Token)"),
+		x_profile_token: Optional[str] = Header(None, description="Токен доступа к профилированию"),
 ):
 	"""
 	Возвращает статистику по вакансиям с возможностью фильтрации и отдельные графики зарплат.
@@ -65,76 +156,387 @@ async def get_statistics(
 	- area: локация поискового запроса (по умолчанию Москва)
 	- per_page: количество вакансий на страницу
 	- refresh: обновление кешируемых данных
-	- include_plots: включать ли графики в формате base64 в ответ
-	- plots: список требуемых графиков, доступные значения:
+	- include_plots: включать ли графики matplotlib в формате base64 в ответ (медленно, по умолчанию нет:
+	  распределения зарплат возвращаются данными в salary_distributions)
+	- plots: список требуемых распределений и графиков, доступные значения:
 	  * from_hist - гистограмма минимальной зарплаты
 	  * to_hist - гистограмма максимальной зарплаты
 	  * avg_hist - гистограмма средней зарплаты
+	- bins: количество интервалов гистограмм
+	- log_scale: гистограммы и KDE в логарифмической шкале
 	- limit: ограничение количества обрабатываемых вакансий
 	- experience: фильтр по опыту работы (может быть несколько значений)
 	- age_from: минимальный возраст соискателя
 	- age_to: максимальный возраст соискателя
 	- key_skills: фильтр по ключевым навыкам (может быть несколько значений)
+	- sources: источники вакансий (hh, superjob), собираются параллельно, дубликаты
+	  (работодатель + название + зарплата) объединяются
+	- dedup: исключить из статистики вакансии с почти одинаковыми описаниями (MinHash + LSH),
+	  например одну вакансию, размещенную несколько раз
+	- dedup_threshold: порог сходства описаний (0.5-1.0), по умолчанию 0.8
+	- sample_size: приближенный режим - подробности запрашиваются только для стратифицированной (по опыту
+	  и наличию зарплаты) случайной выборки вакансий, статистика оценивается с доверительными интервалами
+	  (salary_ci, top_keywords_ci) и размером выборки (sampling). Только для источника hh, без dedup
+	- confidence: уровень доверия интервалов приближенного режима, по умолчанию 0.95
+	- time_budget: ограничение времени сбора вакансий в секундах. Если сбор не успевает, статистика считается
+	  по уже полученным вакансиям (partial=true, coverage: fetched, expected, ratio), а сбор продолжается
+	  в фоне и дополняет кеш для следующих запросов
+	- profile: профилирование запроса, доступно только с заголовком X-Profile-Token,
+	  совпадающим с переменной окружения HH_PROFILE_TOKEN
 
 	Возвращает словарь с ключами:
 	- vacancy_count: общее количество вакансий
+	- duplicate_count: количество исключенных дубликатов (если dedup=True)
+	- partial, coverage: признак неполного результата и доля полученных вакансий (если задан time_budget)
 	- salary_stats: статистика по зарплатам (min, max, mean, median)
 	- top_keywords: наиболее часто встречающиеся ключевые навыки
 	- top_description_words: наиболее часто встречающиеся слова в описаниях
+	- salary_distributions: распределения зарплат from_hist, to_hist, avg_hist в рублях: гистограмма
+	  (bin_edges, counts) и KDE (kde.x, kde.density) для построения графиков на клиенте
 	- plot_images: отдельные графики в формате base64 (если include_plots=True)
 	- filters: примененные фильтры
+	- profile: длительности этапов обработки и id профиля (если profile=True), сам профиль
+	  в формате folded stacks доступен по /profiles/{id}
+
+	Ответ содержит заголовки ETag и Last-Modified, вычисленные по версии набора вакансий (время
+	последнего сбора) и параметрам запроса. Если набор не изменился и ETag совпадает с заголовком
+	If-None-Match, возвращается 304 без расчета статистики (кроме запросов с refresh или profile).
 	"""
+	if profile and not is_profiling_allowed(x_profile_token):
+		raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Профилирование недоступно")
+	if sources and not set(sources) <= set(SOURCES):
+		raise HTTPException(
+			status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			detail=f"Неизвестные источники вакансий: {sorted(set(sources) - set(SOURCES))}"
+		)
+	if sample_size and (dedup or (sources and set(sources) != {"hh"})):
+		raise HTTPException(
+			status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			detail="Приближенный режим (sample_size) доступен только для источника hh и без dedup"
+		)
+	
 	try:
-		area_id = find_city_id(area) or '1'
-		# Подготовка параметров для ResearcherHH
-		options = {
-			"text": text,
-			"area": find_city_id,
-			"per_page": per_page,
-			"professional_roles": [0]
-		}
-		
-		# Добавляем фильтры, если они указаны
-		if experience:
-			options["experience"] = experience
-		if age_from is not None or age_to is not None:
-			options["age"] = {
-				"from": age_from,
-				"to": age_to
-			}
-		if key_skills:
-			options["key_skills"] = key_skills
-		
-		hh_analyzer = ResearcherHH(options=options, refresh=refresh)
+		with job("get_statistics"):
+			with profile_request() if profile else nullcontext() as prof:
+				options = build_options(text, area, per_page, experience, age_from, age_to, key_skills)
+				hh_analyzer = ResearcherHH(options=options, refresh=refresh, sources=sources or ("hh",))
+				hh_analyzer.update()
+				hh_analyzer.record_request()
+				params = _statistics_params(
+					include_plots, limit, experience, age_from, age_to, key_skills, dedup, dedup_threshold, bins,
+					log_scale, plots,
+				)
+				
+				# Оценки по выборке не зависят от версии собранного набора вакансий
+				if not refresh and not profile and not sample_size:
+					# Версия набора в кеше: устаревший набор обновляется в фоне, как при сборе, поэтому
+					# клиенты с If-None-Match получают новые данные после TTL; без набора в кеше - полный расчет
+					version = hh_analyzer.dataset_version()
+					headers = caching_headers(version, request) if version else None
+					if headers and is_not_modified(request, headers["ETag"]):
+						return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+					# Статистика, посчитанная этим или другим узлом (или прогревом) для той же версии набора
+					cached = STATISTICS_CACHE.get(_statistics_key(hh_analyzer, version, params)) if version else None
+					if cached is not None:
+						return json_response(cached.value, request, headers=headers)
+				
+				# Получаем статистику с распределениями зарплат (и графиками в base64 по запросу)
+				statistics = hh_analyzer.get_statistics(
+					save_plots=False,
+					sample_size=sample_size,
+					confidence=confidence,
+					time_budget=time_budget,
+					**params,
+				)
+			
+			if prof is not None:
+				prof.save()
+				statistics["profile"] = prof.summary()
+			
+			# Профиль, оценки по выборке и неполные результаты не кешируются. Заголовки и ключ кеша - по версии
+			# набора, по которой посчитана статистика: во время расчета набор мог обновиться в фоне
+			uncacheable = profile or sample_size or statistics.get("partial")
+			version = None if uncacheable else hh_analyzer.statistics_version
+			headers = caching_headers(version, request) if version else None
+			if headers:
+				STATISTICS_CACHE.set(_statistics_key(hh_analyzer, version, params), statistics)
+			with stage("json_serialization"):
+				return json_response(statistics, request, headers=headers)
+
+	except Exception as e:
+		raise HTTPException(
+			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			detail=f"Ошибка при обработке статистики: {str(e)}"
+		)
+
+
+# Обычная функция: подготовка запроса (регион, курсы валют) выполняется в пуле потоков, события
+# Starlette читает из генератора тоже в пуле потоков, пока идет сбор
+@router.get("/get_statistics/stream", status_code=status.HTTP_200_OK)
+def stream_statistics(
+		text: str = Query(..., description="Поисковый запрос для статистики"),
+		area: str = Query('Москва', description="Локация поискового запроса"),
+		per_page: int = Query(50, description="Количество вакансий на страницу"),
+		refresh: bool = Query(False, description="Обновление кешируемых данных"),
+		limit: int = Query(None, description="Ограничение количества вакансий для анализа"),
+		experience: List[str] = Query(None, description="Фильтр по опыту работы"),
+		age_from: Optional[int] = Query(None, description="Минимальный возраст соискателя"),
+		age_to: Optional[int] = Query(None, description="Максимальный возраст соискателя"),
+		key_skills: List[str] = Query(None, description="Фильтр по ключевым навыкам"),
+		sources: List[str] = Query(None, description="Источники вакансий (hh, superjob). По умолчанию только hh"),
+		every: int = Query(50, ge=1, le=10000, description="Отправлять статистику каждые N полученных вакансий"),
+		interval: float = Query(1.0, ge=0.1, le=60, description="...или каждые N секунд, если есть новые вакансии"),
+):
+	"""
+	Статистика по вакансиям по мере сбора (Server-Sent Events, text/event-stream).
+
+	Пока идет сбор вакансий, отправляются события `progress` с vacancy_count, salary_stats, top_keywords,
+	top_description_words и coverage (fetched, expected, ratio) по уже полученным вакансиям. Агрегаты
+	обновляются инкрементально по каждой вакансии. Последнее событие `result` содержит полную статистику,
+	как /get_statistics, при ошибке - событие `error` с полем detail. Для набора из кеша сразу отправляется
+	`result`.
+	"""
+	if sources and not set(sources) <= set(SOURCES):
+		raise HTTPException(
+			status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			detail=f"Неизвестные источники вакансий: {sorted(set(sources) - set(SOURCES))}"
+		)
+	
+	try:
+		options = build_options(text, area, per_page, experience, age_from, age_to, key_skills)
+		hh_analyzer = ResearcherHH(options=options, refresh=refresh, sources=sources or ("hh",))
 		hh_analyzer.update()
-		
-		# Получаем статистику с графиками в base64
-		statistics = hh_analyzer.get_statistics(
-			save_plots=False,
-			include_base64=include_plots,
+		hh_analyzer.record_request()
+	except Exception as e:
+		raise HTTPException(
+			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			detail=f"Ошибка при обработке статистики: {str(e)}"
+		)
+	
+	def events():
+		try:
+			with job("get_statistics_stream"):
+				# Графики в PNG сохраняет только CLI
+				updates = hh_analyzer.iter_statistics(every=every, interval=interval, limit=limit, save_plots=False)
+				for event, data in updates:
+					yield sse_event(event, data)
+		except Exception as e:
+			yield sse_event("error", {"detail": f"Ошибка при обработке статистики: {str(e)}"})
+	
+	return StreamingResponse(
+		events(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+	)
+
+
+# Обычная функция, как /get_statistics: курсы валют и сбор вакансий запрашиваются в пуле потоков, поток
+# NDJSON Starlette читает из курсора хранилища тоже в пуле потоков
+@router.get("/get_vacancies", status_code=status.HTTP_200_OK)
+def get_vacancies(
+		request: Request,
+		text: str = Query(..., description="Поисковый запрос для вакансий"),
+		area: str = Query('Москва', description="Локация поискового запроса"),
+		per_page: int = Query(50, description="Количество вакансий на страницу запроса к HH API"),
+		refresh: bool = Query(False, description="Обновление кешируемых данных"),
+		sources: List[str] = Query(None, description="Источники вакансий (hh, superjob). По умолчанию только hh"),
+		stream: bool = Query(False, description="Вернуть все вакансии потоком в формате NDJSON"),
+		after: Optional[str] = Query(None, description="Id последней вакансии предыдущей страницы"),
+		limit: Optional[int] = Query(None, ge=1, description="Количество вакансий (по умолчанию 100 на страницу)"),
+		columns: List[str] = Query(None, description=f"Возвращаемые поля: {', '.join(VACANCY_COLUMNS)}"),
+		experience: List[str] = Query(
+			None,
+			description="Фильтр по опыту работы (noExperience, between1And3, between3And6, moreThan6)"
+		),
+		schedule: List[str] = Query(None, description="Фильтр по графику работы (например, Удаленная работа)"),
+		salary_min: Optional[int] = Query(None, description="Минимальная средняя зарплата"),
+		salary_max: Optional[int] = Query(None, description="Максимальная средняя зарплата"),
+		with_salary: bool = Query(False, description="Только вакансии с указанной зарплатой"),
+):
+	"""
+	Возвращает вакансии запроса из хранилища, отсортированные по id.
+
+	- без stream: страница из limit (по умолчанию 100, максимум 1000) вакансий, начиная после
+	  вакансии after, и next_after - значение after для следующей страницы (null на последней)
+	- stream=true: все вакансии (или limit первых) построчно в формате NDJSON, читаются из
+	  хранилища пачками и не накапливаются в памяти
+
+	Фильтры и выбор полей (columns) применяются в запросе к хранилищу. По умолчанию возвращаются
+	все поля, кроме description, поле id возвращается всегда.
+	"""
+	if columns and not set(columns) <= set(VACANCY_COLUMNS):
+		raise HTTPException(
+			status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			detail=f"Неизвестные поля: {sorted(set(columns) - set(VACANCY_COLUMNS))}"
+		)
+	if sources and not set(sources) <= set(SOURCES):
+		raise HTTPException(
+			status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			detail=f"Неизвестные источники вакансий: {sorted(set(sources) - set(SOURCES))}"
+		)
+	if not stream:
+		limit = min(limit or 100, 1000)
+	columns = list(columns or [x for x in VACANCY_COLUMNS if x != "description"])
+	if "id" not in columns:
+		columns.insert(0, "id")
+	
+	try:
+		options = build_options(text, area, per_page)
+		hh_analyzer = ResearcherHH(options=options, refresh=refresh, sources=sources or ("hh",))
+		hh_analyzer.update()
+		vacancies = hh_analyzer.iter_vacancies(
+			columns=columns,
+			after=after,
 			limit=limit,
-			experience=experience,
-			age=[age_from, age_to],
-			key_skills=key_skills
+			experience=[EXPERIENCE_MAPPING.get(x, x) for x in experience or []],
+			schedule=schedule,
+			salary_min=salary_min,
+			salary_max=salary_max,
+			with_salary=with_salary,
 		)
+		if stream:
+			return StreamingResponse(
+				(dumps(x) + b"\n" for x in vacancies), media_type="application/x-ndjson"
+			)
 		
-		# Фильтруем графики, если указан параметр plots
-		if include_plots and plots and 'plot_images' in statistics:
-			filtered_images = {}
-			for plot_name in plots:
-				if plot_name in statistics['plot_images']:
-					filtered_images[plot_name] = statistics['plot_images'][plot_name]
-			statistics['plot_images'] = filtered_images
-		
-		return statistics
+		items = list(vacancies)
+		return json_response({
+			"items": items,
+			"next_after": items[-1]["id"] if len(items) == limit else None,
+		}, request)
+	except Exception as e:
+		raise HTTPException(
+			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			detail=f"Ошибка при получении вакансий: {str(e)}"
+		)
 
+
+# Обычная функция: сбор набора и оконные SQL-запросы выполняются в пуле потоков
+@router.get("/get_salary_trend", status_code=status.HTTP_200_OK)
+def get_salary_trend(
+		request: Request,
+		text: str = Query(..., description="Поисковый запрос"),
+		area: str = Query('Москва', description="Локация поискового запроса"),
+		per_page: int = Query(50, description="Количество вакансий на страницу"),
+		bucket: str = Query("month", description="Интервал группировки (day, week, month)"),
+		periods: int = Query(6, ge=1, description="Количество последних интервалов"),
+		experience: List[str] = Query(None, description="Фильтр по опыту работы"),
+		key_skills: List[str] = Query(None, description="Фильтр по ключевым навыкам"),
+):
+	"""
+	Возвращает динамику зарплат (количество, min, max, mean, median средней зарплаты)
+	по дате публикации вакансий из всех сборов данных по запросу.
+	Данные накапливаются в хранилище вакансий при вызовах /get_statistics.
+	"""
+	if bucket not in ("day", "week", "month"):
+		raise HTTPException(
+			status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+			detail=f"Неизвестный интервал группировки: {bucket}"
+		)
+	try:
+		options = build_options(text, area, per_page, experience, key_skills=key_skills)
+		hh_analyzer = ResearcherHH(options=options, refresh=False)
+		hh_analyzer.update()
+		headers = _dataset_caching_headers(hh_analyzer, request)
+		if headers and is_not_modified(request, headers["ETag"]):
+			return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+		return json_response({
+			"bucket": bucket,
+			"trend": hh_analyzer.get_salary_trend(bucket=bucket, periods=periods),
+		}, request, headers=headers)
 	except Exception as e:
 		raise HTTPException(
 			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-			detail=f"Ошибка при обработке статистики: {str(e)}"
+			detail=f"Ошибка при расчете динамики зарплат: {str(e)}"
 		)
 
 
+# Обычные функции: запросы к хранилищу выполняются в пуле потоков
+@router.get("/get_snapshots", status_code=status.HTTP_200_OK)
+def get_snapshots(
+		request: Request,
+		text: str = Query(..., description="Поисковый запрос"),
+		area: str = Query('Москва', description="Локация поискового запроса"),
+		per_page: int = Query(50, description="Количество вакансий на страницу"),
+		experience: List[str] = Query(None, description="Фильтр по опыту работы"),
+		age_from: Optional[int] = Query(None, description="Минимальный возраст соискателя"),
+		age_to: Optional[int] = Query(None, description="Максимальный возраст соискателя"),
+		key_skills: List[str] = Query(None, description="Фильтр по ключевым навыкам"),
+		sources: List[str] = Query(None, description="Источники вакансий (hh, superjob). По умолчанию только hh"),
+):
+	"""
+	Возвращает версии набора вакансий запроса (version, vacancy_count), последняя первой.
+	Версия сохраняется при каждом полном сборе, если набор изменился. Версия - время сбора набора (UTC),
+	оно одинаково на всех узлах API с общим кешем. Параметры запроса те же, что у /get_statistics.
+	"""
+	try:
+		options = build_options(text, area, per_page, experience, age_from, age_to, key_skills)
+		hh_analyzer = ResearcherHH(options=options, refresh=False, sources=sources or ("hh",))
+		hh_analyzer.update()
+		return json_response({"snapshots": hh_analyzer.get_snapshots()}, request)
+	except Exception as e:
+		raise HTTPException(
+			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			detail=f"Ошибка при получении версий набора: {str(e)}"
+		)
+
+
+@router.get("/get_snapshot_diff", status_code=status.HTTP_200_OK)
+def get_snapshot_diff(
+		request: Request,
+		text: str = Query(..., description="Поисковый запрос"),
+		area: str = Query('Москва', description="Локация поискового запроса"),
+		per_page: int = Query(50, description="Количество вакансий на страницу"),
+		experience: List[str] = Query(None, description="Фильтр по опыту работы"),
+		age_from: Optional[int] = Query(None, description="Минимальный возраст соискателя"),
+		age_to: Optional[int] = Query(None, description="Максимальный возраст соискателя"),
+		key_skills: List[str] = Query(None, description="Фильтр по ключевым навыкам"),
+		sources: List[str] = Query(None, description="Источники вакансий (hh, superjob). По умолчанию только hh"),
+		from_version: Optional[str] = Query(None, description="Исходная версия (по умолчанию предпоследняя)"),
+		to_version: Optional[str] = Query(None, description="Конечная версия (по умолчанию последняя)"),
+		top_n: int = Query(20, ge=1, le=1000, description="Количество навыков с наибольшим изменением"),
+):
+	"""
+	Возвращает изменения набора вакансий запроса между двумя версиями (см. /get_snapshots):
+
+	- added, removed, changed: id новых, удаленных и измененных вакансий и их количество (counts)
+	- salary_quantiles: квантили средней зарплаты (p10, p25, p50, p75, p90) в обеих версиях и их разница
+	- top_keywords: навыки с наибольшим изменением количества вакансий
+
+	Считается по сохраненным отсортированным массивам id и агрегатам версий, без загрузки наборов вакансий.
+	"""
+	try:
+		options = build_options(text, area, per_page, experience, age_from, age_to, key_skills)
+		hh_analyzer = ResearcherHH(options=options, refresh=False, sources=sources or ("hh",))
+		hh_analyzer.update()
+		diff = hh_analyzer.diff_snapshots(from_version, to_version, top_n)
+	except Exception as e:
+		raise HTTPException(
+			status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+			detail=f"Ошибка при сравнении версий набора: {str(e)}"
+		)
+	if diff is None:
+		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Версии набора вакансий не найдены")
+	# Версии по умолчанию (последние) меняются с каждым сбором, старые версии удаляются: ответ не кешируется
+	return json_response(diff, request, headers={"Cache-Control": "no-store"})
+
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str, x_profile_token: Optional[str] = Header(None)):
+	"""Профиль запроса в формате folded stacks (flamegraph.pl, speedscope)"""
+	if not is_profiling_allowed(x_profile_token):
+		raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Профилирование недоступно")
+	folded = load_profile(profile_id)
+	if folded is None:
+		raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Профиль не найден")
+	return PlainTextResponse(folded)
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+	"""Метрики сервиса в текстовом формате Prometheus: длительность этапов обработки, количество
+	HTTP-запросов к внешним API и полученные байты, попадания и промахи кеша, запросы в обработке."""
+	return PlainTextResponse(METRICS.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @router.get("/status", status_code=status.HTTP_200_OK)
-async def status():
+async def get_status():
 	return {'status': 'ok'}
@@ -0,0 +1,120 @@
+import heapq
+import re
+from collections import Counter
+from typing import Collection, Dict, List, Optional
+
+_WORDS = re.compile("[a-z]+")
+
+
+class RunningMedian:
+	"""Median of a growing sequence: two heaps, O(log n) per value."""
+
+	def __init__(self):
+		# Max-heap (negated values) of the lower half and min-heap of the upper half
+		self._low: List[float] = []
+		self._high: List[float] = []
+
+	def __len__(self) -> int:
+		return len(self._low) + len(self._high)
+
+	def add(self, value: float):
+		if self._low and value > -self._low[0]:
+			heapq.heappush(self._high, value)
+		else:
+			heapq.heappush(self._low, -value)
+		if len(self._low) > len(self._high) + 1:
+			heapq.heappush(self._high, -heapq.heappop(self._low))
+		elif len(self._high) > len(self._low):
+			heapq.heappush(self._low, -heapq.heappop(self._high))
+
+	def median(self) -> Optional[float]:
+		if not self._low:
+			return None
+		if len(self._low) > len(self._high):
+			return -self._low[0]
+		return (-self._low[0] + self._high[0]) / 2
+
+
+class RunningColumn:
+	"""Min, max, mean and median of a salary column, updated per value."""
+
+	def __init__(self):
+		self.min: Optional[float] = None
+		self.max: Optional[float] = None
+		self._sum = 0.0
+		self._median = RunningMedian()
+
+	def add(self, value: Optional[float]):
+		if value is None:
+			return
+		self.min = value if self.min is None else min(self.min, value)
+		self.max = value if self.max is None else max(self.max, value)
+		self._sum += value
+		self._median.add(value)
+
+	def stats(self) -> Dict[str, Optional[int]]:
+		count = len(self._median)
+		values = (self.min, self.max, self._sum / count if count else None, self._median.median())
+		return {
+			name: int(value) if value is not None else None
+			for name, value in zip(("min", "max", "mean", "median"), values)
+		}
+
+
+class RunningStatistics:
+	"""Vacancy statistics maintained incrementally as parsed vacancies arrive.
+
+	Every vacancy updates counters in O(log n), so a snapshot can be taken at any time
+	without recomputing from scratch. Snapshots have the layout of `ResearcherHH.get_statistics`
+	(`vacancy_count`, `salary_stats`, `top_keywords`, `top_description_words`).
+
+	Parameters
+	----------
+	stop_words : collection of str
+		Words skipped in descriptions.
+	top_n : int
+		Number of top key skills and description words in snapshots.
+
+	"""
+
+	def __init__(self, stop_words: Collection[str] = (), top_n: int = 20):
+		self._stop_words = stop_words
+		self._top_n = top_n
+		self._seen = set()
+		self._avg = RunningColumn()
+		self._from = RunningColumn()
+		self._to = RunningColumn()
+		self._keys = Counter()
+		self._words = Counter()
+
+	def __len__(self) -> int:
+		return len(self._seen)
+
+	def add(self, vacancy: tuple):
+		"""Add a parsed vacancy (see `DataCollector.parse_vacancy`), repeated IDs are skipped."""
+		# vac: (id, name, employer, salary_bool, from, to, experience, schedule, keys, description, area, published)
+		if vacancy[0] in self._seen:
+			return
+		self._seen.add(vacancy[0])
+		salary_from, salary_to = vacancy[4], vacancy[5]
+		bounds = [x for x in (salary_from, salary_to) if x is not None]
+		if vacancy[3] and bounds:
+			self._avg.add(sum(bounds) / len(bounds))
+		self._from.add(salary_from)
+		self._to.add(salary_to)
+		# Same normalization as `Analyzer.find_top_words_from_keys` / `find_top_words_from_description`
+		self._keys.update(x.lower().replace("'", "") for x in vacancy[8] if x)
+		self._words.update(
+			x for x in _WORDS.findall(vacancy[9] or "") if len(x) > 2 and x not in self._stop_words
+		)
+
+	def snapshot(self) -> Dict:
+		salary_stats = self._avg.stats()
+		salary_stats["from_stats"] = self._from.stats()
+		salary_stats["to_stats"] = self._to.stats()
+		return {
+			"vacancy_count": len(self._seen),
+			"salary_stats": salary_stats,
+			"top_keywords": dict(self._keys.most_common(self._top_n)),
+			"top_description_words": dict(self._words.most_common(self._top_n)),
+		}
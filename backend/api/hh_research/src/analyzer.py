@@ -1,11 +1,30 @@
+import logging
 import re
-from typing import Dict, List
+from collections import Counter
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, FrozenSet, List
 
-import matplotlib.pyplot as plt
-import nltk
-import numpy as np
-import pandas as pd
-import seaborn as sns
+from .plotting import pyplot, seaborn
+
+# pandas, numpy, nltk, matplotlib and seaborn are imported on first use to keep API startup fast
+if TYPE_CHECKING:
+    import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+_WORDS = re.compile("[a-z]+")
+
+
+@lru_cache(maxsize=None)
+def english_stop_words() -> FrozenSet[str]:
+    """English stop words of nltk, downloaded on first use."""
+    import nltk
+
+    try:
+        _ = nltk.corpus.stopwords.words("english")
+    except LookupError:
+        nltk.download("stopwords")
+    return frozenset(nltk.corpus.stopwords.words("english"))
 
 
 class Analyzer:
@@ -17,7 +36,7 @@ class Analyzer:
         #     print(r"[INFO] You have downloaded stopwords!")
 
     @staticmethod
-    def find_top_words_from_keys(keys_list: List) -> pd.Series:
+    def find_top_words_from_keys(keys_list: List) -> "pd.Series":
         """Find most used words into description of vacancies.
 
         Parameters
@@ -31,6 +50,8 @@ class Analyzer:
             List of sorted keywords.
 
         """
+        import pandas as pd
+
         # Create a list of keys for all vacancies
         lst_keys = []
         for keys_elem in keys_list:
@@ -48,7 +69,7 @@ class Analyzer:
         return pd.Series(srt_keys, name="Keys")
 
     @staticmethod
-    def find_top_words_from_description(desc_list: List) -> pd.Series:
+    def find_top_words_from_description(desc_list: List) -> "pd.Series":
         """Find most used words into description of vacancies.
 
         Parameters
@@ -62,30 +83,21 @@ class Analyzer:
             List of sorted words from descriptions.
 
         """
-        words_ls = " ".join([re.sub(" +", " ", re.sub(r"\d+", "", el.strip().lower())) for el in desc_list])
-        # Find all words
-        words_re = re.findall("[a-zA-Z]+", words_ls)
+        import pandas as pd
+
+        # Descriptions are already lowercase plain text (see `DataCollector.clean_tags`)
+        words_re = _WORDS.findall(" ".join(desc_list))
         # Filter words with length < 3
         words_l2 = [el for el in words_re if len(el) > 2]
-        # Unique words
-        words_st = set(words_l2)
         # Remove 'stop words'
-        try:
-            _ = nltk.corpus.stopwords.words("english")
-        except LookupError:
-            nltk.download("stopwords")
-        finally:
-            stop_words = set(nltk.corpus.stopwords.words("english"))
-
-        # XOR for dictionary
-        words_st ^= stop_words
-        words_st ^= {"amp", "quot"}
+        stop_words = english_stop_words()
+
         # Dictionary - {Word: Counter}
-        words_cnt = {el: words_l2.count(el) for el in words_st}
+        words_cnt = Counter(el for el in words_l2 if el not in stop_words)
         # Pandas series
         return pd.Series(dict(sorted(words_cnt.items(), key=lambda x: x[1], reverse=True)))
 
-    def prepare_df(self, vacancies: Dict) -> pd.DataFrame:
+    def prepare_df(self, vacancies: Dict) -> "pd.DataFrame":
         """Prepare data frame and save results
 
         Parameters
@@ -95,21 +107,27 @@ class Analyzer:
 
         """
 
+        import pandas as pd
+
         # Create pandas dataframe
         df = pd.DataFrame.from_dict(vacancies)
-        # Print some info from data frame
-        with pd.option_context("display.max_rows", None, "display.max_columns", None):
-            print(df[df["Salary"]][["Employer", "From", "To"]][0:15])
+        # Rendering of the DataFrame is expensive, it is done only for debug logs
+        if logger.isEnabledFor(logging.DEBUG) and "Salary" in df:
+            with pd.option_context("display.max_rows", None, "display.max_columns", None):
+                logger.debug("Vacancies with salary:\n%s", df[df["Salary"]][["Employer", "From", "To"]][0:15])
         # Save to file
         if self.save_csv:
-            print("\n\n[INFO]: Save dataframe to file...")
+            logger.info("Save dataframe to file hh_results.csv")
             df.to_csv(rf"hh_results.csv", index=False)
         return df
 
-    def analyze_df(self, df: pd.DataFrame):
+    def analyze_df(self, df: "pd.DataFrame"):
         """Load data frame and analyze results
 
         """
+        import numpy as np
+
+        plt, sns = pyplot(interactive=True), seaborn()
         sns.set()
         # with pd.option_context('display.max_rows', None, 'display.max_columns', None):
         print(df[df["Salary"]][0:7])
@@ -0,0 +1,191 @@
+import atexit
+import json
+import os
+import sqlite3
+import struct
+import threading
+import zlib
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .config import ARCHIVE_BLOCK_RECORDS, ARCHIVE_CHUNK_MB, ARCHIVE_DIR
+
+# Block header: magic, size of the compressed payload, number of records
+_HEADER = struct.Struct("<4sII")
+_MAGIC = b"HHA1"
+_CHUNK_SUFFIX = ".chunk"
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+	kind TEXT NOT NULL,
+	key TEXT NOT NULL,
+	chunk TEXT NOT NULL,
+	offset INTEGER NOT NULL,
+	position INTEGER NOT NULL,
+	archived_at TEXT NOT NULL,
+	PRIMARY KEY (kind, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS records_chunk ON records (chunk, kind);
+"""
+
+
+def iter_blocks(path: str) -> Iterator[Tuple[int, List[Dict]]]:
+	"""Blocks of a chunk file: (offset, records). A block cut off by an interruption ends the chunk."""
+	with open(path, "rb") as f:
+		while True:
+			offset = f.tell()
+			header = f.read(_HEADER.size)
+			if len(header) < _HEADER.size:
+				return
+			magic, size, count = _HEADER.unpack(header)
+			payload = f.read(size)
+			if magic != _MAGIC or len(payload) < size:
+				return
+			records = [json.loads(x) for x in zlib.decompress(payload).split(b"\n")]
+			yield offset, records[:count]
+
+
+class RawArchive:
+	r"""Append-only archive of raw responses of external APIs (vacancy details and search pages).
+
+	Responses are kept as is, so new fields can be derived from them later without crawling
+	again (see `reprocess.py`). Records are buffered and written in blocks of JSON lines
+	compressed with zlib: neighbouring vacancies share most of their keys and vocabulary, so a
+	block compresses much better than single records. Blocks are appended to chunk files which
+	roll over at `chunk_mb` megabytes; every process writes its own chunks, so crawler processes
+	share an archive without locking files.
+
+	The latest record of every (kind, key) is indexed in SQLite (`index.sqlite3`): chunk, block
+	offset and position in the block. A block is indexed after it is written, so the index never
+	points to a partial block.
+
+	Parameters
+	----------
+	path : str
+		Archive directory.
+	chunk_mb : int
+		Chunk size, megabytes.
+	block_records : int
+		Records per block.
+	level : int
+		zlib compression level.
+
+	"""
+
+	def __init__(
+			self, path: str, chunk_mb: int = ARCHIVE_CHUNK_MB, block_records: int = ARCHIVE_BLOCK_RECORDS,
+			level: int = 6,
+	):
+		self.path = path
+		self.chunk_bytes = chunk_mb * 1024 * 1024
+		self.block_records = block_records
+		self.level = level
+		os.makedirs(path, exist_ok=True)
+		self._lock = threading.Lock()
+		self._write_lock = threading.Lock()
+		self._buffer: List[Dict] = []
+		self._pid: Optional[int] = None
+		self._conn: Optional[sqlite3.Connection] = None
+		self._chunk: Optional[str] = None
+		self._chunk_seq = 0
+
+	def add(self, kind: str, key: str, data: Dict):
+		"""Buffer a raw response, a full buffer is written as a block."""
+		record = {"kind": kind, "key": str(key), "at": datetime.now(timezone.utc).isoformat(), "data": data}
+		with self._lock:
+			self._check_process()
+			self._buffer.append(record)
+			if len(self._buffer) < self.block_records:
+				return
+			records, self._buffer = self._buffer, []
+		self._write(records)
+
+	def flush(self):
+		"""Write buffered records."""
+		with self._lock:
+			self._check_process()
+			records, self._buffer = self._buffer, []
+		if records:
+			self._write(records)
+
+	def close(self):
+		self.flush()
+		with self._write_lock:
+			if self._conn is not None:
+				self._conn.close()
+				self._conn = None
+
+	def _check_process(self):
+		# A forked process does not write records of its parent and gets its own chunks and connection
+		if self._pid != os.getpid():
+			self._pid = os.getpid()
+			self._buffer = []
+			self._conn = None
+			self._chunk = None
+
+	def _index(self) -> sqlite3.Connection:
+		if self._conn is None:
+			self._conn = sqlite3.connect(os.path.join(self.path, "index.sqlite3"), timeout=60, check_same_thread=False)
+			self._conn.execute("PRAGMA journal_mode=WAL")
+			self._conn.executescript(_INDEX_SCHEMA)
+		return self._conn
+
+	def _chunk_name(self) -> str:
+		if self._chunk is None or os.path.getsize(os.path.join(self.path, self._chunk)) >= self.chunk_bytes:
+			self._chunk_seq += 1
+			started = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+			self._chunk = f"{started}-{os.getpid()}-{self._chunk_seq:04d}{_CHUNK_SUFFIX}"
+			open(os.path.join(self.path, self._chunk), "ab").close()
+		return self._chunk
+
+	def _write(self, records: List[Dict]):
+		payload = b"\n".join(json.dumps(x, ensure_ascii=False).encode() for x in records)
+		block = zlib.compress(payload, self.level)
+		with self._write_lock:
+			chunk = self._chunk_name()
+			with open(os.path.join(self.path, chunk), "ab") as f:
+				offset = f.tell()
+				f.write(_HEADER.pack(_MAGIC, len(block), len(records)))
+				f.write(block)
+			conn = self._index()
+			with conn:
+				conn.executemany(
+					"INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?, ?, ?)",
+					[(x["kind"], x["key"], chunk, offset, idx, x["at"]) for idx, x in enumerate(records)],
+				)
+
+	def get(self, kind: str, key: str) -> Optional[Dict]:
+		"""The latest raw response archived by the key (e.g. vacancy ID) or None."""
+		with self._write_lock:
+			row = self._index().execute(
+				"SELECT chunk, offset, position FROM records WHERE kind = ? AND key = ?", (kind, str(key))
+			).fetchone()
+		if row is None:
+			return None
+		chunk, offset, position = row
+		with open(os.path.join(self.path, chunk), "rb") as f:
+			f.seek(offset)
+			_, size, _ = _HEADER.unpack(f.read(_HEADER.size))
+			lines = zlib.decompress(f.read(size)).split(b"\n")
+		return json.loads(lines[position])["data"]
+
+	def chunks(self) -> List[str]:
+		"""Chunk files in the order of writing."""
+		return sorted(x for x in os.listdir(self.path) if x.endswith(_CHUNK_SUFFIX))
+
+	def latest(self, kind: str) -> Dict[str, Set[Tuple[int, int]]]:
+		"""Blocks and positions of the latest records of the kind by chunk: older records are skipped on reads."""
+		with self._write_lock:
+			rows = self._index().execute(
+				"SELECT chunk, offset, position FROM records WHERE kind = ?", (kind,)
+			).fetchall()
+		latest: Dict[str, Set[Tuple[int, int]]] = {}
+		for chunk, offset, position in rows:
+			latest.setdefault(chunk, set()).add((offset, position))
+		return latest
+
+
+ARCHIVE: Optional[RawArchive] = None
+if ARCHIVE_DIR:
+	ARCHIVE = RawArchive(ARCHIVE_DIR)
+	atexit.register(ARCHIVE.close)
@@ -0,0 +1,459 @@
+import os
+import pickle
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, ContextManager, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from .config import CACHE_BACKEND, CACHE_DIR, CACHE_MAX_MB, CACHE_NEGATIVE_TTL, CACHE_STALE_TTL, CACHE_TTL
+from .metrics import METRICS
+
+# Inter-process locks are not available on Windows, thread locks are used alone there
+try:
+	import fcntl
+except ImportError:
+	fcntl = None
+
+
+class CacheBackend:
+	"""Storage of cache entries (bytes by key) with exclusive locks of keys.
+
+	Backends shared by several API processes or nodes make them reuse each other's crawls:
+	the lock of a key is held while the query is crawled, so only one node crawls it.
+
+	"""
+
+	def get(self, key: str) -> Optional[bytes]:
+		raise NotImplementedError
+
+	def set(self, key: str, data: bytes, ttl: Optional[float] = None):
+		"""Save data, the backend may drop it after `ttl` seconds."""
+		raise NotImplementedError
+
+	def delete(self, key: str):
+		raise NotImplementedError
+
+	def touch(self, key: str):
+		"""Mark the entry as recently used."""
+
+	def evict(self, max_bytes: int) -> int:
+		"""Remove least recently used entries over the size cap, return their number."""
+		return 0
+
+	def usage(self) -> Tuple[int, Optional[int]]:
+		"""Number of entries and their size in bytes (None if unknown)."""
+		raise NotImplementedError
+
+	def lock(self, key: str, blocking: bool = True) -> ContextManager[bool]:
+		"""Exclusive lock of a key, yields whether it is acquired (always True if blocking)."""
+		raise NotImplementedError
+
+
+class _KeyLocks:
+	"""Thread locks by key."""
+
+	def __init__(self):
+		self._locks: Dict[str, threading.Lock] = {}
+		self._guard = threading.Lock()
+
+	def get(self, key: str) -> threading.Lock:
+		with self._guard:
+			return self._locks.setdefault(key, threading.Lock())
+
+
+class DiskBackend(CacheBackend):
+	r"""Entries are files of a local directory, locks are `flock` of lock files.
+
+	Shared by the API processes of one host. The last access time of an entry is its mtime.
+
+	Parameters
+	----------
+	directory : str
+		Directory used by this backend only.
+
+	"""
+
+	def __init__(self, directory: str):
+		self.directory = directory
+		self._lock_dir = os.path.join(directory, ".locks")
+		self._locks = _KeyLocks()
+
+	def _path(self, key: str) -> str:
+		return os.path.join(self.directory, key)
+
+	def get(self, key: str) -> Optional[bytes]:
+		try:
+			with open(self._path(key), "rb") as f:
+				return f.read()
+		except FileNotFoundError:
+			return None
+
+	def set(self, key: str, data: bytes, ttl: Optional[float] = None):
+		# Written to a temporary file and renamed, so readers never see partial files
+		os.makedirs(self.directory, exist_ok=True)
+		fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+		try:
+			with os.fdopen(fd, "wb") as f:
+				f.write(data)
+			os.replace(tmp_path, self._path(key))
+		except BaseException:
+			os.unlink(tmp_path)
+			raise
+
+	def delete(self, key: str):
+		try:
+			os.unlink(self._path(key))
+		except FileNotFoundError:
+			pass
+
+	def touch(self, key: str):
+		try:
+			os.utime(self._path(key))
+		except FileNotFoundError:
+			pass
+
+	def _entries(self) -> list:
+		entries = []
+		try:
+			with os.scandir(self.directory) as it:
+				for item in it:
+					if item.name.startswith(".") or not item.is_file():
+						continue
+					try:
+						stat = item.stat()
+					except FileNotFoundError:
+						continue
+					entries.append((stat.st_mtime, stat.st_size, item.path))
+		except FileNotFoundError:
+			pass
+		return entries
+
+	def evict(self, max_bytes: int) -> int:
+		entries = self._entries()
+		total = sum(size for _, size, _ in entries)
+		evicted = 0
+		# Least recently used first
+		for _, size, path in sorted(entries):
+			if total <= max_bytes:
+				break
+			try:
+				os.unlink(path)
+			except FileNotFoundError:
+				continue
+			total -= size
+			evicted += 1
+		return evicted
+
+	def usage(self) -> Tuple[int, Optional[int]]:
+		entries = self._entries()
+		return len(entries), sum(size for _, size, _ in entries)
+
+	@contextmanager
+	def lock(self, key: str, blocking: bool = True) -> Iterator[bool]:
+		thread_lock = self._locks.get(key)
+		if not thread_lock.acquire(blocking):
+			yield False
+			return
+		try:
+			if fcntl is None:
+				yield True
+				return
+			os.makedirs(self._lock_dir, exist_ok=True)
+			with open(os.path.join(self._lock_dir, key), "w") as f:
+				try:
+					fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+				except BlockingIOError:
+					yield False
+					return
+				try:
+					yield True
+				finally:
+					fcntl.flock(f, fcntl.LOCK_UN)
+		finally:
+			thread_lock.release()
+
+
+class MemoryBackend(CacheBackend):
+	r"""In-process stand-in of a network key-value store, e.g. for tests.
+
+	Several `CacheManager` instances (simulated nodes) sharing one backend behave like nodes
+	sharing Redis: entries and locks are common.
+
+	"""
+
+	def __init__(self):
+		self._data: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+		self._guard = threading.Lock()
+		self._locks = _KeyLocks()
+
+	def get(self, key: str) -> Optional[bytes]:
+		with self._guard:
+			item = self._data.get(key)
+			if item is None:
+				return None
+			if item[1] is not None and time.time() >= item[1]:
+				del self._data[key]
+				return None
+			return item[0]
+
+	def set(self, key: str, data: bytes, ttl: Optional[float] = None):
+		with self._guard:
+			self._data[key] = (data, time.time() + ttl if ttl is not None else None)
+			self._data.move_to_end(key)
+
+	def delete(self, key: str):
+		with self._guard:
+			self._data.pop(key, None)
+
+	def touch(self, key: str):
+		with self._guard:
+			if key in self._data:
+				self._data.move_to_end(key)
+
+	def evict(self, max_bytes: int) -> int:
+		evicted = 0
+		with self._guard:
+			total = sum(len(data) for data, _ in self._data.values())
+			while total > max_bytes and self._data:
+				_, (data, _) = self._data.popitem(last=False)
+				total -= len(data)
+				evicted += 1
+		return evicted
+
+	def usage(self) -> Tuple[int, Optional[int]]:
+		with self._guard:
+			return len(self._data), sum(len(data) for data, _ in self._data.values())
+
+	@contextmanager
+	def lock(self, key: str, blocking: bool = True) -> Iterator[bool]:
+		thread_lock = self._locks.get(key)
+		if not thread_lock.acquire(blocking):
+			yield False
+			return
+		try:
+			yield True
+		finally:
+			thread_lock.release()
+
+
+class RedisBackend(CacheBackend):
+	r"""Entries and locks in Redis, shared by all API nodes.
+
+	Entries expire by Redis TTL and the size is limited by `maxmemory` with an LRU policy of
+	the Redis server. Locks are `SET NX PX` keys with a random token, released only by the
+	owner; a lock of a crashed node expires after `lock_timeout`.
+
+	Parameters
+	----------
+	url : str
+		Redis URL, e.g. `redis://cache:6379/0`.
+	namespace : str
+		Prefix of keys.
+	lock_timeout : float
+		Seconds after which a lock expires, longer than the longest crawl.
+	poll_interval : float
+		Seconds between attempts to acquire a lock.
+
+	"""
+	# Delete the lock only if it still belongs to this owner
+	__RELEASE = "if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end return 0"
+
+	def __init__(self, url: str, namespace: str, lock_timeout: float = 1800.0, poll_interval: float = 0.2):
+		# redis is an optional dependency, required only for this backend
+		import redis
+
+		self._redis = redis.Redis.from_url(url)
+		self._prefix = f"hh:{namespace}:"
+		self.lock_timeout = lock_timeout
+		self.poll_interval = poll_interval
+		self._release = self._redis.register_script(self.__RELEASE)
+
+	def get(self, key: str) -> Optional[bytes]:
+		return self._redis.get(self._prefix + key)
+
+	def set(self, key: str, data: bytes, ttl: Optional[float] = None):
+		self._redis.set(self._prefix + key, data, px=int(ttl * 1000) if ttl is not None else None)
+
+	def delete(self, key: str):
+		self._redis.delete(self._prefix + key)
+
+	def usage(self) -> Tuple[int, Optional[int]]:
+		locks = f"{self._prefix}lock:".encode()
+		keys = self._redis.scan_iter(match=self._prefix + "*", count=1000)
+		return sum(1 for x in keys if not x.startswith(locks)), None
+
+	@contextmanager
+	def lock(self, key: str, blocking: bool = True) -> Iterator[bool]:
+		lock_key, token = f"{self._prefix}lock:{key}", uuid.uuid4().hex
+		while not self._redis.set(lock_key, token, nx=True, px=int(self.lock_timeout * 1000)):
+			if not blocking:
+				yield False
+				return
+			time.sleep(self.poll_interval)
+		try:
+			yield True
+		finally:
+			self._release(keys=[lock_key], args=[token])
+
+
+def make_backend(namespace: str, spec: str = CACHE_BACKEND) -> CacheBackend:
+	"""Create a backend from `HH_CACHE_BACKEND`: `disk`, `memory` or a Redis URL."""
+	if spec == "disk":
+		return DiskBackend(os.path.join(CACHE_DIR, namespace))
+	if spec == "memory":
+		return MemoryBackend()
+	if spec.startswith(("redis://", "rediss://", "unix://")):
+		return RedisBackend(spec, namespace)
+	raise ValueError(f"Unknown cache backend '{spec}', expected disk, memory or a Redis URL")
+
+
+class CacheEntry(NamedTuple):
+	value: Any
+	created_at: float
+	expires_at: float
+	stale_until: float
+
+	@property
+	def stale(self) -> bool:
+		"""The entry expired, but may be served while it is being revalidated."""
+		return time.time() >= self.expires_at
+
+
+class CacheManager:
+	r"""Cache of pickled values with lifecycle management over a `CacheBackend`.
+
+	- every entry has a TTL and a stale-while-revalidate window after it: stale entries
+	  are returned with `CacheEntry.stale` set, so the caller can refresh them in background;
+	- the total size of entries is capped, least recently used entries are evicted;
+	- `lock` serializes work on a key between threads, processes and (with a shared
+	  backend) nodes, e.g. crawling a query;
+	- hits, stale hits, misses and evictions are counted in `stats` and in the metrics.
+
+	Parameters
+	----------
+	name : str
+		Cache name: namespace in the backend and label in metrics.
+	backend : CacheBackend, optional
+		Storage of entries, by default created from `HH_CACHE_BACKEND` (see `make_backend`).
+	ttl : float
+		Seconds an entry is fresh.
+	stale_ttl : float
+		Seconds after expiration the entry is still served as stale.
+	max_bytes : int
+		Size cap of all entries.
+	negative_ttl : float
+		TTL of empty results (negative caching), see `set`.
+
+	"""
+
+	def __init__(
+			self,
+			name: str,
+			backend: Optional[CacheBackend] = None,
+			ttl: float = CACHE_TTL,
+			stale_ttl: float = CACHE_STALE_TTL,
+			max_bytes: int = CACHE_MAX_MB * 1024 * 1024,
+			negative_ttl: float = CACHE_NEGATIVE_TTL,
+	):
+		self.name = name
+		self._backend = backend
+		self.ttl = ttl
+		self.stale_ttl = stale_ttl
+		self.max_bytes = max_bytes
+		self.negative_ttl = negative_ttl
+		self._stats = {"hits": 0, "stale_hits": 0, "misses": 0, "evictions": 0}
+
+	@property
+	def backend(self) -> CacheBackend:
+		# Created on first use, so that importing the module does not connect anywhere
+		if self._backend is None:
+			self._backend = make_backend(self.name)
+		return self._backend
+
+	def _count(self, result: str, stat: str):
+		self._stats[stat] += 1
+		METRICS.inc("hh_cache_requests_total", 1, {"cache": self.name, "result": result}, "Cache lookups")
+
+	def get(self, key: str, record: bool = True) -> Optional[CacheEntry]:
+		"""Return the entry, None if it is missing or expired beyond the stale window.
+		Lookups with `record=False` (rechecks) are not counted in statistics."""
+		data = self.backend.get(key)
+		try:
+			entry = CacheEntry(**pickle.loads(data)) if data is not None else None
+		except (pickle.UnpicklingError, EOFError, TypeError):
+			entry = None
+		if entry is not None and time.time() >= entry.stale_until:
+			self.backend.delete(key)
+			entry = None
+		if entry is None:
+			if record:
+				self._count("miss", "misses")
+			return None
+		self.backend.touch(key)
+		if record:
+			if entry.stale:
+				self._count("stale", "stale_hits")
+			else:
+				self._count("hit", "hits")
+		return entry
+
+	def set(self, key: str, value: Any, negative: bool = False):
+		"""Save the value and evict old entries if the cache is over the size cap.
+
+		Parameters
+		----------
+		key : str
+			Entry key.
+		value : any
+			Picklable value.
+		negative : bool
+			The value is an empty result. It is cached for `negative_ttl` without the stale window,
+			so repeated empty queries are not crawled again, but are rechecked soon.
+
+		"""
+		now = time.time()
+		expires_at = now + (self.negative_ttl if negative else self.ttl)
+		stale_until = expires_at if negative else expires_at + self.stale_ttl
+		entry = {"value": value, "created_at": now, "expires_at": expires_at, "stale_until": stale_until}
+		self.backend.set(key, pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL), ttl=stale_until - now)
+
+		evicted = self.backend.evict(self.max_bytes)
+		if evicted:
+			self._stats["evictions"] += evicted
+			METRICS.inc(
+				"hh_cache_evictions_total", evicted, {"cache": self.name}, "Cache entries evicted by the size cap"
+			)
+
+	def delete(self, key: str):
+		self.backend.delete(key)
+
+	def lock(self, key: str, blocking: bool = True) -> ContextManager[bool]:
+		"""Exclusive lock of a key, see `CacheBackend.lock`.
+
+		>> with cache.lock(key):
+		>>     if cache.get(key) is None:  # it may be filled while waiting
+		>>         cache.set(key, crawl())
+
+		"""
+		return self.backend.lock(key, blocking)
+
+	def stats(self) -> Dict:
+		"""Counters of this process and the current number and size of entries."""
+		entries, size = self.backend.usage()
+		return {**self._stats, "entries": entries, "bytes": size}
+
+
+# Parsed datasets of queries, shared by all collectors of the process. The version in the name is bumped
+# when the columns of datasets change, so that datasets of the old layout are not served. v2: before it
+# the Name and Employer columns held each other's values
+DATASET_CACHE = CacheManager("datasets-v2")
+# HH areas tree used to find area IDs by name
+AREAS_CACHE = CacheManager("areas")
+# Responses of /get_statistics (aggregates and plots) by dataset version and request parameters.
+# Only fresh entries are served: a hit looks up the dataset version first, which revalidates a stale dataset
+STATISTICS_CACHE = CacheManager("statistics", stale_ttl=0)
+# MinHash signatures of vacancy descriptions by dataset key (see `dedup.find_duplicates`)
+SIGNATURES_CACHE = CacheManager("signatures")
@@ -1,9 +1,81 @@
-import requests
+import threading
+import time
+
+from .cache import AREAS_CACHE
+from .config import HH_API_URL
+from .http_client import get_json
+
+
+def load_areas():
+    """HH areas tree, cached in the shared cache and fetched by one node at a time."""
+    entry = AREAS_CACHE.get("areas")
+    if entry is not None and not entry.stale:
+        return entry.value
+    with AREAS_CACHE.lock("areas"):
+        fresh = AREAS_CACHE.get("areas", record=False)
+        if fresh is not None and not fresh.stale:
+            return fresh.value
+        try:
+            areas = get_json(f"{HH_API_URL}/areas", target="areas")
+        except Exception:
+            # The tree rarely changes, a stale one is better than an error
+            if entry is not None:
+                return entry.value
+            raise
+        AREAS_CACHE.set("areas", areas)
+        return areas
+
+
+class AreaIndex:
+    """Area lookups by name and by ID over the areas tree, shared by requests.
+
+    The tree is read from the shared cache (`load_areas`) and indexed once, then re-read when
+    the cached tree expires.
+
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tree = None
+        self._by_name = {}
+        self._by_id = {}
+        self._loaded_at = 0.0
+
+    def _load(self):
+        with self._lock:
+            if self._tree is not None and time.monotonic() - self._loaded_at < AREAS_CACHE.ttl:
+                return
+            tree = load_areas()
+            by_name, by_id = {}, {}
+            # Pre-order, as `find_city_id`: a region goes before its cities
+            stack = list(reversed(tree))
+            while stack:
+                item = stack.pop()
+                by_name.setdefault(item["name"].lower(), item["id"])
+                by_id.setdefault(item["id"], item["name"])
+                stack.extend(reversed(item.get("areas") or []))
+            self._tree, self._by_name, self._by_id = tree, by_name, by_id
+            self._loaded_at = time.monotonic()
+
+    def tree(self):
+        self._load()
+        return self._tree
+
+    def find_id(self, city_name):
+        self._load()
+        return self._by_name.get(city_name.lower())
+
+    def find_name(self, city_id):
+        self._load()
+        return self._by_id.get(city_id)
+
+
+AREA_INDEX = AreaIndex()
 
 
 def find_city_id(city_name, areas=None):
     if areas is None:
-        areas = requests.get("https://api.hh.ru/areas").json()
+        return AREA_INDEX.find_id(city_name)
 
     def search(items):
         for item in items:
@@ -15,4 +87,21 @@ def find_city_id(city_name, areas=None):
                     return result
         return None
 
-    return search(areas)
\ No newline at end of file
+    return search(areas)
+
+
+def find_city_name(city_id, areas=None):
+    if areas is None:
+        return AREA_INDEX.find_name(city_id)
+
+    def search(items):
+        for item in items:
+            if item["id"] == city_id:
+                return item["name"]
+            if "areas" in item:
+                result = search(item["areas"])
+                if result:
+                    return result
+        return None
+
+    return search(areas)
@@ -0,0 +1,58 @@
+import os
+
+# Base URL of HH API. Can be pointed to a local stand-in (see `benchmarks/fake_hh.py`)
+HH_API_URL = os.environ.get("HH_API_URL", "https://api.hh.ru").rstrip("/")
+
+# HH search returns at most this many results per query, broader queries are split (see `planner.QueryPlanner`)
+SEARCH_DEPTH_LIMIT = int(os.environ.get("HH_SEARCH_DEPTH_LIMIT", "2000"))
+
+# Directory for cached datasets and the vacancy store
+CACHE_DIR = os.environ.get("HH_CACHE_DIR", os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache"))
+
+# Lifetime of cached datasets: fresh for TTL seconds, then served while being refreshed in background
+# for STALE_TTL seconds. Empty results are cached for NEGATIVE_TTL seconds. Seconds, megabytes
+CACHE_TTL = float(os.environ.get("HH_CACHE_TTL", 24 * 3600))
+CACHE_STALE_TTL = float(os.environ.get("HH_CACHE_STALE_TTL", 6 * 24 * 3600))
+CACHE_NEGATIVE_TTL = float(os.environ.get("HH_CACHE_NEGATIVE_TTL", 600))
+CACHE_MAX_MB = int(os.environ.get("HH_CACHE_MAX_MB", 1024))
+# Cache storage: "disk" (CACHE_DIR, shared by processes of one host), "memory" (per process, for tests)
+# or a Redis URL (e.g. redis://cache:6379/0) shared by all API nodes. Locks of queries being crawled
+# are kept in the same storage, so a query is crawled by one node at a time
+CACHE_BACKEND = os.environ.get("HH_CACHE_BACKEND", "disk")
+
+# Token which allows on-demand profiling of API requests (`X-Profile-Token` header). Disabled if not set
+PROFILE_TOKEN = os.environ.get("HH_PROFILE_TOKEN")
+PROFILE_DIR = os.path.join(CACHE_DIR, "profiles")
+# Number of the latest saved profiles kept in PROFILE_DIR
+PROFILE_KEEP = int(os.environ.get("HH_PROFILE_KEEP", "100"))
+
+# SuperJob API, an additional source of vacancies. The source is disabled without an app secret key
+SUPERJOB_API_URL = os.environ.get("SUPERJOB_API_URL", "https://api.superjob.ru/2.0").rstrip("/")
+SUPERJOB_APP_ID = os.environ.get("SUPERJOB_APP_ID", "")
+
+# Background refresh of popular queries (see `warmer.CacheWarmer`). Disabled if top N is 0
+WARMER_TOP_N = int(os.environ.get("HH_WARMER_TOP_N", "10"))
+# Off-peak hours of local time as "start-end", the end is excluded and may be less than the start
+WARMER_HOURS = os.environ.get("HH_WARMER_HOURS", "2-6")
+# Maximal number of requests to external APIs per warming run
+WARMER_BUDGET = int(os.environ.get("HH_WARMER_BUDGET", "5000"))
+# Popularity is counted over requests of the last days
+WARMER_PERIOD_DAYS = int(os.environ.get("HH_WARMER_PERIOD_DAYS", "7"))
+
+# Number of dataset snapshots kept per query for diffs (see `storage.VacancyStore.save_snapshot`)
+SNAPSHOT_KEEP = int(os.environ.get("HH_SNAPSHOT_KEEP", "52"))
+
+# Size of the shared pool of HTTP connections to external APIs (per host)
+HTTP_POOL_SIZE = int(os.environ.get("HH_HTTP_POOL_SIZE", "32"))
+# Timeout of requests to external APIs in seconds (to connect and between received bytes)
+HTTP_TIMEOUT = float(os.environ.get("HH_HTTP_TIMEOUT", "30"))
+
+# Logging of the package (see `logs.setup_logging`): level (DEBUG dumps DataFrames) and format, "json" or "text"
+LOG_LEVEL = os.environ.get("HH_LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("HH_LOG_FORMAT", "json")
+
+# Archive of raw responses of external APIs for reprocessing without crawling (see `archive.RawArchive`).
+# Disabled if the directory is not set
+ARCHIVE_DIR = os.environ.get("HH_ARCHIVE_DIR")
+ARCHIVE_CHUNK_MB = int(os.environ.get("HH_ARCHIVE_CHUNK_MB", "64"))
+ARCHIVE_BLOCK_RECORDS = int(os.environ.get("HH_ARCHIVE_BLOCK_RECORDS", "256"))
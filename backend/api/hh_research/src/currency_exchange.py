@@ -1,28 +1,89 @@
-import json
-from typing import Dict
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
 
 import requests
 
+from .config import CACHE_TTL
+from .http_client import get_json
+
+logger = logging.getLogger(__name__)
+
+# Rates of currencies to RUR. Zero rates are fetched from the remote server (see `RateCache`)
+DEFAULT_RATES = MappingProxyType({
+	"USD": 0.012641,
+	"EUR": 0.010831,
+	"UAH": 0.35902,
+	"RUR": 1,  # Не меняйте на RUB, т.к. это не валюта, а код валюты
+})
+
 
 class Exchanger:
 	__EXCHANGE_URL = "https://api.exchangerate-api.com/v4/latest/RUB"
 	
-	def update_exchange_rates(self, rates: Dict):
-		"""Parse exchange rates for RUB, USD, EUR and save them to `rates`
+	def get_rates(self, currencies) -> Dict:
+		"""Fetch exchange rates of `currencies` to RUB (RUB is returned as RUR)
 
 		Parameters
 		----------
-		rates : dict
-			Dict of currencies. For example: {"RUB": 1, "USD": 0.001}
+		currencies : iterable of str
+			Currency codes. For example: ("RUB", "USD")
 		"""
 		try:
-			response = requests.get(self.__EXCHANGE_URL)
-			new_rates = response.json()["rates"]
+			new_rates = get_json(self.__EXCHANGE_URL, target="exchange_rates")["rates"]
 		except requests.exceptions.SSLError:
 			raise AssertionError("[FAIL] Cannot get exchange rate! Try later or change the host API")
-
-		for curr in rates:
-			rates[curr] = new_rates[curr]
 		
-		# Change 'RUB' to 'RUR'
-		rates["RUR"] = rates.pop("RUB")
+		rates = {}
+		for curr in currencies:
+			# Change 'RUB' to 'RUR'
+			rates["RUR" if curr == "RUB" else curr] = new_rates["RUB" if curr == "RUR" else curr]
+		return rates
+
+
+class RateCache:
+	r"""Exchange rates shared by requests.
+
+	Rates are immutable mappings: a refresh replaces the mapping, so a request keeps the rates
+	it started with. Rates are fetched from the remote server only if some of the initial rates
+	are zero, at most once per `ttl`.
+
+	Parameters
+	----------
+	initial : mapping
+		Initial rates, e.g. `DEFAULT_RATES`.
+	ttl : float
+		Lifetime of fetched rates, seconds.
+	exchanger : Exchanger, optional
+		Source of remote rates.
+
+	"""
+
+	def __init__(
+			self, initial: Mapping = DEFAULT_RATES, ttl: float = CACHE_TTL, exchanger: Optional[Exchanger] = None
+	):
+		self._initial = MappingProxyType(dict(initial))
+		self._rates = self._initial
+		self._ttl = ttl
+		self._exchanger = exchanger or Exchanger()
+		self._fetched_at: Optional[float] = None
+		self._lock = threading.Lock()
+
+	def get(self) -> Mapping:
+		if all(self._initial.values()):
+			return self._rates
+		with self._lock:
+			if self._fetched_at is None or time.monotonic() - self._fetched_at >= self._ttl:
+				logger.info("Trying to get exchange rates from remote server")
+				try:
+					self._rates = MappingProxyType(self._exchanger.get_rates(self._initial))
+				except Exception as e:
+					# Previous rates are better than an error
+					logger.warning("Exchange rates are not updated: %s", e)
+				self._fetched_at = time.monotonic()
+			return self._rates
+
+
+RATES = RateCache()
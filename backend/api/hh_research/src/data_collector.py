@@ -1,226 +1,24 @@
+import contextvars
 import hashlib
-import os
-import pickle
+import html
+import logging
 import re
-from concurrent.futures import ThreadPoolExecutor
-from typing import Dict, Optional
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
 from urllib.parse import urlencode
 
-import requests
-from tqdm import tqdm
-
-
-def parse_superjob(text: str) -> Dict[str, str]:
-	url = "https://api.superjob.ru/2.0/vacancies/"
-	params = {
-		"page": 0,
-		"count": 3,
-		"keyword": text,
-		"sort_new": 1,
-	}
-	headers = {
-		"X-Api-App-Id": "v3.h.4905791.f72938d0c57d8956a4524c02a06d50409fcb4198.0e4294e23cc795178fe05e210746a2aa21881acc"
-	}
-	
-	response = requests.get(url, params=params, headers=headers)
-	response_data = response.json()
-	
-	transformed_vacancies = [
-		transform_superjob_to_hh(vacancy) for vacancy in response_data["objects"]
-	]
+from .cache import DATASET_CACHE, CacheEntry, CacheManager
+from .progress import CRAWLS, CrawlProgress
+from .sampling import stratified_sample
+from .sources import SOURCES, HHSource, VacancySource, normalize_text, salary_bucket, similar_salary
+from .storage import VacancyStore, utc_now
 
+logger = logging.getLogger(__name__)
 
-CACHE_DIR = os.path.join(os.path.abspath(os.path.dirname(__file__)), "cache")
-
-
-def transform_superjob_to_hh(sj_vacancy):
-	# Преобразование даты
-	from datetime import datetime
-	
-	published_at = datetime.fromtimestamp(sj_vacancy.get("date_published", 0)).strftime(
-		"%Y-%m-%dT%H:%M:%S+0300"
-	)
-	
-	# Преобразование зарплаты
-	salary_from = sj_vacancy.get("payment_from")
-	salary_to = sj_vacancy.get("payment_to")
-	salary = None
-	salary_range = None
-	
-	if salary_from or salary_to:
-		salary = {
-			"from": salary_from if salary_from else None,
-			"to": salary_to if salary_to else None,
-			"currency": sj_vacancy.get("currency", "RUR").upper(),
-			"gross": False,  # По умолчанию в SuperJob
-		}
-		
-		salary_range = {
-			"from": salary_from if salary_from else None,
-			"to": salary_to if salary_to else None,
-			"currency": sj_vacancy.get("currency", "RUR").upper(),
-			"gross": True,
-			"mode": {"id": "MONTH", "name": "За месяц"},
-			"frequency": {"id": "MONTHLY", "name": "Раз в месяц"},
-		}
-	
-	# Преобразование опыта работы
-	experience_map = {
-		1: {"id": "between1And3", "name": "От 1 года до 3 лет"},
-		2: {"id": "between1And3", "name": "От 1 года до 3 лет"},
-		3: {"id": "between3And6", "name": "От 3 до 6 лет"},
-		4: {"id": "moreThan6", "name": "Более 6 лет"},
-		5: {"id": "noExperience", "name": "Нет опыта"},
-	}
-	experience = experience_map.get(
-		sj_vacancy.get("experience", {}).get("id", 0), {"id": None, "name": None}
-	)
-	
-	# Преобразование графика работы
-	schedule_map = {
-		6: {"id": "fullDay", "name": "Полный день"},
-		7: {"id": "shift", "name": "Сменный график"},
-		8: {"id": "flexible", "name": "Гибкий график"},
-		9: {"id": "remote", "name": "Удаленная работа"},
-		10: {"id": "flyInFlyOut", "name": "Вахтовый метод"},
-	}
-	schedule = schedule_map.get(
-		sj_vacancy.get("type_of_work", {}).get("id", 0), {"id": None, "name": None}
-	)
-	
-	# Преобразование типа занятости
-	employment_map = {
-		0: {"id": "full", "name": "Полная занятость"},
-		1: {"id": "part", "name": "Частичная занятость"},
-		2: {"id": "project", "name": "Проектная работа"},
-		3: {"id": "volunteer", "name": "Волонтерство"},
-		4: {"id": "probation", "name": "Стажировка"},
-	}
-	employment = employment_map.get(
-		sj_vacancy.get("place_of_work", {}).get("id", 0),
-		{"id": "full", "name": "Полная занятость"},
-	)
-	
-	# Преобразование работодателя
-	employer = {
-		"id": str(sj_vacancy.get("id_client", "")),
-		"name": sj_vacancy.get("firm_name", ""),
-		"url": f"https://api.hh.ru/employers/{sj_vacancy.get('id_client', '')}",
-		"alternate_url": sj_vacancy.get("client", {}).get("link", ""),
-		"logo_urls": (
-			{
-				"original": sj_vacancy.get("client_logo", ""),
-				"90": sj_vacancy.get("client_logo", ""),
-				"240": sj_vacancy.get("client_logo", ""),
-			}
-			if sj_vacancy.get("client_logo")
-			else None
-		),
-		"vacancies_url": f"https://api.hh.ru/vacancies?employer_id={sj_vacancy.get('id_client', '')}",
-		"accredited_it_employer": False,
-		"trusted": True,
-	}
-	
-	# Преобразование города
-	area = {
-		"id": str(sj_vacancy.get("town", {}).get("id", "")),
-		"name": sj_vacancy.get("town", {}).get("title", ""),
-		"url": f"https://api.hh.ru/areas/{sj_vacancy.get('town', {}).get('id', '')}",
-	}
-	
-	# Создание итогового объекта вакансии
-	transformed = {
-		"id": str(sj_vacancy.get("id", "")),
-		"premium": False,
-		"billing_type": {"id": "standard", "name": "Стандарт"},
-		"relations": [],
-		"name": sj_vacancy.get("profession", ""),
-		"insider_interview": None,
-		"response_letter_required": False,
-		"area": area,
-		"salary": salary,
-		"salary_range": salary_range,
-		"type": {"id": "open", "name": "Открытая"},
-		"address": (
-			{"raw": sj_vacancy.get("address", "")}
-			if sj_vacancy.get("address")
-			else None
-		),
-		"allow_messages": True,
-		"experience": experience,
-		"schedule": schedule,
-		"employment": employment,
-		"department": None,
-		"show_contacts": not sj_vacancy.get("contacts_hidden", True),
-		"contacts": (
-			{"phone": sj_vacancy.get("phone", ""), "email": None}
-			if sj_vacancy.get("phone")
-			else None
-		),
-		"description": sj_vacancy.get("vacancyRichText", ""),
-		"branded_description": None,
-		"vacancy_constructor_template": None,
-		"key_skills": [],  # Нет информации о навыках в исходных данных
-		"accept_handicapped": True,
-		"accept_kids": False,
-		"archived": sj_vacancy.get("is_archive", False),
-		"response_url": None,
-		"specializations": [],
-		"professional_roles": (
-			[{"id": "96", "name": "Программист, разработчик"}]
-			if "python" in sj_vacancy.get("profession", "").lower()
-			   or "разработ" in sj_vacancy.get("profession", "").lower()
-			else []
-		),
-		"code": None,
-		"hidden": False,
-		"quick_responses_allowed": False,
-		"driver_license_types": [],
-		"accept_incomplete_resumes": False,
-		"employer": employer,
-		"published_at": published_at,
-		"created_at": published_at,
-		"initial_created_at": published_at,
-		"negotiations_url": None,
-		"suitable_resumes_url": None,
-		"apply_alternate_url": sj_vacancy.get("link", ""),
-		"has_test": False,
-		"test": None,
-		"alternate_url": sj_vacancy.get("link", ""),
-		"working_days": [],
-		"working_time_intervals": [],
-		"working_time_modes": [],
-		"accept_temporary": True,
-		"languages": [],
-		"approved": True,
-		"employment_form": {"id": "FULL", "name": "Полная"},
-		"fly_in_fly_out_duration": [],
-		"internship": False,
-		"night_shifts": False,
-		"work_format": [
-			{
-				"id": (
-					"REMOTE"
-					if sj_vacancy.get("place_of_work", {}).get("id") == 2
-					else "OFFICE"
-				),
-				"name": (
-					"Удалённо"
-					if sj_vacancy.get("place_of_work", {}).get("id") == 2
-					else "В офисе"
-				),
-			}
-		],
-		"work_schedule_by_days": (
-			[{"id": "FIVE_ON_TWO_OFF", "name": "5/2"}]
-			if sj_vacancy.get("type_of_work", {}).get("id") == 6
-			else []
-		),
-		"working_hours": [{"id": "HOURS_8", "name": "8 часов"}],
-		"show_logo_in_search": None,
-	}
-	
-	return transformed
+_HTML_TAGS = re.compile(r"<[^>]*>")
 
 
 class DataCollector:
@@ -230,13 +28,20 @@ class DataCollector:
 	----------
 	exchange_rates : dict
 		Dict of exchange rates: RUR, USD, EUR.
+	store : VacancyStore, optional
+		Vacancy warehouse. Every crawled dataset is upserted into it.
+	sources : sequence of str
+		Names of vacancy sources (see `sources.SOURCES`) crawled concurrently. Vacancies
+		posted to several sources are merged, the first source has priority.
+	cache : CacheManager
+		Cache of parsed datasets.
 
 	"""
-	__API_BASE_URL = "https://api.hh.ru/vacancies/"
+	__DEFAULT_SOURCES = ("hh",)
 	__DICT_KEYS = (
 		"Ids",
-		"Employer",
 		"Name",
+		"Employer",
 		"Salary",
 		"From",
 		"To",
@@ -244,14 +49,31 @@ class DataCollector:
 		"Schedule",
 		"Keys",
 		"Description",
+		"Area",
+		"Published",
 	)
 	
-	def __init__(self, exchange_rates: Optional[Dict]):
+	def __init__(
+			self,
+			exchange_rates: Optional[Dict],
+			store: Optional[VacancyStore] = None,
+			sources: Sequence[str] = __DEFAULT_SOURCES,
+			cache: CacheManager = DATASET_CACHE,
+	):
 		self._rates = exchange_rates
+		self._store = store
+		self._cache = cache
+		unknown = set(sources) - set(SOURCES)
+		if unknown:
+			raise ValueError(f"Unknown vacancy sources: {sorted(unknown)}, expected some of {list(SOURCES)}")
+		self._source_names = tuple(dict.fromkeys(sources))
+		self._sources: List[VacancySource] = [SOURCES[name]() for name in self._source_names]
+		self._hh = next((x for x in self._sources if isinstance(x, HHSource)), None) or HHSource()
 	
 	@staticmethod
 	def clean_tags(html_text: str) -> str:
-		"""Remove HTML tags from the string
+		"""Convert HTML to normalized text: strip tags, decode entities, collapse whitespace
+		and lowercase. Applied once when a vacancy is parsed, so analyzers work with clean text.
 
 		Parameters
 		----------
@@ -261,11 +83,15 @@ class DataCollector:
 		Returns
 		-------
 		result: string
-			Clean text without HTML tags
+			Clean lowercase text without HTML tags and entities
 
 		"""
-		pattern = re.compile("<.*?>")
-		return re.sub(pattern, "", html_text)
+		# Each step is a C-level scan; a single regex with a Python callback per match is much slower
+		text = _HTML_TAGS.sub(" ", html_text)
+		if "&" in text:
+			text = html.unescape(text)
+		# str.split also drops non-breaking spaces decoded from `&nbsp;`
+		return " ".join(text.lower().split())
 	
 	@staticmethod
 	def __convert_gross(is_gross: bool) -> float:
@@ -273,9 +99,11 @@ class DataCollector:
 	
 	def get_vacancy(self, vacancy_id: str):
 		# Get data from URL
-		url = f"{self.__API_BASE_URL}{vacancy_id}"
-		vacancy = requests.get(url).json()
-		# print(vacancy)
+		return self.parse_vacancy(self._hh.get(vacancy_id))
+	
+	def parse_vacancy(self, vacancy: Dict):
+		"""Extract useful fields from vacancy JSON in HH API format (see `__DICT_KEYS`)"""
+		vacancy_id = vacancy["id"]
 		
 		# Extract salary
 		salary = vacancy.get("salary")
@@ -303,8 +131,14 @@ class DataCollector:
 			vacancy.get("schedule", {}).get("name", ""),
 			[el["name"] for el in vacancy.get("key_skills", [])],
 			self.clean_tags(vacancy.get("description", "")),
+			(vacancy.get("area") or {}).get("name", ""),
+			vacancy.get("published_at"),
 		)
 	
+	def parse_vacancies(self, vacancies: Iterable[Dict]) -> Dict:
+		"""Dataset (column -> values, as `collect_vacancies` returns) of vacancy JSONs in HH API format"""
+		return self._to_dataset([self.parse_vacancy(x) for x in vacancies])
+	
 	@staticmethod
 	def __encode_query_for_url(query: Optional[Dict]) -> str:
 		# if 'professional_roles' in query:
@@ -316,13 +150,76 @@ class DataCollector:
 		
 		return urlencode(query)
 	
+	def dataset_key(self, query: Optional[Dict]) -> str:
+		"""Return the key of the cached dataset (and of the query in the store) for the query."""
+		cache_name = self.__encode_query_for_url(query)
+		if self._source_names != self.__DEFAULT_SOURCES:
+			cache_name += "&" + urlencode({"sources": ",".join(self._source_names)})
+		return hashlib.md5(cache_name.encode()).hexdigest()
+	
+	def _collect_from(
+			self, source: VacancySource, query: Dict, num_workers: int, limit: Optional[int], previous: Dict[str, tuple],
+			progress: CrawlProgress,
+	) -> List:
+		vacancies = source.fetch(query, num_workers=num_workers, limit=limit, known=previous, progress=progress)
+		jobs_list = []
+		for vacancy in vacancies:
+			# Known vacancies come as {"id": ...} stubs and are taken from the previous dataset
+			if len(vacancy) == 1 and vacancy["id"] in previous:
+				parsed = previous[vacancy["id"]]
+				progress.add_parsed(parsed)
+			else:
+				# Fetched vacancies are parsed on arrival
+				parsed = progress.get(vacancy["id"]) or self.parse_vacancy(vacancy)
+			jobs_list.append(parsed)
+		return jobs_list
+	
+	@staticmethod
+	def merge_duplicates(jobs_per_source: List[List]) -> List:
+		"""Merge vacancies posted to several sources.
+
+		Vacancies of different sources are duplicates if normalized employer and title are
+		equal and average salaries differ less than by 10%. Candidates are looked up by a hash
+		key (employer, title, salary bucket), so the check is linear. The vacancy of the first
+		source is kept, key skills are united and an empty description is filled.
+
+		"""
+		# vac: (id, name, employer, salary_bool, from, to, experience, schedule, keys, description, area, published)
+		merged = []
+		index: Dict[tuple, List[int]] = {}
+		for source_idx, jobs in enumerate(jobs_per_source):
+			used = set()
+			for vac in jobs:
+				name, employer = normalize_text(vac[1]), normalize_text(vac[2])
+				bucket = salary_bucket(vac[4], vac[5])
+				found = None
+				if source_idx > 0:
+					neighbours = (None,) if bucket is None else (bucket - 1, bucket, bucket + 1)
+					for key in ((employer, name, x) for x in neighbours):
+						for pos in index.get(key, []):
+							if pos not in used and similar_salary(merged[pos][4:6], vac[4:6]):
+								found = pos
+								break
+						if found is not None:
+							break
+				if found is None:
+					index.setdefault((employer, name, bucket), []).append(len(merged))
+					merged.append(vac)
+					continue
+				used.add(found)
+				primary = merged[found]
+				keys = list(dict.fromkeys(list(primary[8]) + list(vac[8])))
+				merged[found] = primary[:8] + (keys, primary[9] or vac[9]) + primary[10:]
+		return merged
+	
 	def collect_vacancies(
 			self,
 			query: Optional[Dict],
 			refresh: bool = False,
 			num_workers: int = 1,
 			filters: Optional[Dict] = None,
-			limit: Optional[int] = None
+			limit: Optional[int] = None,
+			incremental: bool = False,
 	) -> Dict:
 		"""Parse vacancy JSON: get vacancy name, salary, experience etc.
 
@@ -331,13 +228,19 @@ class DataCollector:
 		query : dict
 			Search query params for GET requests.
 		refresh :  bool
-			Refresh cached data
+			Refresh cached data. Without refresh, expired (stale) datasets are returned
+			and refreshed in background.
 		num_workers :  int
 			Number of workers for threading.
 		filters : dict
 			Фильтры для вакансий (название, зарплата, опыт, навыки).
 		limit : int
-			Лимит количества вакансий.
+			Лимит количества вакансий. Cached datasets record their completeness: a limited
+			request is served by slicing a complete (or a larger limited) dataset, a smaller
+			limited dataset is extended, details of its vacancies are not fetched again.
+		incremental : bool
+			On refresh, fetch details only of vacancies which are not in the cached dataset.
+			Vacancies which were already cached are not updated.
 
 		Returns
 		-------
@@ -345,95 +248,366 @@ class DataCollector:
 			Dict of useful arguments from vacancies
 
 		"""
+		dataset, _ = self.collect_dataset(query, refresh, num_workers, filters, limit, incremental)
+		return dataset
+	
+	def collect_dataset(
+			self,
+			query: Optional[Dict],
+			refresh: bool = False,
+			num_workers: int = 1,
+			filters: Optional[Dict] = None,
+			limit: Optional[int] = None,
+			incremental: bool = False,
+	) -> Tuple[Dict, Optional[str]]:
+		"""`collect_vacancies` with the version of the returned dataset (see `dataset_version`).
+		A cached dataset crawled by another node is saved to the store first (see `_sync_store`),
+		so aggregates read from the store of this version match the dataset."""
 		if num_workers is None or num_workers < 1:
 			num_workers = 1
 		
-		url_params = self.__encode_query_for_url(query)
-		
 		# Get cached data if exists...
-		cache_name: str = url_params
-		cache_hash = hashlib.md5(cache_name.encode()).hexdigest()
-		cache_file = os.path.join(CACHE_DIR, cache_hash)
+		cache_hash = self.dataset_key(query)
+		crawl_limit = limit
+		entry = self._cache.get(cache_hash, record=not refresh)
+		if entry is not None:
+			dataset, cached_limit = self._cached_dataset(entry)
+			if not refresh and self._covers(cached_limit, limit):
+				logger.info("Get results from cache, enable refresh option to update results", extra={"dataset": cache_hash})
+				if entry.stale:
+					self._revalidate(query, num_workers, cached_limit)
+				return self._select(dataset, filters, limit), self._sync_store(cache_hash, query, entry)
+			# A cached dataset is never narrowed; a smaller limited one is extended
+			crawl_limit = None if limit is None or cached_limit is None else max(limit, cached_limit)
+			incremental = incremental or not refresh
+		
+		# Only one crawl of a query at a time, concurrent requests take its result
+		started_at = time.time()
+		with self._cache.lock(cache_hash):
+			entry = self._cache.get(cache_hash, record=False)
+			if entry is not None and entry.created_at >= started_at:
+				dataset, cached_limit = self._cached_dataset(entry)
+				if self._covers(cached_limit, limit):
+					return self._select(dataset, filters, limit), self._sync_store(cache_hash, query, entry)
+			dataset, version = self._crawl(query, num_workers, crawl_limit, incremental)
+			return self._select(dataset, filters, limit), version
+	
+	@staticmethod
+	def _covers(cached_limit: Optional[int], limit: Optional[int]) -> bool:
+		"""A dataset crawled with `cached_limit` (None - complete) contains the result of `limit`."""
+		return cached_limit is None or (limit is not None and limit <= cached_limit)
+	
+	@staticmethod
+	def _cached_dataset(entry: CacheEntry) -> Tuple[Dict, Optional[int]]:
+		"""Dataset of a cache entry and the limit it was crawled with (None for a complete dataset)."""
+		if "dataset" in entry.value:
+			return entry.value["dataset"], entry.value["limit"]
+		# Entries cached before completeness was recorded may be truncated by a limit
+		return entry.value, len(entry.value["Ids"])
+	
+	def dataset_version(self, query: Optional[Dict], num_workers: int = 1) -> Optional[str]:
+		"""Version of the cached dataset of the query (UTC time of its crawl), None if it is not cached.
+
+		Requests answered by the version alone (HTTP 304, cached statistics) do not call
+		`collect_vacancies`, so a stale dataset is revalidated in background here as well.
+
+		"""
+		cache_hash = self.dataset_key(query)
+		entry = self._cache.get(cache_hash, record=False)
+		if entry is None:
+			return None
+		_, cached_limit = self._cached_dataset(entry)
+		if entry.stale:
+			self._revalidate(query, max(num_workers or 1, 1), cached_limit)
+		version = self._entry_version(entry)
+		# Datasets cached before versions were recorded
+		if version is None and self._store is not None:
+			version = self._store.dataset_version(cache_hash)
+		return version
+	
+	@staticmethod
+	def _entry_version(entry: CacheEntry) -> Optional[str]:
+		return entry.value.get("crawled_at") if "dataset" in entry.value else None
+	
+	def _sync_store(self, cache_hash: str, query: Dict, entry: CacheEntry) -> Optional[str]:
+		"""Save a cached dataset to the store unless the store has this version of it, returns the version.
+
+		With a cache backend shared by nodes the dataset may have been crawled by another node,
+		while the store of this node still holds an older dataset of the query.
+
+		"""
+		version = self._entry_version(entry)
+		if self._store is None:
+			return version
+		stored = self._store.dataset_version(cache_hash)
+		# Datasets cached before versions were recorded are saved only if the query is not in the store
+		if stored is None or (version is not None and stored < version):
+			dataset, cached_limit = self._cached_dataset(entry)
+			self._save_to_store(
+				cache_hash, self.__encode_query_for_url(query), dataset, snapshot=cached_limit is None,
+				crawled_at=version,
+			)
+			stored = self._store.dataset_version(cache_hash)
+		return version or stored
+	
+	def _select(self, dataset: Dict, filters: Optional[Dict], limit: Optional[int]) -> Dict:
+		"""Apply the limit and filters of a request to a cached dataset."""
+		if limit is None and not filters:
+			return dataset
+		jobs_list = list(zip(*(dataset[k] for k in self.__DICT_KEYS)))
+		if limit is not None:
+			jobs_list = jobs_list[:limit]
+		return self._to_dataset(self._filter_jobs(jobs_list, filters))
+	
+	def collect_sample(
+			self, query: Dict, size: int, num_workers: int = 1, seed: int = 0, refresh: bool = False
+	) -> Dict:
+		"""Collect a stratified random sample of vacancies of the query.
+
+		All search result pages are listed, but details are fetched only for `size` vacancies
+		drawn within strata of experience and salary presence, which are known from the search
+		items. Samples are cached like datasets, they are not saved to the store.
+
+		Parameters
+		----------
+		query : dict
+			Search query params for GET requests.
+		size : int
+			Sample size.
+		num_workers : int
+			Number of workers for threading.
+		seed : int
+			Seed of the sample.
+		refresh : bool
+			Draw a new sample of the current search results instead of a cached one.
+
+		Returns
+		-------
+		dict
+			`vacancies` (dataset of sampled vacancies, as `collect_vacancies` returns),
+			`codes` and `weights` (stratum codes and design weights, in the order of the dataset),
+			`fraction` (sampling fraction) and `population` (number of listed vacancies).
+
+		"""
+		if self._source_names != self.__DEFAULT_SOURCES:
+			raise ValueError("Sampling is supported only for the hh source")
+		cache_hash = f"{self.dataset_key(query)}-sample-{size}-{seed}"
+		entry = None if refresh else self._cache.get(cache_hash)
+		if entry is not None and not entry.stale:
+			return entry.value
+
+		with self._cache.lock(cache_hash):
+			items = self._hh.list_items(query, num_workers=max(num_workers or 1, 1))
+			strata = [((x.get("experience") or {}).get("id"), bool(x.get("salary"))) for x in items]
+			indices, codes, weights, fraction = stratified_sample(strata, size, seed=seed)
+			ids = [items[idx]["id"] for idx in indices]
+			details = self._hh.get_many(ids, max(num_workers or 1, 1))
+			jobs_list = [self.parse_vacancy(details[x]) for x in ids]
+
+			result = {
+				"vacancies": self._to_dataset(jobs_list),
+				"codes": codes.tolist(),
+				"weights": weights.tolist(),
+				"fraction": fraction,
+				"population": len(items),
+			}
+			self._cache.set(cache_hash, result, negative=not jobs_list)
+		return result
+
+	def collect_within(
+			self,
+			query: Dict,
+			budget: float,
+			refresh: bool = False,
+			num_workers: int = 1,
+			filters: Optional[Dict] = None,
+			limit: Optional[int] = None,
+	) -> Tuple[Dict, Optional[Dict], Optional[str]]:
+		"""Collect vacancies within a time budget.
+
+		The collection runs in a background thread (`collect_in_background`). If it does not finish
+		in `budget` seconds, vacancies fetched so far by the running crawl of the query are
+		returned, and the crawl goes on to complete the cached dataset.
+
+		Parameters
+		----------
+		query : dict
+			Search query params for GET requests.
+		budget : float
+			Time budget, seconds.
+		refresh, num_workers, filters, limit
+			See `collect_vacancies`.
+
+		Returns
+		-------
+		dataset : dict
+			Dataset as `collect_vacancies` returns, possibly partial.
+		coverage : dict or None
+			None for a complete dataset, otherwise `fetched` and `expected` numbers of vacancies
+			before filters (`expected` is None while search pages are being listed) and their `ratio`.
+		version : str or None
+			Version of a complete dataset (see `collect_dataset`), None for a partial one.
+
+		"""
+		future = self.collect_in_background(query, refresh, num_workers, filters, limit)
 		try:
-			if not refresh:
-				print(f"[INFO]: Get results from cache! Enable refresh option to update results.")
-				return pickle.load(open(cache_file, "rb"))
-		except (FileNotFoundError, pickle.UnpicklingError):
+			dataset, version = future.result(timeout=budget)
+			return dataset, None, version
+		except FutureTimeout:
 			pass
 		
-		# Check number of pages...
-		target_url = self.__API_BASE_URL + "?" + url_params
-		num_pages = requests.get(target_url).json()["pages"]
+		cache_hash = self.dataset_key(query)
+		progress = CRAWLS.get(cache_hash)
+		jobs_list = progress.snapshot() if progress is not None else []
+		coverage = progress.coverage() if progress is not None else {"fetched": 0, "expected": None, "ratio": None}
+		if limit is not None:
+			jobs_list = jobs_list[:limit]
+		return self._to_dataset(self._filter_jobs(jobs_list, filters)), coverage, None
+	
+	def collect_in_background(
+			self,
+			query: Dict,
+			refresh: bool = False,
+			num_workers: int = 1,
+			filters: Optional[Dict] = None,
+			limit: Optional[int] = None,
+	) -> Future:
+		"""Run `collect_dataset` in a background thread, the future results in (dataset, version).
+		The crawl, if any, can be watched through `progress.CRAWLS` by the dataset key of the query."""
+		future = Future()
+		future.set_running_or_notify_cancel()
 		
-		# Collect vacancy IDs...
-		ids = []
-		for idx in range(num_pages + 1):
-			response = requests.get(target_url, {"page": idx})
-			data = response.json()
-			if "items" not in data:
-				break
-			ids.extend(x["id"] for x in data["items"])
+		def collect():
+			try:
+				future.set_result(self.collect_dataset(query, refresh, num_workers, filters, limit))
+			except Exception as e:
+				logger.warning("Collection of %s failed: %s", query, e)
+				future.set_exception(e)
 		
-		# Collect vacancies...
-		jobs_list = []
-		if limit and len(ids) >= limit:
-			ids = ids[:limit]
+		# Logs of the collection keep the request ID
+		threading.Thread(
+			target=contextvars.copy_context().run, args=(collect,), name=f"collect-{self.dataset_key(query)}", daemon=True
+		).start()
+		return future
+	
+	def _to_dataset(self, jobs_list: List) -> Dict:
+		if not jobs_list:
+			return {key: [] for key in self.__DICT_KEYS}
+		return {key: list(values) for key, values in zip(self.__DICT_KEYS, zip(*jobs_list))}
+	
+	def _revalidate(self, query: Dict, num_workers: int, limit: Optional[int]):
+		"""Refresh a stale dataset (crawled with `limit`) in background unless it is being refreshed already."""
+		cache_hash = self.dataset_key(query)
+		
+		def revalidate():
+			with self._cache.lock(cache_hash, blocking=False) as acquired:
+				if not acquired:
+					return
+				try:
+					self._crawl(query, num_workers, limit, incremental=True)
+				except Exception as e:
+					logger.warning("Background refresh of %s failed: %s", query, e)
 		
+		threading.Thread(
+			target=contextvars.copy_context().run, args=(revalidate,), name=f"revalidate-{cache_hash}", daemon=True
+		).start()
 	
-		jobs_list = []
-		with ThreadPoolExecutor(max_workers=num_workers) as executor:
-			for vacancy in tqdm(
-					executor.map(self.get_vacancy, ids),
-					desc="Get data via HH API",
-					ncols=100,
-					total=len(ids),
-			):
-				jobs_list.append(vacancy)
+	@staticmethod
+	def _filter_jobs(jobs_list: List, filters: Optional[Dict]) -> List:
+		if not filters:
+			return jobs_list
 		
-		# Фильтрация вакансий
-		if filters:
-			def vacancy_filter(vac):
-				# vac: (id, name, employer, salary_bool, from, to, experience, schedule, keys, description)
-				name, from_, to_, experience, keys = vac[1], vac[4], vac[5], vac[6], vac[8]
-				# Фильтр по названию
-				if filters.get("name") and filters["name"].lower() not in name.lower():
-					return False
-				# Фильтр по вилке зп
-				salary_from = filters.get("salary_from")
-				salary_to = filters.get("salary_to")
-				if salary_from is not None and (from_ is None or from_ < salary_from):
-					return False
-				if salary_to is not None and (to_ is None or to_ > salary_to):
-					return False
-				# Фильтр по опыту
-				if filters.get("experience") and filters["experience"].lower() not in experience.lower():
+		def vacancy_filter(vac):
+			# vac: (id, name, employer, salary_bool, from, to, experience, schedule, keys, description)
+			name, from_, to_, experience, keys = vac[1], vac[4], vac[5], vac[6], vac[8]
+			# Фильтр по названию
+			if filters.get("name") and filters["name"].lower() not in name.lower():
+				return False
+			# Фильтр по вилке зп
+			salary_from = filters.get("salary_from")
+			salary_to = filters.get("salary_to")
+			if salary_from is not None and (from_ is None or from_ < salary_from):
+				return False
+			if salary_to is not None and (to_ is None or to_ > salary_to):
+				return False
+			# Фильтр по опыту
+			if filters.get("experience") and filters["experience"].lower() not in experience.lower():
+				return False
+			# Фильтр по ключевым навыкам
+			if filters.get("key_skills"):
+				required_skills = set(map(str.lower, filters["key_skills"]))
+				vacancy_skills = set(map(str.lower, keys))
+				if not required_skills.issubset(vacancy_skills):
 					return False
-				# Фильтр по ключевым навыкам
-				if filters.get("key_skills"):
-					required_skills = set(map(str.lower, filters["key_skills"]))
-					vacancy_skills = set(map(str.lower, keys))
-					if not required_skills.issubset(vacancy_skills):
-						return False
-				return True
-			
-			jobs_list = list(filter(vacancy_filter, jobs_list))
+			return True
 		
-		# Лимит вакансий
-		if limit is not None:
-			jobs_list = jobs_list[:limit]
-		
-		if not jobs_list:
-			return {k: [] for k in self.__DICT_KEYS}
+		return list(filter(vacancy_filter, jobs_list))
+	
+	def _crawl(
+			self, query: Dict, num_workers: int, limit: Optional[int], incremental: bool,
+	) -> Tuple[Dict, str]:
+		"""Crawl the dataset of a query and cache it, returns the dataset and its version. Filters are
+		applied to cached datasets on read (see `_select`), so a cached dataset is the whole search
+		result or its first `limit` vacancies."""
+		cache_hash = self.dataset_key(query)
+		# Requests with a time budget read the vacancies fetched so far (see `collect_within`)
+		with CRAWLS.running(cache_hash, CrawlProgress(self.parse_vacancy)) as progress:
+			return self._crawl_with_progress(query, num_workers, limit, incremental, progress)
+	
+	def _crawl_with_progress(
+			self, query: Dict, num_workers: int, limit: Optional[int], incremental: bool, progress: CrawlProgress,
+	) -> Tuple[Dict, str]:
+		url_params = self.__encode_query_for_url(query)
+		cache_hash = self.dataset_key(query)
 		
-		unzipped_list = list(zip(*jobs_list))
+		previous = {}
+		if incremental:
+			entry = self._cache.get(cache_hash, record=False)
+			if entry is not None:
+				dataset, _ = self._cached_dataset(entry)
+				previous = {vac[0]: vac for vac in zip(*(dataset[k] for k in self.__DICT_KEYS))}
 		
-		result = {}
+		# Collect vacancies from all sources concurrently...
+		if len(self._sources) == 1:
+			jobs_list = self._collect_from(self._sources[0], query, num_workers, limit, previous, progress)
+		else:
+			with ThreadPoolExecutor(max_workers=len(self._sources)) as executor:
+				futures = [
+					executor.submit(
+						contextvars.copy_context().run, self._collect_from, source, query, num_workers, limit, previous,
+						progress,
+					)
+					for source in self._sources
+				]
+				jobs_list = self.merge_duplicates([x.result() for x in futures])
 		
-		for idx, key in enumerate(self.__DICT_KEYS):
-			result[key] = unzipped_list[idx]
+		# Лимит вакансий: набор полон, если источники нашли меньше вакансий, чем лимит
+		if limit is not None and len(jobs_list) >= limit:
+			jobs_list = jobs_list[:limit]
+		else:
+			limit = None
 		
-		pickle.dump(result, open(cache_file, "wb"))
-		return result
+		result = self._to_dataset(jobs_list)
+		# The crawl time is the version of the dataset in the cache and in the store of every node
+		crawled_at = utc_now()
+		# Empty results are cached for a short time (negative caching)
+		self._cache.set(
+			cache_hash, {"dataset": result, "limit": limit, "crawled_at": crawled_at}, negative=not jobs_list
+		)
+		self._save_to_store(cache_hash, url_params, result, snapshot=limit is None, crawled_at=crawled_at)
+		return result, crawled_at
+	
+	def _save_to_store(
+			self, query_key: str, url_params: str, result: Dict, snapshot: bool = False,
+			crawled_at: Optional[str] = None,
+	):
+		if self._store is None:
+			return
+		self._store.upsert(result)
+		self._store.record_query(query_key, url_params, result["Ids"], crawled_at)
+		# Versions for diffs are made of complete datasets only, a limited one is not comparable
+		if snapshot:
+			self._store.save_snapshot(query_key, result, version=crawled_at)
 
 
 if __name__ == "__main__":
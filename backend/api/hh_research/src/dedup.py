@@ -0,0 +1,206 @@
+import re
+import zlib
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional, Sequence
+
+from .cache import SIGNATURES_CACHE, CacheManager
+
+# numpy is imported on first use to keep API startup fast
+if TYPE_CHECKING:
+	import numpy as np
+
+_WORDS = re.compile(r"\w+")
+# Mersenne prime 2^31 - 1: a * x + b fits into uint64 for 32-bit shingle hashes
+_PRIME = (1 << 31) - 1
+
+
+class MinHasher:
+	r"""MinHash signatures of texts over word shingles.
+
+	All permutations are applied at once as a vectorized universal hash
+	`(a * x + b) mod p` over the unique shingle hashes of a text.
+
+	Parameters
+	----------
+	num_perm : int
+		Signature length (number of hash permutations).
+	shingle_size : int
+		Number of consecutive words in a shingle.
+	seed : int
+		Seed of permutations. Signatures are comparable only for equal seeds.
+
+	"""
+
+	def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+		import numpy as np
+
+		self.num_perm = num_perm
+		self.shingle_size = shingle_size
+		self.seed = seed
+		rnd = np.random.RandomState(seed)
+		self._a = rnd.randint(1, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+		self._b = rnd.randint(0, _PRIME, size=(num_perm, 1), dtype=np.uint64)
+		self._word_hashes: Dict[str, int] = {}
+
+	def _hash_words(self, words: List[str]) -> "np.ndarray":
+		import numpy as np
+
+		cache = self._word_hashes
+		hashes = []
+		for word in words:
+			value = cache.get(word)
+			if value is None:
+				value = cache[word] = zlib.crc32(word.encode())
+			hashes.append(value)
+		return np.array(hashes, dtype=np.uint64)
+
+	def signature(self, text: str) -> "np.ndarray":
+		import numpy as np
+
+		words = self._hash_words(_WORDS.findall(text.lower()))
+		if len(words) >= self.shingle_size:
+			# Combine hashes of consecutive words into 32-bit shingle hashes
+			shingles = np.zeros(len(words) - self.shingle_size + 1, dtype=np.uint64)
+			for offset in range(self.shingle_size):
+				shingles = (shingles * np.uint64(1_000_003) + words[offset:len(words) - self.shingle_size + 1 + offset])
+				shingles &= np.uint64(0xFFFFFFFF)
+		else:
+			shingles = words
+		if len(shingles) == 0:
+			return np.full(self.num_perm, _PRIME, dtype=np.uint64)
+		shingles = np.unique(shingles)
+		return ((self._a * shingles + self._b) % np.uint64(_PRIME)).min(axis=1)
+
+
+def lsh_bands(threshold: float, num_perm: int = 128, recall: float = 0.9) -> int:
+	"""Number of LSH bands for a similarity threshold.
+
+	Texts with similarity `s` share a band (are candidates) with probability `1 - (1 - s^rows)^bands`.
+	The split of `num_perm` with the fewest bands, i.e. the fewest candidates to check, with which
+	texts at the threshold are candidates with probability `recall` is taken.
+
+	"""
+	splits = [bands for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+	for bands in splits:
+		if 1 - (1 - threshold ** (num_perm // bands)) ** bands >= recall:
+			return bands
+	return splits[-1]
+
+
+class LSHIndex:
+	r"""Locality-sensitive hashing index over MinHash signatures.
+
+	Signatures are split into `bands`; texts sharing any band are candidates and are
+	compared by estimated Jaccard similarity. Only representatives (first occurrences)
+	are indexed, so lookups stay near-linear in the number of texts.
+
+	Parameters
+	----------
+	num_perm : int
+		Signature length, must be divisible by `bands`.
+	bands : int, optional
+		Number of bands. More bands find candidates with lower similarity.
+		By default derived from the threshold (see `lsh_bands`).
+	threshold : float
+		Estimated Jaccard similarity at which texts are duplicates.
+
+	"""
+
+	def __init__(self, num_perm: int = 128, bands: Optional[int] = None, threshold: float = 0.8):
+		if bands is None:
+			bands = lsh_bands(threshold, num_perm)
+		if num_perm % bands:
+			raise ValueError(f"num_perm ({num_perm}) must be divisible by bands ({bands})")
+		self.rows = num_perm // bands
+		self.bands = bands
+		self.threshold = threshold
+		self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+		self._signatures: Dict[str, "np.ndarray"] = {}
+
+	def add(self, key: str, signature: "np.ndarray") -> Optional[str]:
+		"""Add a text to the index.
+
+		Returns
+		-------
+		str or None
+			Key of the indexed text which is a near-duplicate of this one. The text itself is
+			indexed only if no duplicate was found.
+
+		"""
+		band_keys = [signature[idx * self.rows:(idx + 1) * self.rows].tobytes() for idx in range(self.bands)]
+		checked = set()
+		for band, band_key in zip(self._buckets, band_keys):
+			for candidate in band.get(band_key, ()):
+				if candidate in checked:
+					continue
+				checked.add(candidate)
+				if (self._signatures[candidate] == signature).mean() >= self.threshold:
+					return candidate
+
+		self._signatures[key] = signature
+		for band, band_key in zip(self._buckets, band_keys):
+			band.setdefault(band_key, []).append(key)
+		return None
+
+
+def load_signatures(dataset_key: str, cache: CacheManager = SIGNATURES_CACHE) -> Dict[str, "np.ndarray"]:
+	entry = cache.get(dataset_key)
+	return entry.value if entry is not None else {}
+
+
+def save_signatures(dataset_key: str, signatures: Dict[str, "np.ndarray"], cache: CacheManager = SIGNATURES_CACHE):
+	cache.set(dataset_key, signatures)
+
+
+def find_duplicates(
+		ids: Sequence[str],
+		texts: Iterable[str],
+		threshold: float = 0.8,
+		dataset_key: Optional[str] = None,
+		num_perm: int = 128,
+		bands: Optional[int] = None,
+) -> Dict[str, str]:
+	"""Find near-duplicate texts with MinHash and LSH.
+
+	Parameters
+	----------
+	ids : sequence of str
+		Text IDs (vacancy IDs). The first text of a group of duplicates is kept.
+	texts : iterable of str
+		Texts (cleaned vacancy descriptions). Texts without words are never duplicates.
+	threshold : float
+		Estimated Jaccard similarity of word shingles at which texts are duplicates.
+	dataset_key : str, optional
+		Key for cached signatures (`SIGNATURES_CACHE`). Signatures are computed only for IDs which
+		are not in cache, so repeated calls on a growing dataset hash only new vacancies.
+	num_perm, bands : int
+		MinHash signature length and number of LSH bands (by default derived from the threshold).
+
+	Returns
+	-------
+	dict
+		Duplicate ID -> ID of the kept text.
+
+	"""
+	signatures = load_signatures(dataset_key) if dataset_key else {}
+	hasher: Optional[MinHasher] = None
+	index = LSHIndex(num_perm=num_perm, bands=bands, threshold=threshold)
+	duplicates = {}
+	updated = False
+	for key, text in zip(ids, texts):
+		key = str(key)
+		# Signatures of empty texts are equal, but such texts are not similar
+		if not text or not _WORDS.search(text):
+			continue
+		signature = signatures.get(key)
+		if signature is None or len(signature) != num_perm:
+			if hasher is None:
+				hasher = MinHasher(num_perm=num_perm)
+			signature = signatures[key] = hasher.signature(text)
+			updated = True
+		original = index.add(key, signature)
+		if original is not None:
+			duplicates[key] = original
+
+	if dataset_key and updated:
+		save_signatures(dataset_key, signatures)
+	return duplicates
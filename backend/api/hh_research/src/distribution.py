@@ -0,0 +1,111 @@
+from typing import TYPE_CHECKING, Dict, Optional
+
+# numpy is imported on first use to keep API startup fast
+if TYPE_CHECKING:
+	import numpy as np
+
+# Number of unique values evaluated at once by the KDE, bounds memory to KDE_CHUNK * points floats
+KDE_CHUNK = 4096
+
+
+def histogram(values: "np.ndarray", bins: int = 14, log: bool = False) -> Dict:
+	"""Histogram of values.
+
+	Parameters
+	----------
+	values : np.ndarray
+		Finite values (salaries).
+	bins : int
+		Number of bins of equal width.
+	log : bool
+		Bins of equal width on a log scale, non-positive values are skipped.
+
+	Returns
+	-------
+	dict
+		`bin_edges` (`bins + 1` values) and `counts` (`bins` values), empty lists for no data.
+
+	"""
+	import numpy as np
+
+	if log:
+		values = values[values > 0]
+	if not len(values):
+		return {"bin_edges": [], "counts": []}
+	low, high = values.min(), values.max()
+	if low == high:
+		# np.histogram widens a degenerate range by 0.5, which is meaningless for salaries
+		low, high = low * 0.95, high * 1.05 if high else 1.0
+	edges = np.geomspace(low, high, bins + 1) if log else np.linspace(low, high, bins + 1)
+	counts, _ = np.histogram(values, bins=edges)
+	return {"bin_edges": edges.round(2).tolist(), "counts": counts.tolist()}
+
+
+def kde(values: "np.ndarray", points: int = 100, log: bool = False, cut: float = 3.0) -> Optional[Dict]:
+	"""Gaussian kernel density estimate with Scott's bandwidth (as in `seaborn.histplot(kde=True)`).
+
+	Salaries are mostly round numbers, so the kernels are summed over unique values weighted
+	by their counts: the cost is `points * unique values` instead of `points * values`.
+
+	Parameters
+	----------
+	values : np.ndarray
+		Finite values (salaries).
+	points : int
+		Number of points of the evaluation grid.
+	log : bool
+		Estimate the density of `log10(value)`, non-positive values are skipped. The grid is
+		returned in the original units, so it is uniform on a log scale.
+	cut : float
+		The grid extends past the extreme values by `cut` bandwidths.
+
+	Returns
+	-------
+	dict or None
+		`x` (grid), `density` and `bandwidth` (in log10 units if `log`). None if there are
+		fewer than two distinct values.
+
+	"""
+	import numpy as np
+
+	if log:
+		values = np.log10(values[values > 0])
+	if len(values) < 2 or values.min() == values.max():
+		return None
+	bandwidth = values.std(ddof=1) * len(values) ** (-1 / 5)
+	grid = np.linspace(values.min() - cut * bandwidth, values.max() + cut * bandwidth, points)
+
+	unique, weights = np.unique(values, return_counts=True)
+	density = np.zeros(points)
+	for start in range(0, len(unique), KDE_CHUNK):
+		chunk = unique[start:start + KDE_CHUNK]
+		z = (grid[:, None] - chunk[None, :]) / bandwidth
+		density += np.exp(-0.5 * z * z) @ weights[start:start + KDE_CHUNK]
+	density /= len(values) * bandwidth * np.sqrt(2 * np.pi)
+
+	if log:
+		grid = 10 ** grid
+	elif grid[0] < 0 <= values.min():
+		# Salaries are non-negative, the tail below zero is only an artifact of smoothing
+		keep = grid >= 0
+		grid, density = grid[keep], density[keep]
+	# Rubles and 4 significant digits are enough for charts and keep the payload small
+	return {
+		"x": grid.round(2).tolist(),
+		"density": [float(f"{x:.4g}") for x in density],
+		"bandwidth": float(bandwidth),
+	}
+
+
+def distribution(values: "np.ndarray", bins: int = 14, log: bool = False, kde_points: int = 100) -> Dict:
+	"""Histogram and KDE of values, see `histogram` and `kde`. NaN values are skipped."""
+	import numpy as np
+
+	values = np.asarray(values, dtype=float)
+	values = values[np.isfinite(values)]
+	return {
+		"count": int((values > 0).sum() if log else len(values)),
+		"scale": "log" if log else "linear",
+		**histogram(values, bins=bins, log=log),
+		"kde": kde(values, points=kde_points, log=log),
+	}
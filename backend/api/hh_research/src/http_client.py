@@ -0,0 +1,89 @@
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from .config import HTTP_POOL_SIZE, HTTP_TIMEOUT
+from .metrics import count_http, track_thread
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+
+class BudgetExceeded(RuntimeError):
+	"""The request budget of the current context is spent (see `request_budget`)."""
+
+
+class RequestBudget:
+	"""Number of outgoing requests a job may make, shared by the threads of the job."""
+
+	def __init__(self, limit: int):
+		self.limit = limit
+		self.spent = 0
+		self._lock = threading.Lock()
+
+	@property
+	def remaining(self) -> int:
+		return self.limit - self.spent
+
+	def spend(self):
+		with self._lock:
+			if self.spent >= self.limit:
+				raise BudgetExceeded(f"Budget of {self.limit} requests is spent")
+			self.spent += 1
+
+
+_budget: ContextVar[Optional[RequestBudget]] = ContextVar("request_budget", default=None)
+
+
+@contextmanager
+def request_budget(limit: int) -> Iterator[RequestBudget]:
+	"""Limit outgoing requests of the current context: once `limit` requests are made, `get_json`
+	raises `BudgetExceeded`. Threads started with a copy of the context share the budget."""
+	budget = RequestBudget(limit)
+	token = _budget.set(budget)
+	try:
+		yield budget
+	finally:
+		_budget.reset(token)
+
+
+def open_session(pool_size: int = HTTP_POOL_SIZE) -> requests.Session:
+	"""Open the shared session: keep-alive connections to external APIs are reused by all
+	requests and threads. Without it every request opens a new connection."""
+	global _session
+	with _session_lock:
+		if _session is None:
+			session = requests.Session()
+			adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+			session.mount("http://", adapter)
+			session.mount("https://", adapter)
+			_session = session
+		return _session
+
+
+def close_session():
+	global _session
+	with _session_lock:
+		if _session is not None:
+			_session.close()
+			_session = None
+
+
+def get_json(url: str, params: Optional[Dict] = None, target: str = "hh", **kwargs) -> Any:
+	"""GET request returning decoded JSON. Calls and received bytes are counted in metrics by `target`.
+
+	Raises `requests.HTTPError` on error statuses (counted in metrics as well) and `requests.Timeout`
+	if the API does not answer within `HTTP_TIMEOUT` seconds (override with `timeout=`)."""
+	track_thread()
+	budget = _budget.get()
+	if budget is not None:
+		budget.spend()
+	kwargs.setdefault("timeout", HTTP_TIMEOUT)
+	response = (_session or requests).get(url, params=params, **kwargs)
+	count_http(target, response.status_code, len(response.content))
+	response.raise_for_status()
+	return response.json()
@@ -0,0 +1,130 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional, TextIO
+
+from .config import LOG_FORMAT, LOG_LEVEL
+
+# Root logger of the package, modules log through `logging.getLogger(__name__)`
+LOGGER_NAME = __name__.rsplit(".", 2)[0]
+
+# ID of the API request being handled, "-" outside of requests
+request_id: ContextVar[str] = ContextVar("request_id", default="-")
+
+# Attributes of every LogRecord, the rest are `extra` fields of a structured record
+_RECORD_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id"}
+
+_listener: Optional[QueueListener] = None
+_handler: Optional[QueueHandler] = None
+_lock = threading.Lock()
+
+
+def new_request_id(value: Optional[str] = None) -> str:
+	"""Set the ID of the current request (a given one, e.g. from `X-Request-ID`, or a random one)."""
+	value = (value or "").strip()[:64] or uuid.uuid4().hex[:16]
+	request_id.set(value)
+	return value
+
+
+class JsonFormatter(logging.Formatter):
+	"""One JSON object per record: time, level, logger, request ID, message and `extra` fields."""
+
+	def format(self, record: logging.LogRecord) -> str:
+		entry = {
+			"time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+			"level": record.levelname,
+			"logger": record.name,
+			"request_id": getattr(record, "request_id", "-"),
+			"message": record.getMessage(),
+		}
+		entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+		if record.exc_text:
+			entry["exception"] = record.exc_text
+		return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class _RequestQueueHandler(QueueHandler):
+	"""Enqueue records with the request ID of the calling thread; formatting is left to the listener."""
+
+	def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+		record = logging.makeLogRecord(vars(record))
+		record.request_id = request_id.get()
+		# Arguments may change after the call, only the message is resolved here
+		record.msg, record.args = record.getMessage(), None
+		if record.exc_info:
+			record.exc_text = logging.Formatter().formatException(record.exc_info)
+			record.exc_info = None
+		return record
+
+
+def setup_logging(level: str = LOG_LEVEL, fmt: str = LOG_FORMAT, stream: Optional[TextIO] = None):
+	r"""Route package logs through a queue to a background thread writing to `stream`.
+
+	Request threads only put records into the queue, formatting and console I/O happen in the
+	listener thread. Repeated calls are no-op until `stop_logging`.
+
+	Parameters
+	----------
+	level : str
+		Level of package loggers, e.g. INFO or DEBUG (DataFrame dumps).
+	fmt : str
+		"json" (a JSON object per line) or "text".
+	stream : file, optional
+		Output, stderr by default.
+
+	"""
+	global _listener, _handler
+	with _lock:
+		if _listener is not None:
+			return
+		output = logging.StreamHandler(stream or sys.stderr)
+		if fmt == "json":
+			output.setFormatter(JsonFormatter())
+		else:
+			output.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s [%(request_id)s] %(name)s: %(message)s"))
+		records = queue.SimpleQueue()
+		_handler = _RequestQueueHandler(records)
+		_listener = QueueListener(records, output, respect_handler_level=True)
+		logger = logging.getLogger(LOGGER_NAME)
+		logger.setLevel(level.upper())
+		logger.addHandler(_handler)
+		logger.propagate = False
+		_listener.start()
+	# Records queued before exit are written
+	atexit.register(stop_logging)
+
+
+def stop_logging():
+	"""Write queued records and detach the queue handler."""
+	with _lock:
+		if _listener is None:
+			return
+		_listener.stop()
+		_detach()
+
+
+def _detach():
+	global _listener, _handler
+	logging.getLogger(LOGGER_NAME).removeHandler(_handler)
+	logging.getLogger(LOGGER_NAME).propagate = True
+	_listener = _handler = None
+
+
+def _after_fork():
+	# The listener thread does not survive fork, a child process calls `setup_logging` itself
+	global _lock
+	_lock = threading.Lock()
+	if _listener is not None:
+		atexit.unregister(stop_logging)
+		_detach()
+
+
+os.register_at_fork(after_in_child=_after_fork)
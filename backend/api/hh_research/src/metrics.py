@@ -0,0 +1,178 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+_Labels = Tuple[Tuple[str, str], ...]
+
+# Per-request list of (stage, seconds). Set only while a request is profiled
+stage_trace: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("stage_trace", default=None)
+# Idents of threads working for the profiled request, sampled by the profiler. Set only while a request is profiled
+profiled_threads: ContextVar[Optional[Set[int]]] = ContextVar("profiled_threads", default=None)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _labels(labels: Optional[Dict[str, str]]) -> _Labels:
+	return tuple(sorted((labels or {}).items()))
+
+
+def _format_labels(labels: _Labels, extra: Optional[Tuple[str, str]] = None) -> str:
+	pairs = list(labels) + ([extra] if extra else [])
+	if not pairs:
+		return ""
+	escaped = (
+		f'{k}="' + str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") + '"' for k, v in pairs
+	)
+	return "{" + ",".join(escaped) + "}"
+
+
+class MetricsRegistry:
+	r"""Thread-safe registry of counters, gauges and histograms exported in Prometheus text format.
+
+	Metrics are created on first use, so instrumented code just calls `inc` / `set` / `observe`
+	with a metric name and labels.
+
+	Parameters
+	----------
+	buckets : tuple
+		Upper bounds of histogram buckets in seconds.
+
+	"""
+
+	def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+		self._buckets = buckets
+		self._lock = threading.Lock()
+		self._help: Dict[str, Tuple[str, str]] = {}
+		self._values: Dict[str, Dict[_Labels, float]] = {}
+		self._histograms: Dict[str, Dict[_Labels, list]] = {}
+
+	def _declare(self, name: str, kind: str, documentation: str):
+		if name not in self._help:
+			self._help[name] = (kind, documentation)
+
+	def inc(self, name: str, value: float = 1, labels: Optional[Dict[str, str]] = None, documentation: str = ""):
+		"""Increase a counter (or a gauge if it was declared by `set` / `add`)."""
+		with self._lock:
+			self._declare(name, "counter", documentation)
+			series = self._values.setdefault(name, {})
+			key = _labels(labels)
+			series[key] = series.get(key, 0) + value
+
+	def add(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, documentation: str = ""):
+		"""Change a gauge by `value`."""
+		with self._lock:
+			self._declare(name, "gauge", documentation)
+			series = self._values.setdefault(name, {})
+			key = _labels(labels)
+			series[key] = series.get(key, 0) + value
+
+	def set(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, documentation: str = ""):
+		"""Set a gauge value."""
+		with self._lock:
+			self._declare(name, "gauge", documentation)
+			self._values.setdefault(name, {})[_labels(labels)] = value
+
+	def observe(self, name: str, value: float, labels: Optional[Dict[str, str]] = None, documentation: str = ""):
+		"""Add an observation to a histogram."""
+		with self._lock:
+			self._declare(name, "histogram", documentation)
+			series = self._histograms.setdefault(name, {})
+			key = _labels(labels)
+			# [bucket counts..., sum, count]
+			state = series.setdefault(key, [0] * len(self._buckets) + [0.0, 0])
+			for idx, bound in enumerate(self._buckets):
+				if value <= bound:
+					state[idx] += 1
+			state[-2] += value
+			state[-1] += 1
+
+	def get(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+		"""Current value of a counter / gauge, or the number of observations of a histogram."""
+		with self._lock:
+			key = _labels(labels)
+			if name in self._histograms:
+				return self._histograms[name].get(key, [0])[-1]
+			return self._values.get(name, {}).get(key, 0)
+
+	def total(self, name: str, labels: Optional[Dict[str, str]] = None) -> float:
+		"""Sum of a counter / gauge over all series having the given labels."""
+		expected = set(_labels(labels))
+		with self._lock:
+			return sum(value for key, value in self._values.get(name, {}).items() if expected <= set(key))
+
+	def render(self) -> str:
+		"""Export all metrics in Prometheus text exposition format (version 0.0.4)."""
+		lines = []
+		with self._lock:
+			for name, (kind, documentation) in sorted(self._help.items()):
+				if documentation:
+					lines.append(f"# HELP {name} {documentation}")
+				lines.append(f"# TYPE {name} {kind}")
+				if kind == "histogram":
+					for labels, state in self._histograms.get(name, {}).items():
+						for bound, count in zip(self._buckets, state):
+							lines.append(f"{name}_bucket{_format_labels(labels, ('le', repr(bound)))} {count}")
+						lines.append(f"{name}_bucket{_format_labels(labels, ('le', '+Inf'))} {state[-1]}")
+						lines.append(f"{name}_sum{_format_labels(labels)} {state[-2]}")
+						lines.append(f"{name}_count{_format_labels(labels)} {state[-1]}")
+				else:
+					for labels, value in self._values.get(name, {}).items():
+						lines.append(f"{name}{_format_labels(labels)} {value}")
+		return "\n".join(lines) + "\n"
+
+
+METRICS = MetricsRegistry()
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+	"""Measure duration of a pipeline stage and count stages in progress.
+
+	>> with stage("detail_fetch"):
+	>>     ...
+
+	"""
+	track_thread()
+	labels = {"stage": name}
+	METRICS.add("hh_stage_in_progress", 1, labels, "Pipeline stages running right now")
+	start = time.perf_counter()
+	try:
+		yield
+	finally:
+		elapsed = time.perf_counter() - start
+		METRICS.observe("hh_stage_duration_seconds", elapsed, labels, "Duration of pipeline stages")
+		METRICS.add("hh_stage_in_progress", -1, labels)
+		trace = stage_trace.get()
+		if trace is not None:
+			trace.append((name, elapsed))
+
+
+def track_thread():
+	"""Add the current thread to the threads of the profiled request, if the context has one.
+	Thread pool tasks run in copies of the request context, so crawl threads are added by their
+	stages and outgoing requests."""
+	threads = profiled_threads.get()
+	if threads is not None:
+		threads.add(threading.get_ident())
+
+
+@contextmanager
+def job(name: str) -> Iterator[None]:
+	"""Count requests handled right now and in total."""
+	labels = {"job": name}
+	METRICS.inc("hh_jobs_total", 1, labels, "Handled jobs (API requests)")
+	METRICS.add("hh_jobs_in_progress", 1, labels, "Jobs (API requests) in progress")
+	try:
+		yield
+	finally:
+		METRICS.add("hh_jobs_in_progress", -1, labels)
+
+
+def count_http(target: str, status: int, size: int):
+	"""Count an outgoing HTTP call and the received bytes."""
+	METRICS.inc(
+		"hh_http_requests_total", 1, {"target": target, "status": str(status)}, "Outgoing HTTP requests"
+	)
+	METRICS.inc("hh_http_received_bytes_total", size, {"target": target}, "Bytes received by outgoing HTTP requests")
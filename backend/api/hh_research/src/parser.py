@@ -8,15 +8,6 @@ class Settings:
 
 	Parameters
 	----------
-	config_path : str
-		Path to config file
-	input_args : tuple
-		Command line arguments for tests.
-	no_parse : bool
-		Disable parsing arguments from command line.
-
-	Attributes
-	----------
 	options : dict
 		Options for GET request to API.
 	refresh : bool
@@ -27,16 +18,57 @@ class Settings:
 		Number of workers for threading.
 	rates : dict
 		Dict of currencies. For example: {"RUB": 1, "USD": 0.001}
+	sources : sequence of str
+		Vacancy sources, e.g. ("hh", "superjob").
+	filters : dict, optional
+		Vacancy filters (salary_from, salary_to, experience, key_skills), see `DataCollector.collect_vacancies`.
+	limit : int, optional
+		Max number of vacancies.
 	"""
 	
 	def __init__(
-			self, options: Dict, refresh: bool, num_workers: int, save_result: bool, rates: Dict
+			self, options: Dict, refresh: bool, num_workers: int, save_result: bool, rates: Dict,
+			sources: Sequence[str] = ("hh",), filters: Optional[Dict] = None, limit: Optional[int] = None,
 	):
 		self.options = options
 		self.refresh = refresh
 		self.num_workers = num_workers
 		self.save_result = save_result
 		self.rates = rates
+		self.sources = sources
+		self.filters = filters
+		self.limit = limit
+	
+	@classmethod
+	def from_args(cls, input_args: Optional[Sequence[str]] = None, options: Optional[Dict] = None) -> "Settings":
+		"""Create settings from command line arguments.
+
+		Parameters
+		----------
+		input_args : sequence of str, optional
+			Command line arguments, `sys.argv` if not set.
+		options : dict, optional
+			Default options of the search query, updated by `--text` and `--professional_roles`.
+
+		"""
+		args = cls.__parse_args(input_args)
+		options = dict(options or {})
+		for key in ("text", "professional_roles"):
+			if args[key] is not None:
+				options[key] = args[key]
+		filters = {
+			key: args[key] for key in ("salary_from", "salary_to", "experience", "key_skills") if args[key] is not None
+		}
+		return cls(
+			options=options,
+			refresh=bool(args["refresh"]),
+			num_workers=args["num_workers"] or 10,
+			save_result=bool(args["save_result"]),
+			rates={},
+			sources=tuple(args["sources"] or ("hh",)),
+			filters=filters or None,
+			limit=args["limit"],
+		)
 
 	
 	def update_params(self, **kwargs):
@@ -97,14 +129,11 @@ class Settings:
 		parser.add_argument(
 			"--limit", type=int, default=None, help="Лимит количества вакансий"
 		)
+		parser.add_argument(
+			"--sources", nargs='*', type=str, default=None, help="Источники вакансий (hh, superjob)"
+		)
 		
 		params, unknown = parser.parse_known_args(inputs_args)
 		# Update config from command line
 		return vars(params)
 
-
-if __name__ == "__main__":
-	settings = Settings(
-		config_path="../settings.json", input_args=("--num_workers", "5", "--refresh", "--text", "Data Scientist"),
-	)
-	
@@ -0,0 +1,111 @@
+import contextvars
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .config import SEARCH_DEPTH_LIMIT
+
+logger = logging.getLogger(__name__)
+
+_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+# Lower bound of publication dates when the query has no `date_from`
+_EPOCH = datetime(2000, 1, 1, tzinfo=timezone.utc)
+
+
+class QueryPlanner:
+	r"""Split a search query into partitions whose results fit into the search depth limit.
+
+	A query which finds more vacancies than `depth_limit` is partitioned recursively:
+
+	- by area subtree: the query area is replaced with its child areas, if their results
+	  cover all results of the parent (vacancies are not attached to the parent itself);
+	- by publication date window: `[date_from, date_to]` is bisected.
+
+	Salary is not a partitioning dimension: the `salary` filter of HH API matches vacancies
+	whose salary range contains the value, so it does not give disjoint ranges.
+
+	Partitions may overlap on window boundaries, results are merged by vacancy ID.
+
+	Parameters
+	----------
+	count : callable
+		Returns the number of vacancies found by a query (`found` of HH API search).
+	areas : list of dict, optional
+		HH areas tree (`/areas`). Without it queries are split only by dates.
+	depth_limit : int
+		Max number of results reachable through pagination of one query.
+	min_window : timedelta
+		Date windows are not split below this duration, such partitions stay truncated.
+	num_workers : int
+		Number of concurrent count requests.
+
+	"""
+
+	def __init__(
+			self,
+			count: Callable[[Dict], int],
+			areas: Optional[List[Dict]] = None,
+			depth_limit: int = SEARCH_DEPTH_LIMIT,
+			min_window: timedelta = timedelta(minutes=1),
+			num_workers: int = 4,
+	):
+		self._count = count
+		# Child area IDs by area ID, top-level areas (countries) are children of the whole search
+		self._children = {None: [str(x["id"]) for x in areas or []]}
+		stack = list(areas or [])
+		while stack:
+			area = stack.pop()
+			self._children[str(area["id"])] = [str(x["id"]) for x in area.get("areas") or []]
+			stack.extend(area.get("areas") or [])
+		self.depth_limit = depth_limit
+		self.min_window = min_window
+		self.num_workers = num_workers
+		self.truncated: List[Dict] = []
+
+	def plan(self, query: Dict, found: Optional[int] = None) -> List[Dict]:
+		"""Partitions of the query, each finds at most `depth_limit` vacancies (except `truncated`)."""
+		found = self._count(query) if found is None else found
+		if not found:
+			return []
+		if found <= self.depth_limit:
+			return [query]
+		for split in (self._split_area, self._split_dates):
+			parts = split(query, found)
+			if parts:
+				return [x for part, part_found in parts for x in self.plan(part, part_found)]
+		logger.warning("Query %s finds %d vacancies and can not be split, results are truncated", query, found)
+		self.truncated.append(query)
+		return [query]
+
+	def _count_all(self, queries: List[Dict]) -> List[int]:
+		with ThreadPoolExecutor(max_workers=self.num_workers) as executor:
+			futures = [executor.submit(contextvars.copy_context().run, self._count, x) for x in queries]
+			return [x.result() for x in futures]
+
+	def _split_area(self, query: Dict, found: int) -> Optional[List[Tuple[Dict, int]]]:
+		area = query.get("area")
+		children = self._children.get(str(area) if area else None)
+		if not children:
+			return None
+		parts = [{**query, "area": x} for x in children]
+		counts = self._count_all(parts)
+		# Vacancies attached to the area itself are found only by the parent query
+		if sum(counts) < found:
+			return None
+		return list(zip(parts, counts))
+
+	def _split_dates(self, query: Dict, found: int) -> Optional[List[Tuple[Dict, int]]]:
+		date_from = datetime.strptime(query["date_from"], _DATE_FORMAT) if query.get("date_from") else _EPOCH
+		date_to = (
+			datetime.strptime(query["date_to"], _DATE_FORMAT) if query.get("date_to")
+			else datetime.now(timezone.utc) + timedelta(days=1)
+		)
+		if date_to - date_from < 2 * self.min_window:
+			return None
+		middle = date_from + (date_to - date_from) / 2
+		parts = [
+			{**query, "date_from": date_from.strftime(_DATE_FORMAT), "date_to": middle.strftime(_DATE_FORMAT)},
+			{**query, "date_from": middle.strftime(_DATE_FORMAT), "date_to": date_to.strftime(_DATE_FORMAT)},
+		]
+		return list(zip(parts, self._count_all(parts)))
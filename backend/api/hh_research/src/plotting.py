@@ -0,0 +1,27 @@
+import os
+
+
+def pyplot(interactive: bool = False):
+	"""Import `matplotlib.pyplot` on first use.
+
+	Parameters
+	----------
+	interactive : bool
+		Keep the default backend (for plt.show() in command line mode). Otherwise the
+		non-interactive `Agg` backend is selected, unless `MPLBACKEND` is set explicitly.
+
+	"""
+	import matplotlib
+
+	if not interactive and "MPLBACKEND" not in os.environ:
+		matplotlib.use("Agg")
+	import matplotlib.pyplot as plt
+
+	return plt
+
+
+def seaborn():
+	"""Import `seaborn` on first use."""
+	import seaborn as sns
+
+	return sns
@@ -1,3 +1,5 @@
+import logging
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
@@ -8,6 +10,8 @@ from sklearn.feature_extraction import DictVectorizer
 from sklearn.feature_extraction.text import TfidfVectorizer
 from sklearn.linear_model import Ridge
 
+logger = logging.getLogger(__name__)
+
 
 class Predictor:
     """Predictor: getting words from vacancies (description, keywords) and
@@ -18,7 +22,7 @@ class Predictor:
     @staticmethod
     def text_replace(text) -> pd.Series:
         """Clean text"""
-        return text.apply(lambda x: [i.lower() for i in x]).replace("[^a-zA-Z]\bqout\b|\bamp\b", " ", regex=True)
+        return text.apply(lambda x: [i.lower() for i in x])
 
     @staticmethod
     def prepare_dataframe(df: pd.DataFrame) -> pd.DataFrame:
@@ -72,14 +76,14 @@ class Predictor:
         txt = self.text_replace(new_df["Keys"])
         joined_text = []
         for i, x in enumerate(txt):
-            print(f"{i :<4} {x}")
+            logger.debug("%-4d %s", i, x)
             joined_text.append(" ".join(x))
         x_train_text = tf_idf.fit_transform(joined_text)
 
         # Print top words used in keys
         idx = np.ravel(x_train_text.sum(axis=0).argsort(axis=1))[::-1][:7]
         top_words = np.array(tf_idf.get_feature_names())[idx].tolist()
-        print("Top words used in keys: {}".format(top_words))
+        logger.debug("Top words used in keys: %s", top_words)
 
         # One-hot-encoding for data frame features
         dct_enc = DictVectorizer()
@@ -96,8 +100,8 @@ class Predictor:
         x_test = df[df["From"].isna() & df["To"].isna()]
 
         # Test vectors
-        print(x_test["Description"])
-        x_desc = x_test["Description"].apply(str.lower)
+        logger.debug("Vacancies without salary:\n%s", x_test["Description"])
+        x_desc = x_test["Description"]
         joined_desc = []
         for i, x in enumerate(x_desc):
             joined_text.append(" ".join(x))
@@ -107,11 +111,9 @@ class Predictor:
 
         # Prediction model - result
         y_test = model.predict(x_test)
-        print(
-            f"[INFO]: Salary for vacancies with NaN:\n"
-            f"Average is {y_test.mean(dtype=int)}"
-            f"Maximum is {y_test.max(dtype=int)}"
-            f"Maximum is {y_test.min(dtype=int)}"
+        logger.info(
+            "Salary for vacancies with NaN: average is %d, maximum is %d, minimum is %d",
+            y_test.mean(dtype=int), y_test.max(dtype=int), y_test.min(dtype=int),
         )
 
         df_tst = x_test.drop(["Salary", "From", "To"], axis=1)
@@ -0,0 +1,151 @@
+import hmac
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+
+from .config import PROFILE_DIR, PROFILE_KEEP, PROFILE_TOKEN
+from .metrics import profiled_threads, stage_trace
+
+
+def is_profiling_allowed(token: Optional[str]) -> bool:
+	"""Check the profiling token. Profiling is disabled when `HH_PROFILE_TOKEN` is not set."""
+	if not PROFILE_TOKEN or not token:
+		return False
+	return hmac.compare_digest(token.encode(), PROFILE_TOKEN.encode())
+
+
+class SamplingProfiler:
+	r"""Statistical profiler collecting stacks in the folded format of flamegraph.pl / speedscope.
+
+	Samples the thread which started the profiler and the threads added to `threads` while
+	profiling. `profile_request` adds the threads working for the profiled request, e.g. thread
+	pool workers fetching vacancy details (see `metrics.track_thread`), while threads serving
+	other requests are not sampled. Stacks are rooted by thread name.
+
+	Parameters
+	----------
+	interval : float
+		Sampling interval in seconds.
+
+	"""
+
+	def __init__(self, interval: float = 0.005):
+		self.interval = interval
+		self.samples = 0
+		self._stacks: Counter = Counter()
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+		self.threads: Set[int] = set()
+
+	def start(self):
+		self.threads.add(threading.get_ident())
+		self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self._stop.set()
+		self._thread.join()
+
+	def _run(self):
+		own = threading.get_ident()
+		while not self._stop.wait(self.interval):
+			names = {x.ident: x.name for x in threading.enumerate()}
+			for ident, frame in sys._current_frames().items():
+				if ident == own or ident not in self.threads:
+					continue
+				stack = []
+				while frame is not None:
+					code = frame.f_code
+					stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+					frame = frame.f_back
+				stack.append(names.get(ident, str(ident)))
+				self._stacks[";".join(reversed(stack))] += 1
+			self.samples += 1
+
+	def folded(self) -> str:
+		"""Collected stacks, one `frame;frame;frame count` line per unique stack."""
+		return "\n".join(f"{stack} {count}" for stack, count in self._stacks.most_common()) + "\n"
+
+
+class RequestProfile:
+	"""Profile of a single request: sampled stacks and durations of pipeline stages."""
+
+	def __init__(self, interval: float):
+		self.id = uuid.uuid4().hex
+		self.profiler = SamplingProfiler(interval)
+		self.stages: List[Tuple[str, float]] = []
+		self.elapsed = 0.0
+
+	def save(self, output_dir: str = PROFILE_DIR, keep: int = PROFILE_KEEP) -> str:
+		"""Save folded stacks to `<output_dir>/<id>.folded` and return the path.
+		Only `keep` latest profiles are kept in the directory."""
+		os.makedirs(output_dir, exist_ok=True)
+		path = os.path.join(output_dir, f"{self.id}.folded")
+		with open(path, "w") as f:
+			f.write(self.profiler.folded())
+		_prune_profiles(output_dir, keep)
+		return path
+
+
+def _prune_profiles(output_dir: str, keep: int):
+	"""Remove saved profiles except the `keep` latest ones."""
+	profiles = []
+	for entry in os.scandir(output_dir):
+		if entry.name.endswith(".folded"):
+			try:
+				profiles.append((entry.stat().st_mtime, entry.path))
+			except FileNotFoundError:
+				continue
+	for _, path in sorted(profiles, reverse=True)[keep:]:
+		try:
+			os.remove(path)
+		except FileNotFoundError:
+			pass
+
+	def summary(self) -> Dict:
+		return {
+			"id": self.id,
+			"elapsed": round(self.elapsed, 6),
+			"samples": self.profiler.samples,
+			"interval": self.profiler.interval,
+			"stages": [{"stage": name, "seconds": round(seconds, 6)} for name, seconds in self.stages],
+		}
+
+
+@contextmanager
+def profile_request(interval: float = 0.005) -> Iterator[RequestProfile]:
+	"""Profile the code inside the block with the sampling profiler and record stage timings.
+
+	>> with profile_request() as prof:
+	>>     statistics = hh_analyzer.get_statistics(...)
+	>> prof.save()
+
+	"""
+	prof = RequestProfile(interval)
+	token = stage_trace.set(prof.stages)
+	threads_token = profiled_threads.set(prof.profiler.threads)
+	start = time.perf_counter()
+	prof.profiler.start()
+	try:
+		yield prof
+	finally:
+		prof.profiler.stop()
+		prof.elapsed = time.perf_counter() - start
+		profiled_threads.reset(threads_token)
+		stage_trace.reset(token)
+
+
+def load_profile(profile_id: str, output_dir: str = PROFILE_DIR) -> Optional[str]:
+	"""Return folded stacks of a saved profile or None if it does not exist."""
+	if not profile_id.isalnum():
+		return None
+	try:
+		with open(os.path.join(output_dir, f"{profile_id}.folded")) as f:
+			return f.read()
+	except FileNotFoundError:
+		return None
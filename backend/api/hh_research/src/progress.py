@@ -0,0 +1,112 @@
+import queue
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+
+class CrawlProgress:
+	"""Vacancies of a running crawl, visible to other requests while it runs.
+
+	Sources report the number of vacancies they are going to fetch (`expect`) and every
+	vacancy as soon as it is fetched (`add`). Vacancies are parsed once, on arrival. Known
+	vacancies of an incremental update are added already parsed (`add_parsed`).
+
+	Parameters
+	----------
+	parse : callable
+		Converts a vacancy JSON in HH API format to a parsed vacancy tuple
+		(see `DataCollector.parse_vacancy`).
+
+	"""
+
+	def __init__(self, parse: Callable[[Dict], tuple]):
+		self._parse = parse
+		self._lock = threading.Lock()
+		self._vacancies: Dict[str, tuple] = {}
+		self._expected: Dict[str, int] = {}
+		self._subscribers: List["queue.Queue[Optional[tuple]]"] = []
+		self._closed = False
+
+	def expect(self, source: str, count: int):
+		with self._lock:
+			self._expected[source] = count
+
+	def add(self, vacancy: Dict) -> tuple:
+		"""Parse a fetched vacancy and add it."""
+		parsed = self._parse(vacancy)
+		self.add_parsed(parsed)
+		return parsed
+
+	def add_parsed(self, parsed: tuple):
+		with self._lock:
+			self._vacancies[parsed[0]] = parsed
+			for subscriber in self._subscribers:
+				subscriber.put(parsed)
+
+	def subscribe(self) -> "queue.Queue[Optional[tuple]]":
+		"""Queue of parsed vacancies: all added so far, then new ones as they arrive. None marks
+		the end of the crawl."""
+		subscriber = queue.Queue()
+		with self._lock:
+			for parsed in self._vacancies.values():
+				subscriber.put(parsed)
+			if self._closed:
+				subscriber.put(None)
+			else:
+				self._subscribers.append(subscriber)
+		return subscriber
+
+	def close(self):
+		with self._lock:
+			self._closed = True
+			for subscriber in self._subscribers:
+				subscriber.put(None)
+			self._subscribers.clear()
+
+	def get(self, vacancy_id: str) -> Optional[tuple]:
+		return self._vacancies.get(vacancy_id)
+
+	def snapshot(self) -> List[tuple]:
+		"""Vacancies fetched so far."""
+		with self._lock:
+			return list(self._vacancies.values())
+
+	def coverage(self) -> Dict[str, Optional[float]]:
+		"""Numbers of `fetched` and `expected` vacancies (None until search pages are listed)
+		and their `ratio`."""
+		with self._lock:
+			fetched = len(self._vacancies)
+			expected = sum(self._expected.values()) if self._expected else None
+		return {
+			"fetched": fetched,
+			"expected": expected,
+			"ratio": round(min(fetched / expected, 1.0), 4) if expected else None,
+		}
+
+
+class CrawlRegistry:
+	"""Running crawls of this process by dataset key."""
+
+	def __init__(self):
+		self._lock = threading.Lock()
+		self._crawls: Dict[str, CrawlProgress] = {}
+
+	@contextmanager
+	def running(self, key: str, progress: CrawlProgress) -> Iterator[CrawlProgress]:
+		"""Publish the progress of a crawl while it runs."""
+		with self._lock:
+			self._crawls[key] = progress
+		try:
+			yield progress
+		finally:
+			with self._lock:
+				if self._crawls.get(key) is progress:
+					del self._crawls[key]
+			progress.close()
+
+	def get(self, key: str) -> Optional[CrawlProgress]:
+		with self._lock:
+			return self._crawls.get(key)
+
+
+CRAWLS = CrawlRegistry()
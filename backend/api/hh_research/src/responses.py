@@ -0,0 +1,123 @@
+import gzip
+import hashlib
+import json
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from typing import Any, Dict, Iterable, Optional
+
+from fastapi import Request
+from fastapi.responses import Response
+
+# Optional accelerators: orjson for serialization, brotli for compression
+try:
+	import orjson
+except ImportError:
+	orjson = None
+
+try:
+	import brotli
+except ImportError:
+	brotli = None
+
+# Smaller bodies are not worth compressing
+MIN_COMPRESS_SIZE = 1024
+
+
+def _default(obj: Any) -> Any:
+	# numpy scalars and arrays
+	if hasattr(obj, "tolist"):
+		return obj.tolist()
+	raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(data: Any) -> bytes:
+	"""Serialize to UTF-8 JSON with orjson if it is installed, numpy values are supported."""
+	if orjson is not None:
+		return orjson.dumps(data, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+	return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_default).encode()
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+	"""Pick a response encoding from the `Accept-Encoding` header: `br` (if brotli is installed),
+	`gzip` or None."""
+	accepted = {}
+	for item in accept_encoding.lower().split(","):
+		name, _, params = item.strip().partition(";")
+		quality = 1.0
+		if params.strip().startswith("q="):
+			try:
+				quality = float(params.strip()[2:])
+			except ValueError:
+				continue
+		accepted[name.strip()] = quality
+
+	candidates = (["br"] if brotli is not None else []) + ["gzip"]
+	for encoding in candidates:
+		if accepted.get(encoding, accepted.get("*", 0)) > 0:
+			return encoding
+	return None
+
+
+def json_response(
+		data: Any, request: Optional[Request] = None, status_code: int = 200, headers: Optional[Dict[str, str]] = None
+) -> Response:
+	"""Pre-serialized JSON response, compressed according to `Accept-Encoding` of the request.
+
+	FastAPI returns such responses as is, without `jsonable_encoder` and a second serialization.
+
+	"""
+	body = dumps(data)
+	headers = {**(headers or {}), "Vary": "Accept-Encoding"}
+	encoding = None
+	if request is not None and len(body) >= MIN_COMPRESS_SIZE:
+		encoding = negotiate_encoding(request.headers.get("accept-encoding", ""))
+	if encoding == "br":
+		body = brotli.compress(body, quality=4)
+	elif encoding == "gzip":
+		body = gzip.compress(body, compresslevel=5)
+	if encoding is not None:
+		headers["Content-Encoding"] = encoding
+	return Response(content=body, status_code=status_code, media_type="application/json", headers=headers)
+
+
+def sse_event(event: str, data: Any) -> bytes:
+	"""Server-Sent Event with JSON data (one line, as `dumps` never emits newlines)."""
+	return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+def caching_headers(version: str, request: Request, ignore: Iterable[str] = ("refresh", "profile")) -> Dict[str, str]:
+	"""HTTP caching headers of a response computed from a dataset.
+
+	Parameters
+	----------
+	version : str
+		Dataset version: UTC time of the crawl (`VacancyStore.dataset_version`).
+	request : Request
+		The response depends on the dataset and the query parameters except `ignore`.
+
+	Returns
+	-------
+	dict
+		`ETag` (weak, the body also depends on the negotiated encoding), `Last-Modified` and
+		`Cache-Control`, which makes clients revalidate with `If-None-Match` on every poll.
+
+	"""
+	params = sorted((k, v) for k, v in request.query_params.multi_items() if k not in ignore)
+	digest = hashlib.md5(f"{request.url.path}|{version}|{params}".encode()).hexdigest()
+	crawled_at = datetime.strptime(version, "%Y-%m-%d %H:%M:%S.%f").replace(tzinfo=timezone.utc)
+	return {
+		"ETag": f'W/"{digest}"',
+		"Last-Modified": format_datetime(crawled_at, usegmt=True),
+		"Cache-Control": "private, no-cache",
+	}
+
+
+def is_not_modified(request: Request, etag: str) -> bool:
+	"""Check `If-None-Match` of the request against the ETag (weak comparison)."""
+	header = request.headers.get("if-none-match")
+	if not header:
+		return False
+	if header.strip() == "*":
+		return True
+	tags = {x.strip().removeprefix("W/") for x in header.split(",")}
+	return etag.removeprefix("W/") in tags
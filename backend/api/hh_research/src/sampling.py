@@ -0,0 +1,164 @@
+import warnings
+from typing import TYPE_CHECKING, Dict, Hashable, Optional, Sequence, Tuple
+
+# numpy is imported on first use to keep API startup fast
+if TYPE_CHECKING:
+	import numpy as np
+
+
+def allocate(stratum_sizes: Sequence[int], size: int) -> "np.ndarray":
+	"""Proportional allocation of a sample over strata (largest remainder method).
+
+	Every non-empty stratum gets at least one unit if `size` allows, so that each stratum
+	is represented in the estimates.
+
+	"""
+	import numpy as np
+
+	sizes = np.asarray(stratum_sizes, dtype=int)
+	total = sizes.sum()
+	if size >= total:
+		return sizes.copy()
+	quotas = sizes * size / total
+	counts = np.floor(quotas).astype(int)
+	if size >= (sizes > 0).sum():
+		counts = np.maximum(counts, (sizes > 0).astype(int))
+	for idx in np.argsort(counts - quotas):
+		if counts.sum() >= size:
+			break
+		if counts[idx] < sizes[idx]:
+			counts[idx] += 1
+	return np.minimum(counts, sizes)
+
+
+def stratified_sample(
+		strata: Sequence[Hashable], size: int, seed: Optional[int] = None
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", float]:
+	"""Draw a stratified random sample without replacement.
+
+	Parameters
+	----------
+	strata : sequence
+		Stratum of every unit of the population (e.g. experience and salary presence of
+		vacancies from search result pages).
+	size : int
+		Sample size.
+	seed : int, optional
+		Seed of the random generator, a fixed seed gives the same sample of the same population.
+
+	Returns
+	-------
+	indices : np.ndarray
+		Indices of sampled units in the population.
+	codes : np.ndarray
+		Stratum codes of sampled units.
+	weights : np.ndarray
+		Design weights of sampled units: stratum size / stratum sample size.
+	fraction : float
+		Sampling fraction, used for the finite population correction.
+
+	"""
+	import numpy as np
+
+	_, codes = np.unique(np.array([str(x) for x in strata]), return_inverse=True)
+	stratum_sizes = np.bincount(codes)
+	counts = allocate(stratum_sizes, size)
+	rng = np.random.default_rng(seed)
+	indices = []
+	for code, count in enumerate(counts):
+		members = np.flatnonzero(codes == code)
+		indices.append(np.sort(rng.choice(members, size=count, replace=False)))
+	indices = np.concatenate(indices) if indices else np.array([], dtype=int)
+	weights = (stratum_sizes / np.maximum(counts, 1))[codes[indices]]
+	return indices, codes[indices], weights, len(indices) / max(len(codes), 1)
+
+
+def _weighted_mean(values: "np.ndarray", weights: "np.ndarray") -> "np.ndarray":
+	import numpy as np
+
+	# Axis 1 is the sample; NaN values are outside of the estimation domain
+	valid = ~np.isnan(values)
+	weights = np.broadcast_to(weights.reshape(weights.shape + (1,) * (values.ndim - weights.ndim)), values.shape)
+	total = (weights * valid).sum(axis=1)
+	with np.errstate(invalid="ignore", divide="ignore"):
+		return np.where(valid, values * weights, 0).sum(axis=1) / total
+
+
+def _weighted_median(values: "np.ndarray", weights: "np.ndarray") -> "np.ndarray":
+	import numpy as np
+
+	# Row-wise: sort values (NaN last), the median is the first value reaching half of the weight
+	order = np.argsort(values, axis=1)
+	values = np.take_along_axis(values, order, axis=1)
+	weights = np.where(np.isnan(values), 0, np.take_along_axis(weights, order, axis=1))
+	cumulative = weights.cumsum(axis=1)
+	half = cumulative[:, -1:] / 2
+	position = np.minimum((cumulative < half).sum(axis=1), values.shape[1] - 1)
+	result = values[np.arange(len(values)), position]
+	return np.where(cumulative[:, -1] > 0, result, np.nan)
+
+
+def estimate(
+		values: "np.ndarray",
+		codes: "np.ndarray",
+		weights: "np.ndarray",
+		statistic: str = "mean",
+		fraction: float = 0.0,
+		confidence: float = 0.95,
+		n_boot: int = 1000,
+		seed: int = 0,
+) -> Dict[str, "np.ndarray"]:
+	r"""Estimate a population statistic from a stratified sample with a confidence interval.
+
+	The interval is a percentile interval of a stratified bootstrap: units are resampled with
+	replacement within their strata, all replicates are computed at once as arrays. Deviations
+	of replicates are shrunk by the finite population correction `sqrt(1 - fraction)`.
+
+	Parameters
+	----------
+	values : np.ndarray
+		Values of sampled units, `(n,)` or `(n, k)` for `k` statistics at once (means only).
+		NaN values are outside of the estimation domain, e.g. vacancies without salary.
+	codes, weights : np.ndarray
+		Stratum codes and design weights of sampled units (see `stratified_sample`).
+	statistic : {"mean", "median"}
+		Weighted mean (also a share for 0/1 values) or weighted median.
+	fraction : float
+		Sampling fraction.
+	confidence : float
+		Confidence level of the interval.
+	n_boot : int
+		Number of bootstrap replicates.
+	seed : int
+		Seed of the bootstrap.
+
+	Returns
+	-------
+	dict
+		`estimate`, `low` and `high`, scalars or arrays of `k` values. NaN if the sample has
+		no values in the domain.
+
+	"""
+	import numpy as np
+
+	func = {"mean": _weighted_mean, "median": _weighted_median}[statistic]
+	values = np.asarray(values, dtype=float)
+	if not len(codes):
+		empty = np.full(values.shape[1:], np.nan)
+		return {"estimate": empty, "low": empty, "high": empty}
+	point = func(values[None], weights[None])[0]
+
+	rng = np.random.default_rng(seed)
+	resampled = np.empty((n_boot, len(codes)), dtype=int)
+	for code in np.unique(codes):
+		members = np.flatnonzero(codes == code)
+		resampled[:, members] = members[rng.integers(0, len(members), size=(n_boot, len(members)))]
+	replicates = func(values[resampled], weights[resampled])
+	replicates = point + (replicates - point) * np.sqrt(max(1 - fraction, 0))
+
+	alpha = (1 - confidence) / 2
+	with warnings.catch_warnings():
+		# All-NaN replicates: no values in the domain
+		warnings.simplefilter("ignore", RuntimeWarning)
+		low, high = np.nanquantile(replicates, [alpha, 1 - alpha], axis=0)
+	return {"estimate": point, "low": low, "high": high}
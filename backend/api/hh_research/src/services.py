@@ -0,0 +1,125 @@
+import logging
+import threading
+from types import MappingProxyType
+from typing import TYPE_CHECKING, Dict, FrozenSet, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from .analyzer import Analyzer, english_stop_words
+from .city_validator import AREA_INDEX, AreaIndex
+from .currency_exchange import RATES, RateCache
+from .data_collector import DataCollector
+from .http_client import close_session, open_session
+from .storage import VacancyStore
+
+# sklearn, scipy and nltk are imported on first use to keep API startup fast
+if TYPE_CHECKING:
+	from .predictor import Predictor
+
+logger = logging.getLogger(__name__)
+
+
+class SearchQuery(NamedTuple):
+	"""Immutable parameters of one request: HH API search options and how to collect them."""
+	options: Mapping
+	refresh: bool = False
+	num_workers: int = 10
+	sources: Tuple[str, ...] = ("hh",)
+	save_result: bool = False
+
+	@classmethod
+	def create(
+			cls,
+			options: Mapping,
+			refresh: bool = False,
+			num_workers: int = 10,
+			sources: Sequence[str] = ("hh",),
+			save_result: bool = False,
+	) -> "SearchQuery":
+		"""Query with a read-only copy of `options`."""
+		return cls(MappingProxyType(dict(options)), bool(refresh), num_workers, tuple(sources), bool(save_result))
+
+
+class Services:
+	r"""Long-lived services shared by all requests of the process.
+
+	Created once and started / closed by the FastAPI lifespan (see `router.lifespan`), so that
+	requests do not build their own collectors, stores and analyzers. All services are
+	thread-safe; heavy ones (vacancy store, salary predictor) are created on first use.
+
+	Parameters
+	----------
+	rates : RateCache
+		Exchange rates.
+	areas : AreaIndex
+		Area lookups by name and ID.
+
+	"""
+
+	def __init__(self, rates: RateCache = RATES, areas: AreaIndex = AREA_INDEX):
+		self.rates = rates
+		self.areas = areas
+		# Analyzers have no per-request state; saving CSV files is a CLI feature
+		self.analyzer = Analyzer(save_csv=False)
+		self._lock = threading.Lock()
+		self._store: Optional[VacancyStore] = None
+		self._predictor: Optional["Predictor"] = None
+		# Collector of every set of sources with the rates it was created with
+		self._collectors: Dict[Tuple[str, ...], Tuple[Mapping, DataCollector]] = {}
+
+	@property
+	def store(self) -> VacancyStore:
+		with self._lock:
+			if self._store is None:
+				self._store = VacancyStore()
+			return self._store
+
+	@property
+	def stop_words(self) -> FrozenSet[str]:
+		return english_stop_words()
+
+	@property
+	def predictor(self) -> "Predictor":
+		with self._lock:
+			if self._predictor is None:
+				from .predictor import Predictor
+
+				self._predictor = Predictor()
+			return self._predictor
+
+	def collector(self, sources: Sequence[str] = ("hh",)) -> DataCollector:
+		"""Collector of the sources with the current exchange rates. Refreshed rates replace the
+		collector of the sources, requests keep the collector they started with."""
+		rates = self.rates.get()
+		key = tuple(sources)
+		cached = self._collectors.get(key)
+		if cached is None or cached[0] is not rates:
+			store = self.store
+			with self._lock:
+				cached = self._collectors.get(key)
+				if cached is None or cached[0] is not rates:
+					cached = self._collectors[key] = (rates, DataCollector(rates, store=store, sources=sources))
+		return cached[1]
+
+	def start(self):
+		"""Open the HTTP connection pool and load the areas tree and exchange rates in background."""
+		open_session()
+		threading.Thread(target=self._preload, name="services-preload", daemon=True).start()
+
+	def _preload(self):
+		try:
+			self.areas.tree()
+			self.rates.get()
+		except Exception as e:
+			logger.warning("Preloading of areas and exchange rates failed: %s", e)
+
+	def close(self):
+		"""Close the HTTP connection pool and the vacancy store. Collectors using the store are
+		dropped, so a restarted app opens a new one on first use."""
+		close_session()
+		with self._lock:
+			store, self._store = self._store, None
+			self._collectors.clear()
+		if store is not None:
+			store.close()
+
+
+SERVICES = Services()
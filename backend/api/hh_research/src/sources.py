@@ -0,0 +1,422 @@
+import contextvars
+import logging
+import math
+import re
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Container, Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+
+import requests
+
+from .archive import ARCHIVE, RawArchive
+from .city_validator import AREA_INDEX, find_city_name
+from .config import HH_API_URL, SEARCH_DEPTH_LIMIT, SUPERJOB_API_URL, SUPERJOB_APP_ID
+from .http_client import get_json
+from .metrics import stage
+from .planner import QueryPlanner
+
+if TYPE_CHECKING:
+	from .progress import CrawlProgress
+
+logger = logging.getLogger(__name__)
+
+_MSK = timezone(timedelta(hours=3))
+_LEGAL_FORMS = re.compile(r"\b(ооо|оао|зао|пао|ао|ип|llc|ltd|inc|gmbh)\b")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+class VacancySource:
+	"""Base class of vacancy sources.
+
+	A source crawls vacancies for a search query in HH API format and returns raw vacancy
+	JSONs, so that `DataCollector` parses all of them in the same way.
+
+	"""
+	name = ""
+
+	def fetch(
+			self, query: Dict, num_workers: int = 1, limit: Optional[int] = None, known: Container[str] = (),
+			progress: Optional["CrawlProgress"] = None,
+	) -> List[Dict]:
+		"""Return vacancies found by `query` (HH API search params) as HH API vacancy JSONs.
+
+		Sources which fetch vacancy details separately skip `known` IDs and return them as
+		`{"id": vacancy_id}` stubs, so an update of a dataset fetches only new vacancies.
+		Every fetched vacancy is reported to `progress` as soon as it arrives.
+
+		"""
+		raise NotImplementedError
+
+
+class HHSource(VacancySource):
+	"""hh.ru: search pages give vacancy IDs, details are fetched by ID concurrently."""
+	name = "hh"
+
+	def __init__(
+			self, api_url: str = HH_API_URL, depth_limit: int = SEARCH_DEPTH_LIMIT,
+			archive: Optional[RawArchive] = ARCHIVE,
+	):
+		self._vacancies_url = f"{api_url}/vacancies/"
+		self.depth_limit = depth_limit
+		# Raw search pages and vacancies are archived for reprocessing if the archive is enabled
+		self._archive = archive
+
+	def list_items(self, query: Dict, limit: Optional[int] = None, num_workers: int = 1) -> List[Dict]:
+		"""Search result items: vacancy ID with a short summary (salary, experience, area...).
+
+		Only the first `depth_limit` results of a query are reachable through pagination, so
+		broader queries are split into partitions (see `QueryPlanner`) which are listed
+		concurrently and merged by vacancy ID.
+
+		"""
+		with stage("page_listing"):
+			found = self.count(query)
+			if found > self.depth_limit and not (limit and limit <= self.depth_limit):
+				planner = QueryPlanner(self.count, AREA_INDEX.tree(), self.depth_limit, num_workers=num_workers)
+				partitions = planner.plan(query, found)
+			else:
+				partitions = [query]
+			
+			# Tasks run in copies of the context: request ID of logs and request budget of the job
+			with ThreadPoolExecutor(max_workers=max(min(num_workers, len(partitions)), 1)) as executor:
+				futures = [
+					executor.submit(contextvars.copy_context().run, self._list_pages, x, limit) for x in partitions
+				]
+				items = {}
+				for item in (x for future in futures for x in future.result()):
+					items.setdefault(item["id"], item)
+					if limit and len(items) >= limit:
+						break
+		return list(items.values())
+	
+	def count(self, query: Dict) -> int:
+		"""Number of vacancies found by a query."""
+		return get_json(self._vacancies_url, {**query, "page": 0, "per_page": 1}, target="vacancies").get("found", 0)
+	
+	def _list_pages(self, query: Dict, limit: Optional[int] = None) -> List[Dict]:
+		# Check number of pages...
+		target_url = self._vacancies_url + "?" + urlencode(query)
+		num_pages = get_json(target_url, target="vacancies")["pages"]
+		
+		# Collect vacancy IDs...
+		items = []
+		for idx in range(num_pages):
+			data = get_json(target_url, {"page": idx}, target="vacancies")
+			if "items" not in data:
+				break
+			items.extend(data["items"])
+			if self._archive is not None:
+				self._archive.add("listing", f"{target_url}&page={idx}", data)
+			if limit and len(items) >= limit:
+				break
+		if self._archive is not None:
+			self._archive.flush()
+		return items[:limit] if limit else items
+	
+	def list_ids(self, query: Dict, limit: Optional[int] = None, num_workers: int = 1) -> List[str]:
+		return [x["id"] for x in self.list_items(query, limit, num_workers)]
+
+	def get(self, vacancy_id: str) -> Dict:
+		try:
+			vacancy = get_json(f"{self._vacancies_url}{vacancy_id}", target="vacancy")
+		except requests.HTTPError as error:
+			# Vacancy removed after listing: keep the error body as before, other errors fail the crawl
+			if error.response is None or error.response.status_code != 404:
+				raise
+			return {"id": vacancy_id, **error.response.json()}
+		if self._archive is not None:
+			self._archive.add("vacancy", vacancy_id, vacancy)
+		return vacancy
+
+	def fetch(
+			self, query: Dict, num_workers: int = 1, limit: Optional[int] = None, known: Container[str] = (),
+			progress: Optional["CrawlProgress"] = None,
+	) -> List[Dict]:
+		ids = self.list_ids(query, limit, num_workers)
+		if progress is not None:
+			progress.expect(self.name, len(ids))
+		fetched = self.get_many([x for x in ids if x not in known], num_workers, progress)
+		return [fetched.get(x) or {"id": x} for x in ids]
+	
+	def get_many(
+			self, ids: List[str], num_workers: int = 1, progress: Optional["CrawlProgress"] = None
+	) -> Dict[str, Dict]:
+		"""Fetch vacancy details by IDs concurrently."""
+		def get(vacancy_id: str) -> Dict:
+			vacancy = self.get(vacancy_id)
+			if progress is not None:
+				progress.add(vacancy)
+			return vacancy
+		
+		# Progress of a crawl is watched through `progress.CRAWLS`, not printed
+		with stage("detail_fetch"), ThreadPoolExecutor(max_workers=num_workers) as executor:
+			futures = [executor.submit(contextvars.copy_context().run, get, x) for x in ids]
+			vacancies = {x: future.result() for x, future in zip(ids, futures)}
+		if self._archive is not None:
+			self._archive.flush()
+		logger.debug("Fetched %d vacancies via HH API", len(vacancies), extra={"source": self.name})
+		return vacancies
+
+
+class SuperJobSource(VacancySource):
+	"""superjob.ru: search pages contain full vacancies, they are converted to HH API format.
+
+	SuperJob IDs are prefixed with `sj-` to avoid collisions with HH IDs.
+
+	"""
+	name = "superjob"
+	# SuperJob API returns at most 500 vacancies per query
+	__MAX_COUNT = 100
+	__MAX_RESULTS = 500
+
+	def __init__(self, api_url: str = SUPERJOB_API_URL, app_id: str = SUPERJOB_APP_ID):
+		self._vacancies_url = f"{api_url}/vacancies/"
+		self._headers = {"X-Api-App-Id": app_id}
+
+	def fetch(
+			self, query: Dict, num_workers: int = 1, limit: Optional[int] = None, known: Container[str] = (),
+			progress: Optional["CrawlProgress"] = None,
+	) -> List[Dict]:
+		params = {"keyword": query.get("text", ""), "count": self.__MAX_COUNT}
+		if query.get("area"):
+			town = find_city_name(str(query["area"]))
+			if town:
+				params["town"] = town
+
+		max_results = min(limit, self.__MAX_RESULTS) if limit else self.__MAX_RESULTS
+		vacancies = []
+		with stage("superjob_fetch"):
+			for page in range(math.ceil(max_results / self.__MAX_COUNT)):
+				data = get_json(self._vacancies_url, {**params, "page": page}, target="superjob", headers=self._headers)
+				if progress is not None:
+					progress.expect(self.name, min(data.get("total", 0), max_results))
+				for sj_vacancy in data.get("objects", []):
+					vacancy = transform_superjob_to_hh(sj_vacancy)
+					vacancy["id"] = f"sj-{vacancy['id']}"
+					vacancies.append(vacancy)
+					if progress is not None:
+						progress.add(vacancy)
+				if not data.get("more"):
+					break
+		return vacancies[:max_results]
+
+
+# SuperJob requires the app secret key (`SUPERJOB_APP_ID`)
+SOURCES = {source.name: source for source in (HHSource, SuperJobSource) if source is HHSource or SUPERJOB_APP_ID}
+
+
+def normalize_text(text: str) -> str:
+	"""Lowercase text without punctuation and legal forms (ООО, LLC...) for fuzzy matching."""
+	text = _LEGAL_FORMS.sub(" ", (text or "").lower().replace("ё", "е"))
+	return " ".join(sorted(_NON_WORD.sub(" ", text).split()))
+
+
+def salary_bucket(salary_from: Optional[int], salary_to: Optional[int]) -> Optional[int]:
+	"""Logarithmic bucket of the average salary, one bucket is ~10% wide."""
+	bounds = [x for x in (salary_from, salary_to) if x]
+	if not bounds:
+		return None
+	return round(math.log(sum(bounds) / len(bounds)) / math.log(1.1))
+
+
+def similar_salary(first: Tuple[Optional[int], Optional[int]], second: Tuple[Optional[int], Optional[int]]) -> bool:
+	"""Average salaries differ less than by 10% (or both are not set)."""
+	first_bounds = [x for x in first if x]
+	second_bounds = [x for x in second if x]
+	if not first_bounds or not second_bounds:
+		return not first_bounds and not second_bounds
+	first_avg = sum(first_bounds) / len(first_bounds)
+	second_avg = sum(second_bounds) / len(second_bounds)
+	return abs(first_avg - second_avg) <= 0.1 * max(first_avg, second_avg)
+
+
+def transform_superjob_to_hh(sj_vacancy):
+	# Преобразование даты (московское время, как в HH API)
+	published_at = datetime.fromtimestamp(sj_vacancy.get("date_published", 0), _MSK).strftime(
+		"%Y-%m-%dT%H:%M:%S%z"
+	)
+	
+	# Преобразование зарплаты
+	salary_from = sj_vacancy.get("payment_from")
+	salary_to = sj_vacancy.get("payment_to")
+	salary = None
+	salary_range = None
+	# В SuperJob рубль обозначается "rub", в HH API - "RUR"
+	currency = sj_vacancy.get("currency", "rub").upper()
+	currency = "RUR" if currency == "RUB" else currency
+	
+	if salary_from or salary_to:
+		salary = {
+			"from": salary_from if salary_from else None,
+			"to": salary_to if salary_to else None,
+			"currency": currency,
+			"gross": False,  # По умолчанию в SuperJob
+		}
+		
+		salary_range = {
+			"from": salary_from if salary_from else None,
+			"to": salary_to if salary_to else None,
+			"currency": currency,
+			"gross": True,
+			"mode": {"id": "MONTH", "name": "За месяц"},
+			"frequency": {"id": "MONTHLY", "name": "Раз в месяц"},
+		}
+	
+	# Преобразование опыта работы
+	experience_map = {
+		1: {"id": "between1And3", "name": "От 1 года до 3 лет"},
+		2: {"id": "between1And3", "name": "От 1 года до 3 лет"},
+		3: {"id": "between3And6", "name": "От 3 до 6 лет"},
+		4: {"id": "moreThan6", "name": "Более 6 лет"},
+		5: {"id": "noExperience", "name": "Нет опыта"},
+	}
+	experience = experience_map.get(
+		sj_vacancy.get("experience", {}).get("id", 0), {"id": None, "name": None}
+	)
+	
+	# Преобразование графика работы
+	schedule_map = {
+		6: {"id": "fullDay", "name": "Полный день"},
+		7: {"id": "shift", "name": "Сменный график"},
+		8: {"id": "flexible", "name": "Гибкий график"},
+		9: {"id": "remote", "name": "Удаленная работа"},
+		10: {"id": "flyInFlyOut", "name": "Вахтовый метод"},
+	}
+	schedule = schedule_map.get(
+		sj_vacancy.get("type_of_work", {}).get("id", 0), {"id": None, "name": None}
+	)
+	
+	# Преобразование типа занятости
+	employment_map = {
+		0: {"id": "full", "name": "Полная занятость"},
+		1: {"id": "part", "name": "Частичная занятость"},
+		2: {"id": "project", "name": "Проектная работа"},
+		3: {"id": "volunteer", "name": "Волонтерство"},
+		4: {"id": "probation", "name": "Стажировка"},
+	}
+	employment = employment_map.get(
+		sj_vacancy.get("place_of_work", {}).get("id", 0),
+		{"id": "full", "name": "Полная занятость"},
+	)
+	
+	# Преобразование работодателя
+	employer = {
+		"id": str(sj_vacancy.get("id_client", "")),
+		"name": sj_vacancy.get("firm_name", ""),
+		"url": f"https://api.hh.ru/employers/{sj_vacancy.get('id_client', '')}",
+		"alternate_url": sj_vacancy.get("client", {}).get("link", ""),
+		"logo_urls": (
+			{
+				"original": sj_vacancy.get("client_logo", ""),
+				"90": sj_vacancy.get("client_logo", ""),
+				"240": sj_vacancy.get("client_logo", ""),
+			}
+			if sj_vacancy.get("client_logo")
+			else None
+		),
+		"vacancies_url": f"https://api.hh.ru/vacancies?employer_id={sj_vacancy.get('id_client', '')}",
+		"accredited_it_employer": False,
+		"trusted": True,
+	}
+	
+	# Преобразование города
+	area = {
+		"id": str(sj_vacancy.get("town", {}).get("id", "")),
+		"name": sj_vacancy.get("town", {}).get("title", ""),
+		"url": f"https://api.hh.ru/areas/{sj_vacancy.get('town', {}).get('id', '')}",
+	}
+	
+	# Создание итогового объекта вакансии
+	transformed = {
+		"id": str(sj_vacancy.get("id", "")),
+		"premium": False,
+		"billing_type": {"id": "standard", "name": "Стандарт"},
+		"relations": [],
+		"name": sj_vacancy.get("profession", ""),
+		"insider_interview": None,
+		"response_letter_required": False,
+		"area": area,
+		"salary": salary,
+		"salary_range": salary_range,
+		"type": {"id": "open", "name": "Открытая"},
+		"address": (
+			{"raw": sj_vacancy.get("address", "")}
+			if sj_vacancy.get("address")
+			else None
+		),
+		"allow_messages": True,
+		"experience": experience,
+		"schedule": schedule,
+		"employment": employment,
+		"department": None,
+		"show_contacts": not sj_vacancy.get("contacts_hidden", True),
+		"contacts": (
+			{"phone": sj_vacancy.get("phone", ""), "email": None}
+			if sj_vacancy.get("phone")
+			else None
+		),
+		"description": sj_vacancy.get("vacancyRichText", ""),
+		"branded_description": None,
+		"vacancy_constructor_template": None,
+		"key_skills": [],  # Нет информации о навыках в исходных данных
+		"accept_handicapped": True,
+		"accept_kids": False,
+		"archived": sj_vacancy.get("is_archive", False),
+		"response_url": None,
+		"specializations": [],
+		"professional_roles": (
+			[{"id": "96", "name": "Программист, разработчик"}]
+			if "python" in sj_vacancy.get("profession", "").lower()
+			   or "разработ" in sj_vacancy.get("profession", "").lower()
+			else []
+		),
+		"code": None,
+		"hidden": False,
+		"quick_responses_allowed": False,
+		"driver_license_types": [],
+		"accept_incomplete_resumes": False,
+		"employer": employer,
+		"published_at": published_at,
+		"created_at": published_at,
+		"initial_created_at": published_at,
+		"negotiations_url": None,
+		"suitable_resumes_url": None,
+		"apply_alternate_url": sj_vacancy.get("link", ""),
+		"has_test": False,
+		"test": None,
+		"alternate_url": sj_vacancy.get("link", ""),
+		"working_days": [],
+		"working_time_intervals": [],
+		"working_time_modes": [],
+		"accept_temporary": True,
+		"languages": [],
+		"approved": True,
+		"employment_form": {"id": "FULL", "name": "Полная"},
+		"fly_in_fly_out_duration": [],
+		"internship": False,
+		"night_shifts": False,
+		"work_format": [
+			{
+				"id": (
+					"REMOTE"
+					if sj_vacancy.get("place_of_work", {}).get("id") == 2
+					else "OFFICE"
+				),
+				"name": (
+					"Удалённо"
+					if sj_vacancy.get("place_of_work", {}).get("id") == 2
+					else "В офисе"
+				),
+			}
+		],
+		"work_schedule_by_days": (
+			[{"id": "FIVE_ON_TWO_OFF", "name": "5/2"}]
+			if sj_vacancy.get("type_of_work", {}).get("id") == 6
+			else []
+		),
+		"working_hours": [{"id": "HOURS_8", "name": "8 часов"}],
+		"show_logo_in_search": None,
+	}
+	
+	return transformed
@@ -0,0 +1,749 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import zlib
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from .config import CACHE_DIR, SNAPSHOT_KEEP
+
+# numpy is imported on first use to keep API startup fast
+if TYPE_CHECKING:
+	import numpy as np
+
+STORE_PATH = os.path.join(CACHE_DIR, "vacancies.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS vacancies (
+	id TEXT PRIMARY KEY,
+	name TEXT,
+	employer TEXT,
+	area TEXT,
+	experience TEXT,
+	schedule TEXT,
+	salary INTEGER NOT NULL,
+	salary_from INTEGER,
+	salary_to INTEGER,
+	salary_avg REAL,
+	published_at TEXT,
+	keys TEXT,
+	description TEXT,
+	updated_at TEXT NOT NULL
+);
+-- Key skills of vacancies normalized as in `Analyzer.find_top_words_from_keys`, for counts by skill
+CREATE TABLE IF NOT EXISTS vacancy_skills (
+	vacancy_id TEXT NOT NULL,
+	skill TEXT NOT NULL,
+	PRIMARY KEY (vacancy_id, skill)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS queries (
+	query_key TEXT PRIMARY KEY,
+	params TEXT NOT NULL,
+	crawled_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS query_vacancies (
+	query_key TEXT NOT NULL,
+	vacancy_id TEXT NOT NULL,
+	first_seen TEXT NOT NULL,
+	last_seen TEXT NOT NULL,
+	PRIMARY KEY (query_key, vacancy_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS query_popularity (
+	query_key TEXT NOT NULL,
+	day TEXT NOT NULL,
+	options TEXT NOT NULL,
+	sources TEXT NOT NULL,
+	requests INTEGER NOT NULL,
+	PRIMARY KEY (query_key, day)
+) WITHOUT ROWID;
+-- Snapshots numbered by a counter of the store, their versions are not comparable between nodes
+DROP TABLE IF EXISTS snapshots;
+CREATE TABLE IF NOT EXISTS dataset_snapshots (
+	query_key TEXT NOT NULL,
+	version TEXT NOT NULL,
+	vacancy_count INTEGER NOT NULL,
+	ids BLOB NOT NULL,
+	digests BLOB NOT NULL,
+	aggregates TEXT NOT NULL,
+	PRIMARY KEY (query_key, version)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS ix_vacancies_published ON vacancies (published_at, salary_avg);
+CREATE INDEX IF NOT EXISTS ix_vacancies_area_experience ON vacancies (area, experience, published_at);
+CREATE INDEX IF NOT EXISTS ix_query_vacancies_seen ON query_vacancies (query_key, last_seen);
+"""
+
+_UPSERT = """
+INSERT INTO vacancies (
+	id, name, employer, area, experience, schedule, salary, salary_from, salary_to, salary_avg,
+	published_at, keys, description, updated_at
+) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (id) DO UPDATE SET
+	name = excluded.name,
+	employer = excluded.employer,
+	area = excluded.area,
+	experience = excluded.experience,
+	schedule = excluded.schedule,
+	salary = excluded.salary,
+	salary_from = excluded.salary_from,
+	salary_to = excluded.salary_to,
+	salary_avg = excluded.salary_avg,
+	published_at = COALESCE(excluded.published_at, vacancies.published_at),
+	keys = excluded.keys,
+	description = excluded.description,
+	updated_at = excluded.updated_at
+"""
+
+# Median is picked with window functions, so that SQLite sorts only the selected dataset
+_COLUMN_STATS = """
+WITH ranked AS (
+	SELECT {column} AS value,
+		ROW_NUMBER() OVER (ORDER BY {column}) AS rn,
+		COUNT(*) OVER () AS cnt
+	FROM query_vacancies q
+	JOIN queries c ON c.query_key = q.query_key AND c.crawled_at = q.last_seen
+	JOIN vacancies v ON v.id = q.vacancy_id
+	WHERE q.query_key = ? AND {column} IS NOT NULL{condition}
+)
+SELECT MIN(value), MAX(value), AVG(value), AVG(CASE WHEN rn IN ((cnt + 1) / 2, (cnt + 2) / 2) THEN value END)
+FROM ranked
+"""
+
+_TOP_SKILLS = """
+SELECT s.skill, COUNT(*) AS cnt
+FROM query_vacancies q
+JOIN queries c ON c.query_key = q.query_key AND c.crawled_at = q.last_seen
+JOIN vacancy_skills s ON s.vacancy_id = q.vacancy_id
+WHERE q.query_key = ?{condition}
+GROUP BY s.skill
+ORDER BY cnt DESC, s.skill
+LIMIT ?
+"""
+
+# Columns available for listing, `keys` is decoded from JSON
+VACANCY_COLUMNS = (
+	"id", "name", "employer", "area", "experience", "schedule", "salary", "salary_from", "salary_to", "salary_avg",
+	"published_at", "keys", "description", "updated_at",
+)
+
+# Keyset pagination by vacancy ID over the primary key of `query_vacancies`
+_LIST = """
+SELECT q.vacancy_id, {columns}
+FROM query_vacancies q
+JOIN queries c ON c.query_key = q.query_key AND c.crawled_at = q.last_seen
+JOIN vacancies v ON v.id = q.vacancy_id
+WHERE q.query_key = ? AND q.vacancy_id > ?{condition}
+ORDER BY q.vacancy_id
+LIMIT ?
+"""
+
+_TREND = """
+WITH ranked AS (
+	SELECT strftime(?, v.published_at) AS bucket, v.salary_avg AS value,
+		ROW_NUMBER() OVER (PARTITION BY strftime(?, v.published_at) ORDER BY v.salary_avg) AS rn,
+		COUNT(*) OVER (PARTITION BY strftime(?, v.published_at)) AS cnt
+	FROM {source}
+	WHERE v.published_at IS NOT NULL AND v.salary_avg IS NOT NULL{condition}
+)
+SELECT bucket, COUNT(*), MIN(value), MAX(value), AVG(value),
+	AVG(CASE WHEN rn IN ((cnt + 1) / 2, (cnt + 2) / 2) THEN value END)
+FROM ranked
+GROUP BY bucket
+ORDER BY bucket DESC
+LIMIT ?
+"""
+
+
+# Salary quantiles stored with snapshots
+SNAPSHOT_QUANTILES = (0.1, 0.25, 0.5, 0.75, 0.9)
+# Size of a vacancy content digest in snapshots, read back as uint64
+_DIGEST_SIZE = 8
+
+
+def _quantiles(values: List[float], quantiles: Sequence[float]) -> List[Optional[int]]:
+	"""Quantiles with linear interpolation between the closest ranks."""
+	values = sorted(values)
+	result = []
+	for q in quantiles:
+		if not values:
+			result.append(None)
+			continue
+		position = q * (len(values) - 1)
+		low = int(position)
+		high = min(low + 1, len(values) - 1)
+		result.append(int(values[low] + (values[high] - values[low]) * (position - low)))
+	return result
+
+
+def _sorted_diff(
+		old_ids: "np.ndarray", new_ids: "np.ndarray"
+) -> Tuple["np.ndarray", "np.ndarray", "np.ndarray", "np.ndarray"]:
+	"""Compare two sorted ID arrays with binary searches: masks of old IDs present in the new
+	array and of new IDs present in the old one, positions of common old IDs in the new array."""
+	import numpy as np
+
+	def member(ids: "np.ndarray", other: "np.ndarray") -> Tuple["np.ndarray", "np.ndarray"]:
+		positions = np.searchsorted(other, ids)
+		if not len(other):
+			return np.zeros(len(ids), dtype=bool), positions
+		return other[np.minimum(positions, len(other) - 1)] == ids, positions
+
+	old_in_new, positions = member(old_ids, new_ids)
+	new_in_old, _ = member(new_ids, old_ids)
+	return old_in_new, new_in_old, np.flatnonzero(old_in_new), positions[old_in_new]
+
+
+def _skills(keys: Iterable[str]) -> Set[str]:
+	"""Normalized key skills of a vacancy, same as `Analyzer.find_top_words_from_keys` counts them."""
+	return {x.lower().replace("'", "") for x in keys if x}
+
+
+def _to_utc(published_at: Optional[str]) -> Optional[str]:
+	"""Convert HH timestamp (e.g. `2024-05-01T10:00:00+0300`) to the UTC form understood by SQLite."""
+	if not published_at:
+		return None
+	try:
+		moment = datetime.strptime(published_at, "%Y-%m-%dT%H:%M:%S%z")
+	except ValueError:
+		return None
+	return moment.astimezone(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def utc_now() -> str:
+	"""Current UTC time in the form of dataset versions (`VacancyStore.dataset_version`)."""
+	return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S.%f")
+
+
+class VacancyStore:
+	r"""Embedded SQLite warehouse of parsed vacancies.
+
+	Every crawled vacancy is upserted once (deduplicated by its ID) and linked to the
+	queries which returned it, so history is kept across crawls and aggregations run
+	as indexed SQL instead of over in-memory DataFrames.
+
+	Parameters
+	----------
+	path : str
+		Path to the database file. Use ``":memory:"`` for a temporary store.
+
+	"""
+	__TREND_BUCKETS = {
+		"day": "%Y-%m-%d",
+		"week": "%Y-W%W",
+		"month": "%Y-%m",
+	}
+
+	def __init__(self, path: str = STORE_PATH):
+		if path != ":memory:":
+			os.makedirs(os.path.dirname(path), exist_ok=True)
+		self._lock = threading.Lock()
+		# Crawler processes write the same store: a writer waits for the lock of another one
+		# instead of failing with "database is locked" after the default 5 seconds
+		self._conn = sqlite3.connect(path, timeout=60, check_same_thread=False)
+		self._conn.execute("PRAGMA journal_mode=WAL")
+		self._conn.execute("PRAGMA synchronous=NORMAL")
+		self._conn.executescript(_SCHEMA)
+		# IDs left out of aggregations (e.g. near-duplicates), filled per call under the lock
+		self._conn.execute("CREATE TEMP TABLE excluded_ids (id TEXT PRIMARY KEY) WITHOUT ROWID")
+		self._fill_skills()
+
+	def _fill_skills(self):
+		"""Fill skills of vacancies stored before the skills table existed."""
+		with self._conn:
+			if self._conn.execute("SELECT 1 FROM vacancy_skills LIMIT 1").fetchone() is not None:
+				return
+			rows = self._conn.execute("SELECT id, keys FROM vacancies WHERE keys IS NOT NULL").fetchall()
+			self._conn.executemany(
+				"INSERT OR IGNORE INTO vacancy_skills (vacancy_id, skill) VALUES (?, ?)",
+				((vacancy_id, skill) for vacancy_id, keys in rows for skill in _skills(json.loads(keys))),
+			)
+
+	def close(self):
+		with self._lock:
+			self._conn.close()
+
+	def upsert(self, vacancies: Dict):
+		"""Insert new vacancies and update existing ones.
+
+		Parameters
+		----------
+		vacancies : dict
+			Dict of parsed vacancies in `DataCollector` format (column -> values).
+
+		"""
+		updated_at = utc_now()
+		rows = []
+		for idx, vacancy_id in enumerate(vacancies["Ids"]):
+			salary_from, salary_to = vacancies["From"][idx], vacancies["To"][idx]
+			bounds = [x for x in (salary_from, salary_to) if x is not None]
+			rows.append((
+				str(vacancy_id),
+				vacancies["Name"][idx],
+				vacancies["Employer"][idx],
+				vacancies["Area"][idx] if "Area" in vacancies else None,
+				vacancies["Experience"][idx],
+				vacancies["Schedule"][idx],
+				int(bool(vacancies["Salary"][idx])),
+				salary_from,
+				salary_to,
+				sum(bounds) / len(bounds) if bounds else None,
+				_to_utc(vacancies["Published"][idx]) if "Published" in vacancies else None,
+				json.dumps(list(vacancies["Keys"][idx]), ensure_ascii=False),
+				vacancies["Description"][idx],
+				updated_at,
+			))
+		skills = [
+			(str(vacancy_id), skill)
+			for vacancy_id, keys in zip(vacancies["Ids"], vacancies["Keys"])
+			for skill in _skills(keys)
+		]
+		with self._lock, self._conn:
+			self._conn.executemany(_UPSERT, rows)
+			self._conn.executemany("DELETE FROM vacancy_skills WHERE vacancy_id = ?", ((x[0],) for x in rows))
+			self._conn.executemany("INSERT OR IGNORE INTO vacancy_skills (vacancy_id, skill) VALUES (?, ?)", skills)
+
+	def record_query(self, query_key: str, params: str, ids: Iterable[str], crawled_at: Optional[str] = None):
+		"""Save the result of a crawl: `ids` become the current dataset of the query.
+
+		Vacancies returned by previous crawls stay linked to the query for the history. `crawled_at`
+		is the version of the dataset (see `dataset_version`), the current time by default.
+
+		"""
+		crawled_at = crawled_at or utc_now()
+		with self._lock, self._conn:
+			self._conn.execute(
+				"INSERT INTO queries (query_key, params, crawled_at) VALUES (?, ?, ?) "
+				"ON CONFLICT (query_key) DO UPDATE SET params = excluded.params, crawled_at = excluded.crawled_at",
+				(query_key, params, crawled_at),
+			)
+			self._conn.executemany(
+				"INSERT INTO query_vacancies (query_key, vacancy_id, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+				"ON CONFLICT (query_key, vacancy_id) DO UPDATE SET last_seen = excluded.last_seen",
+				((query_key, str(x), crawled_at, crawled_at) for x in ids),
+			)
+
+	def save_snapshot(
+			self, query_key: str, vacancies: Dict, version: Optional[str] = None, keep: int = SNAPSHOT_KEEP
+	) -> str:
+		"""Save the current dataset of the query as a new version for diffs (see `diff_snapshots`).
+
+		A snapshot holds the sorted array of vacancy IDs, a content digest per ID (in the same
+		order) and aggregates: salary quantiles and key skill counts. A dataset equal to the
+		latest snapshot does not make a new version. Only `keep` latest versions are kept.
+
+		Versions are dataset versions (crawl times, see `dataset_version`), which are shared by
+		the nodes through the dataset cache: the same version is the same dataset on every node.
+
+		Parameters
+		----------
+		query_key : str
+			Dataset key of the query.
+		vacancies : dict
+			Complete dataset of the query in `DataCollector` format (column -> values).
+		version : str, optional
+			Version of the dataset, by default the version of the current dataset of the query.
+		keep : int
+			Number of versions to keep.
+
+		Returns
+		-------
+		str
+			Version of the snapshot.
+
+		"""
+		columns = [x for x in vacancies if x != "Ids"]
+		rows = sorted(
+			(str(vacancy_id), tuple(vacancies[x][idx] for x in columns))
+			for idx, vacancy_id in enumerate(vacancies["Ids"])
+		)
+		ids = zlib.compress("\n".join(x for x, _ in rows).encode())
+		digests = b"".join(
+			hashlib.blake2b(repr(content).encode(), digest_size=_DIGEST_SIZE).digest() for _, content in rows
+		)
+
+		salaries, keywords = [], Counter()
+		for idx, has_salary in enumerate(vacancies["Salary"]):
+			bounds = [x for x in (vacancies["From"][idx], vacancies["To"][idx]) if x is not None]
+			if has_salary and bounds:
+				salaries.append(sum(bounds) / len(bounds))
+			# Same normalization as `Analyzer.find_top_words_from_keys`
+			keywords.update(x.lower().replace("'", "") for x in vacancies["Keys"][idx] if x)
+		aggregates = {
+			"salary_count": len(salaries),
+			"salary_quantiles": dict(zip(
+				(f"p{round(q * 100)}" for q in SNAPSHOT_QUANTILES), _quantiles(salaries, SNAPSHOT_QUANTILES)
+			)),
+			"keywords": dict(keywords.most_common()),
+		}
+
+		with self._lock, self._conn:
+			if version is None:
+				row = self._conn.execute("SELECT crawled_at FROM queries WHERE query_key = ?", (query_key,)).fetchone()
+				version = row[0] if row else utc_now()
+			latest = self._conn.execute(
+				"SELECT version, ids, digests FROM dataset_snapshots WHERE query_key = ? ORDER BY version DESC LIMIT 1",
+				(query_key,),
+			).fetchone()
+			if latest is not None and latest[1] == ids and latest[2] == digests:
+				return latest[0]
+			self._conn.execute(
+				"INSERT INTO dataset_snapshots (query_key, version, vacancy_count, ids, digests, aggregates) "
+				"VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (query_key, version) DO NOTHING",
+				(query_key, version, len(rows), ids, digests, json.dumps(aggregates, ensure_ascii=False)),
+			)
+			self._conn.execute(
+				"DELETE FROM dataset_snapshots WHERE query_key = ? AND version NOT IN ("
+				"SELECT version FROM dataset_snapshots WHERE query_key = ? ORDER BY version DESC LIMIT ?)",
+				(query_key, query_key, keep),
+			)
+		return version
+
+	def snapshots(self, query_key: str) -> List[Dict]:
+		"""Saved versions of the dataset of the query, the latest first."""
+		with self._lock:
+			rows = self._conn.execute(
+				"SELECT version, vacancy_count FROM dataset_snapshots WHERE query_key = ? ORDER BY version DESC",
+				(query_key,),
+			).fetchall()
+		return [{"version": version, "vacancy_count": cnt} for version, cnt in rows]
+
+	def diff_snapshots(
+			self,
+			query_key: str,
+			from_version: Optional[str] = None,
+			to_version: Optional[str] = None,
+			top_n: int = 20,
+	) -> Optional[Dict]:
+		"""Difference between two versions of the dataset of the query.
+
+		Only the snapshots are read: IDs are looked up in the sorted ID arrays of each other with
+		binary searches, content digests of common IDs are compared and stored aggregates are
+		subtracted, so neither dataset is loaded.
+
+		Parameters
+		----------
+		query_key : str
+			Dataset key of the query.
+		from_version, to_version : str, optional
+			Versions to compare. By default the latest version and the one before it.
+		top_n : int
+			Number of key skills with the largest change of count.
+
+		Returns
+		-------
+		dict or None
+			`from` / `to` (version, vacancy_count), `added`, `removed` and `changed` vacancy IDs,
+			their `counts`, `salary_quantiles` and `top_keywords` as `from`, `to` and `delta`
+			values. None if a version does not exist.
+
+		"""
+		with self._lock:
+			if to_version is None:
+				row = self._conn.execute(
+					"SELECT MAX(version) FROM dataset_snapshots WHERE query_key = ?", (query_key,)
+				).fetchone()
+				to_version = row[0]
+			if from_version is None and to_version is not None:
+				row = self._conn.execute(
+					"SELECT MAX(version) FROM dataset_snapshots WHERE query_key = ? AND version < ?",
+					(query_key, to_version),
+				).fetchone()
+				from_version = row[0]
+			rows = {
+				version: (cnt, ids, digests, aggregates)
+				for version, cnt, ids, digests, aggregates in self._conn.execute(
+					"SELECT version, vacancy_count, ids, digests, aggregates FROM dataset_snapshots "
+					"WHERE query_key = ? AND version IN (?, ?)",
+					(query_key, from_version, to_version),
+				)
+			}
+		if from_version not in rows or to_version not in rows:
+			return None
+
+		import numpy as np
+
+		def unpack(version):
+			cnt, ids, digests, aggregates = rows[version]
+			ids = np.array(zlib.decompress(ids).decode().split("\n") if cnt else [], dtype=str)
+			info = {"version": version, "vacancy_count": cnt}
+			return info, ids, np.frombuffer(digests, dtype=np.uint64), json.loads(aggregates)
+
+		old_info, old_ids, old_digests, old_aggregates = unpack(from_version)
+		new_info, new_ids, new_digests, new_aggregates = unpack(to_version)
+		old_in_new, new_in_old, old_common, new_common = _sorted_diff(old_ids, new_ids)
+		changed = new_ids[new_common[old_digests[old_common] != new_digests[new_common]]].tolist()
+		added, removed = new_ids[~new_in_old].tolist(), old_ids[~old_in_new].tolist()
+
+		def delta(old: Optional[int], new: Optional[int]) -> Dict:
+			return {"from": old, "to": new, "delta": new - old if old is not None and new is not None else None}
+
+		old_keywords, new_keywords = old_aggregates["keywords"], new_aggregates["keywords"]
+		keyword_deltas = {
+			x: delta(old_keywords.get(x, 0), new_keywords.get(x, 0)) for x in set(old_keywords) | set(new_keywords)
+		}
+		top_keywords = sorted(keyword_deltas, key=lambda x: (-abs(keyword_deltas[x]["delta"]), x))[:top_n]
+		return {
+			"from": old_info,
+			"to": new_info,
+			"counts": {
+				"added": len(added),
+				"removed": len(removed),
+				"changed": len(changed),
+				"unchanged": len(old_common) - len(changed),
+			},
+			"added": added,
+			"removed": removed,
+			"changed": changed,
+			"salary_count": delta(old_aggregates["salary_count"], new_aggregates["salary_count"]),
+			"salary_quantiles": {
+				name: delta(value, new_aggregates["salary_quantiles"][name])
+				for name, value in old_aggregates["salary_quantiles"].items()
+			},
+			"top_keywords": {x: keyword_deltas[x] for x in top_keywords},
+		}
+
+	def record_request(self, query_key: str, options: Dict, sources: Sequence[str]):
+		"""Count a user request of the query for popularity (see `popular_queries`)."""
+		day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+		with self._lock, self._conn:
+			self._conn.execute(
+				"INSERT INTO query_popularity (query_key, day, options, sources, requests) VALUES (?, ?, ?, ?, 1) "
+				"ON CONFLICT (query_key, day) DO UPDATE SET requests = requests + 1, "
+				"options = excluded.options, sources = excluded.sources",
+				(query_key, day, json.dumps(dict(options), ensure_ascii=False), ",".join(sources)),
+			)
+
+	def popular_queries(self, top_n: int, days: int = 7) -> List[Dict]:
+		"""The most requested queries of the last `days` days.
+
+		Returns
+		-------
+		list
+			Dicts with `query_key`, `options` (HH API search params), `sources` and `requests`,
+			the most popular first.
+
+		"""
+		since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+		with self._lock:
+			rows = self._conn.execute(
+				"SELECT query_key, MAX(options), MAX(sources), SUM(requests) AS total FROM query_popularity "
+				"WHERE day >= ? GROUP BY query_key ORDER BY total DESC LIMIT ?",
+				(since, top_n),
+			).fetchall()
+		return [
+			{"query_key": key, "options": json.loads(options), "sources": sources.split(","), "requests": total}
+			for key, options, sources, total in rows
+		]
+
+	def has_query(self, query_key: str) -> bool:
+		with self._lock:
+			row = self._conn.execute("SELECT 1 FROM queries WHERE query_key = ?", (query_key,)).fetchone()
+		return row is not None
+
+	def _exclude(self, ids: Iterable[str]) -> str:
+		"""Fill the temporary table of excluded IDs and return the SQL condition using it.
+		Must be called under the lock."""
+		self._conn.execute("DELETE FROM excluded_ids")
+		self._conn.executemany("INSERT OR IGNORE INTO excluded_ids (id) VALUES (?)", ((str(x),) for x in ids))
+		return " AND q.vacancy_id NOT IN (SELECT id FROM excluded_ids)"
+
+	def dataset_version(self, query_key: str) -> Optional[str]:
+		"""Version of the current dataset of the query: UTC time of the last crawl, None if not crawled."""
+		with self._lock:
+			row = self._conn.execute("SELECT crawled_at FROM queries WHERE query_key = ?", (query_key,)).fetchone()
+		return row[0] if row else None
+
+	def count(self, query_key: str, exclude: Iterable[str] = ()) -> int:
+		"""Number of vacancies in the current dataset of the query, without `exclude` IDs."""
+		with self._lock, self._conn:
+			condition = self._exclude(exclude) if exclude else ""
+			(cnt,) = self._conn.execute(
+				"SELECT COUNT(*) FROM query_vacancies q "
+				"JOIN queries c ON c.query_key = q.query_key AND c.crawled_at = q.last_seen "
+				"WHERE q.query_key = ?" + condition,
+				(query_key,),
+			).fetchone()
+		return cnt
+
+	def _column_stats(self, query_key: str, column: str, condition: str = "") -> Dict[str, int]:
+		row = self._conn.execute(_COLUMN_STATS.format(column=column, condition=condition), (query_key,)).fetchone()
+		return {
+			name: int(value) if value is not None else None
+			for name, value in zip(("min", "max", "mean", "median"), row)
+		}
+
+	def salary_stats(self, query_key: str, exclude: Iterable[str] = ()) -> Dict:
+		"""Salary statistics over the current dataset of the query.
+
+		Parameters
+		----------
+		query_key : str
+			Dataset key of the query.
+		exclude : iterable of str
+			IDs of vacancies to leave out, e.g. near-duplicates.
+
+		Returns
+		-------
+		dict
+			Same layout as `salary_stats` of `ResearcherHH.get_statistics`: min, max, mean and
+			median of the average salary plus `from_stats` / `to_stats` for the salary bounds.
+
+		"""
+		with self._lock, self._conn:
+			condition = self._exclude(exclude) if exclude else ""
+			salary_stats = self._column_stats(query_key, "v.salary_avg", " AND v.salary = 1" + condition)
+			salary_stats["from_stats"] = self._column_stats(query_key, "v.salary_from", condition)
+			salary_stats["to_stats"] = self._column_stats(query_key, "v.salary_to", condition)
+		return salary_stats
+
+	def top_skills(self, query_key: str, top_n: int = 20, exclude: Iterable[str] = ()) -> Dict[str, int]:
+		"""The most frequent key skills of the current dataset of the query: skill -> number of
+		vacancies, the most frequent first. Counted with GROUP BY over the skills table."""
+		with self._lock, self._conn:
+			condition = self._exclude(exclude) if exclude else ""
+			rows = self._conn.execute(_TOP_SKILLS.format(condition=condition), (query_key, top_n)).fetchall()
+		return dict(rows)
+
+	def iter_vacancies(
+			self,
+			query_key: str,
+			columns: Optional[Sequence[str]] = None,
+			after: Optional[str] = None,
+			limit: Optional[int] = None,
+			batch_size: int = 1000,
+			experience: Optional[Sequence[str]] = None,
+			schedule: Optional[Sequence[str]] = None,
+			salary_min: Optional[int] = None,
+			salary_max: Optional[int] = None,
+			with_salary: bool = False,
+	) -> Iterator[Dict]:
+		"""Iterate over the current dataset of the query ordered by vacancy ID.
+
+		Rows are read by batches of `batch_size` with keyset pagination, so the lock is held
+		only per batch and memory does not depend on the size of the dataset.
+
+		Parameters
+		----------
+		query_key : str
+			Dataset key of the query.
+		columns : sequence of str, optional
+			Columns to return (see `VACANCY_COLUMNS`), all by default.
+		after : str, optional
+			Return vacancies with IDs greater than this one (the last ID of the previous page).
+		limit : int, optional
+			Maximal number of vacancies.
+		experience, schedule : sequence of str, optional
+			Allowed experience / schedule names.
+		salary_min, salary_max : int, optional
+			Bounds of the average salary.
+		with_salary : bool
+			Return only vacancies with salary.
+
+		Yields
+		------
+		dict
+			Column -> value.
+
+		"""
+		columns = list(columns or VACANCY_COLUMNS)
+		unknown = set(columns) - set(VACANCY_COLUMNS)
+		if unknown:
+			raise ValueError(f"Unknown columns {sorted(unknown)}, expected some of {list(VACANCY_COLUMNS)}")
+
+		condition, params = "", []
+		for column, values in (("experience", experience), ("schedule", schedule)):
+			if values:
+				condition += f" AND v.{column} IN ({', '.join('?' * len(values))})"
+				params.extend(values)
+		if salary_min is not None:
+			condition += " AND v.salary_avg >= ?"
+			params.append(salary_min)
+		if salary_max is not None:
+			condition += " AND v.salary_avg <= ?"
+			params.append(salary_max)
+		if with_salary:
+			condition += " AND v.salary = 1"
+		sql = _LIST.format(columns=", ".join(f"v.{x}" for x in columns), condition=condition)
+		decode_keys = "keys" in columns
+
+		last_id = after or ""
+		remaining = limit
+		while remaining is None or remaining > 0:
+			size = batch_size if remaining is None else min(batch_size, remaining)
+			with self._lock:
+				rows = self._conn.execute(sql, (query_key, last_id, *params, size)).fetchall()
+			for row in rows:
+				vacancy = dict(zip(columns, row[1:]))
+				if decode_keys and vacancy["keys"] is not None:
+					vacancy["keys"] = json.loads(vacancy["keys"])
+				yield vacancy
+			if len(rows) < size:
+				return
+			last_id = rows[-1][0]
+			if remaining is not None:
+				remaining -= len(rows)
+
+	def salary_trend(
+			self,
+			query_key: Optional[str] = None,
+			bucket: str = "month",
+			periods: int = 6,
+			area: Optional[str] = None,
+			experience: Optional[str] = None,
+	) -> List[Dict]:
+		"""Time-bucketed salary history by publication date.
+
+		Parameters
+		----------
+		query_key : str, optional
+			Take vacancies ever returned by the query. All stored vacancies if not set.
+		bucket : str
+			Bucket size: `day`, `week` or `month`.
+		periods : int
+			Number of the latest buckets to return.
+		area : str, optional
+			Filter by area name.
+		experience : str, optional
+			Filter by experience name.
+
+		Returns
+		-------
+		list
+			Buckets in chronological order with count, min, max, mean and median of average salary.
+
+		"""
+		if bucket not in self.__TREND_BUCKETS:
+			raise ValueError(f"Unknown bucket '{bucket}', expected one of {list(self.__TREND_BUCKETS)}")
+		fmt = self.__TREND_BUCKETS[bucket]
+
+		params = [fmt, fmt, fmt]
+		if query_key is not None:
+			source = "query_vacancies q JOIN vacancies v ON v.id = q.vacancy_id"
+			condition = " AND q.query_key = ?"
+			params.append(query_key)
+		else:
+			source = "vacancies v"
+			condition = ""
+		if area is not None:
+			condition += " AND v.area = ?"
+			params.append(area)
+		if experience is not None:
+			condition += " AND v.experience = ?"
+			params.append(experience)
+		params.append(periods)
+
+		with self._lock:
+			rows = self._conn.execute(_TREND.format(source=source, condition=condition), params).fetchall()
+		return [
+			{
+				"period": period,
+				"count": cnt,
+				"min": int(min_),
+				"max": int(max_),
+				"mean": int(mean),
+				"median": int(median),
+			}
+			for period, cnt, min_, max_, mean, median in reversed(rows)
+		]
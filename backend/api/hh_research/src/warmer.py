@@ -0,0 +1,180 @@
+import logging
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Sequence, Tuple
+
+from .cache import DATASET_CACHE, CacheManager
+from .config import WARMER_BUDGET, WARMER_HOURS, WARMER_PERIOD_DAYS, WARMER_TOP_N
+from .http_client import BudgetExceeded, request_budget
+from .metrics import METRICS, stage
+from .storage import VacancyStore
+
+logger = logging.getLogger(__name__)
+
+
+def parse_hours(hours: str) -> Tuple[int, int]:
+	"""Parse an hour window like `"2-6"` (start included, end excluded)."""
+	start, _, end = hours.partition("-")
+	start, end = int(start), int(end)
+	if not (0 <= start <= 23 and 0 <= end <= 24):
+		raise ValueError(f"Invalid hours window '{hours}'")
+	return start, end
+
+
+class CacheWarmer:
+	r"""Background refresh of the most popular queries in off-peak hours.
+
+	User requests are counted by `VacancyStore.record_request`. Once a day, within the
+	off-peak window, datasets of the `top_n` most popular queries of the last `period_days`
+	days are refreshed incrementally (only new vacancies are fetched), so user requests are
+	served from cache. `warm` also computes the aggregate snapshot of the refreshed dataset
+	(statistics of the default request parameters) into the statistics cache.
+
+	Every API process runs a warmer: a run takes a lock of the cache backend and leaves a mark
+	of the day in it, so the popular queries are warmed once a day by one process (one node
+	with a shared backend).
+
+	Parameters
+	----------
+	warm : callable
+		Function refreshing the dataset and statistics of a query: `warm(options, sources)`.
+	store : VacancyStore, optional
+		Store with query popularity.
+	top_n : int
+		Number of queries to refresh. 0 disables the warmer.
+	hours : str
+		Off-peak hours of local time, e.g. `"2-6"` or `"23-5"`.
+	budget : int
+		Maximal number of requests to external APIs per run. The requests of `warm` are
+		counted by `http_client.request_budget`: a crawl stops as soon as the budget is spent,
+		queries whose search pages alone do not fit into the rest of it are skipped.
+	period_days : int
+		Popularity is counted over this number of days.
+	check_interval : float
+		How often the scheduler wakes up, in seconds.
+	cache : CacheManager
+		Cache whose backend holds the lock and the marks of runs.
+
+	"""
+
+	def __init__(
+			self,
+			warm: Callable[[Dict, Sequence[str]], None],
+			store: Optional[VacancyStore] = None,
+			top_n: int = WARMER_TOP_N,
+			hours: str = WARMER_HOURS,
+			budget: int = WARMER_BUDGET,
+			period_days: int = WARMER_PERIOD_DAYS,
+			check_interval: float = 600.0,
+			cache: CacheManager = DATASET_CACHE,
+	):
+		self._warm = warm
+		self._store = store
+		self.top_n = top_n
+		self.hours = parse_hours(hours)
+		self.budget = budget
+		self.period_days = period_days
+		self.check_interval = check_interval
+		self.cache = cache
+		self.last_run: Optional[Dict] = None
+		self._last_day: Optional[str] = None
+		self._stop = threading.Event()
+		self._thread: Optional[threading.Thread] = None
+
+	@property
+	def store(self) -> VacancyStore:
+		if self._store is None:
+			self._store = VacancyStore()
+		return self._store
+
+	def in_window(self, now: Optional[datetime] = None) -> bool:
+		hour = (now or datetime.now()).hour
+		start, end = self.hours
+		if start <= end:
+			return start <= hour < end
+		return hour >= start or hour < end
+
+	def _listing_cost(self, query: Dict) -> int:
+		"""Lower bound of requests to refresh a query: counting and listing search pages of its last dataset."""
+		found = self.store.count(query["query_key"])
+		return 2 + math.ceil(found / max(query["options"].get("per_page") or 1, 1))
+
+	def run_once(self) -> Dict:
+		"""Refresh popular queries within the budget.
+
+		Returns
+		-------
+		dict
+			IDs of `warmed`, `failed` and `skipped` (out of budget) queries, number of external
+			API `requests` and `seconds` spent.
+
+		"""
+		start = time.perf_counter()
+		summary = {"warmed": [], "failed": [], "skipped": []}
+		with request_budget(self.budget) as budget:
+			for query in self.store.popular_queries(self.top_n, self.period_days):
+				if budget.remaining < self._listing_cost(query):
+					summary["skipped"].append(query["query_key"])
+					continue
+				try:
+					with stage("cache_warming"):
+						self._warm(query["options"], query["sources"])
+				except BudgetExceeded:
+					logger.warning("Cache warming of %s stopped: the budget is spent", query["options"])
+					summary["skipped"].append(query["query_key"])
+					continue
+				except Exception as e:
+					logger.warning("Cache warming of %s failed: %s", query["options"], e)
+					summary["failed"].append(query["query_key"])
+					continue
+				summary["warmed"].append(query["query_key"])
+
+		for result in ("warmed", "failed", "skipped"):
+			METRICS.inc(
+				"hh_warmer_queries_total", len(summary[result]), {"result": result}, "Queries handled by the cache warmer"
+			)
+		summary["requests"] = budget.spent
+		summary["seconds"] = round(time.perf_counter() - start, 3)
+		self.last_run = summary
+		return summary
+
+	def run_daily(self, day: str) -> Optional[Dict]:
+		"""`run_once` unless another process sharing the cache backend runs it or has run it on the day."""
+		mark = f"warmer-{day}"
+		with self.cache.lock(mark, blocking=False) as acquired:
+			if not acquired or self.cache.get(mark, record=False) is not None:
+				return None
+			summary = self.run_once()
+			self.cache.set(mark, summary)
+		return summary
+
+	def _run(self):
+		while True:
+			now = datetime.now()
+			day = now.strftime("%Y-%m-%d")
+			if self.in_window(now) and self._last_day != day:
+				self._last_day = day
+				summary = self.run_daily(day)
+				if summary is not None:
+					logger.info(
+						"Cache warming: %d warmed, %d failed, %d skipped", len(summary["warmed"]),
+						len(summary["failed"]), len(summary["skipped"]), extra={"warming": summary},
+					)
+			if self._stop.wait(self.check_interval):
+				return
+
+	def start(self):
+		"""Start the scheduler thread (no-op if `top_n` is 0 or it is running)."""
+		if self.top_n <= 0 or (self._thread is not None and self._thread.is_alive()):
+			return
+		self._stop.clear()
+		self._thread = threading.Thread(target=self._run, name="cache-warmer", daemon=True)
+		self._thread.start()
+
+	def stop(self):
+		self._stop.set()
+		if self._thread is not None:
+			self._thread.join()
+			self._thread = None
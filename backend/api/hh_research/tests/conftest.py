@@ -0,0 +1,44 @@
+import os
+import tempfile
+
+# Configuration is read on import of `src.config`: caches of the tests are kept in memory,
+# files of the default cache directory go to a temporary one, raw responses are not archived
+os.environ["HH_CACHE_BACKEND"] = "memory"
+os.environ["HH_CACHE_DIR"] = tempfile.mkdtemp(prefix="hh-tests-")
+os.environ.pop("HH_ARCHIVE_DIR", None)
+
+import pytest  # noqa: E402
+
+from benchmarks.fake_hh import FakeHHServer, make_vacancy  # noqa: E402
+from src.data_collector import DataCollector  # noqa: E402
+
+RATES = {"RUR": 1.0, "USD": 0.011, "EUR": 0.0095}
+
+# Router and crawler are imported as a part of the `api` package of the backend, like in `main.py`
+BACKEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "..", ".."))
+
+
+@pytest.fixture(scope="session")
+def fake_api():
+	"""Fake HH API of 120 vacancies which the `api.hh_research` package is configured with.
+
+	Configuration is read on import, so tests import modules of the package once the fake API is
+	running. The cache warmer is disabled, it would crawl in background in its hours.
+
+	"""
+	with FakeHHServer(vacancies=120) as server, pytest.MonkeyPatch.context() as patch:
+		patch.setenv("HH_API_URL", server.url)
+		patch.setenv("HH_WARMER_TOP_N", "0")
+		patch.syspath_prepend(BACKEND_DIR)
+		yield server
+
+
+@pytest.fixture
+def dataset_of():
+	"""Dataset (`DataCollector` format) of synthetic vacancies with the given IDs."""
+	collector = DataCollector(RATES)
+
+	def make(ids, seed: int = 0):
+		return collector.parse_vacancies(make_vacancy(x, seed) for x in ids)
+
+	return make
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from benchmarks.fake_hh import make_vacancy
+from src.archive import RawArchive, iter_blocks
+
+from .conftest import RATES
+
+
+def renamed(vacancy_id: int, name: str):
+	return {**make_vacancy(vacancy_id), "name": name}
+
+
+@pytest.fixture
+def archive(tmp_path):
+	archive = RawArchive(str(tmp_path / "archive"), block_records=8)
+	yield archive
+	archive.close()
+
+
+def test_latest_record_of_a_key_is_read(archive):
+	for idx in range(1, 21):
+		archive.add("vacancy", str(idx), make_vacancy(idx))
+	archive.add("vacancy", "5", renamed(5, "Updated"))
+	archive.add("listing", "page-0", {"items": [{"id": "1"}]})
+	# Buffered records are not indexed until they are written
+	assert archive.get("vacancy", "5")["name"] != "Updated"
+	archive.flush()
+
+	assert archive.get("vacancy", "5")["name"] == "Updated"
+	assert archive.get("vacancy", "7") == make_vacancy(7)
+	assert archive.get("listing", "page-0") == {"items": [{"id": "1"}]}
+	assert archive.get("vacancy", "21") is None
+	assert sum(len(x) for x in archive.latest("vacancy").values()) == 20
+
+
+def test_block_cut_off_by_an_interruption_ends_the_chunk(archive):
+	for idx in range(1, 17):
+		archive.add("vacancy", str(idx), make_vacancy(idx))
+	archive.flush()
+	[chunk] = archive.chunks()
+	path = os.path.join(archive.path, chunk)
+	second = [offset for offset, _ in iter_blocks(path)][1]
+	with open(path, "rb") as f:
+		block = f.read(second)
+	with open(path, "ab") as f:
+		f.write(block[:-10])
+	assert [len(records) for _, records in iter_blocks(path)] == [8, 8]
+
+
+def test_store_is_rebuilt_from_the_archive(tmp_path, archive, fake_api):
+	from api.hh_research.reprocess import reprocess
+	from api.hh_research.src.data_collector import DataCollector
+	from api.hh_research.src.storage import VacancyStore
+
+	for idx in range(1, 31):
+		archive.add("vacancy", str(idx), make_vacancy(idx))
+	archive.add("vacancy", "3", renamed(3, "Updated"))
+	archive.flush()
+
+	# The store has vacancies parsed by an older parser
+	store = VacancyStore(str(tmp_path / "vacancies.sqlite3"))
+	ids = [str(x) for x in range(1, 31)]
+	store.upsert(DataCollector(RATES).parse_vacancies(renamed(x, "Outdated") for x in range(1, 31)))
+	store.record_query("query", "text=python", ids)
+	try:
+		summary = reprocess(RawArchive(archive.path), store, processes=2, rates=RATES)
+		names = {x["id"]: x["name"] for x in store.iter_vacancies("query", columns=["id", "name"])}
+	finally:
+		store.close()
+	assert summary["vacancies"] == 30
+	assert names["3"] == "Updated"
+	assert all(names[str(x)] == make_vacancy(x)["name"] for x in range(4, 31))
@@ -0,0 +1,172 @@
+import os
+import pickle
+import threading
+import time
+import uuid
+
+import pytest
+
+from src import cache as cache_module
+from src.cache import CacheManager, DiskBackend, MemoryBackend, RedisBackend
+
+
+@pytest.fixture(params=["memory", "disk", "redis"])
+def backend(request, tmp_path):
+	if request.param == "memory":
+		yield MemoryBackend()
+	elif request.param == "disk":
+		yield DiskBackend(str(tmp_path / "cache"))
+	else:
+		url = os.environ.get("HH_TEST_REDIS_URL")
+		if not url:
+			pytest.skip("HH_TEST_REDIS_URL is not set")
+		pytest.importorskip("redis")
+		backend = RedisBackend(url, f"test-{uuid.uuid4().hex}", poll_interval=0.01)
+		yield backend
+		for key in backend._redis.scan_iter(match=backend._prefix + "*"):
+			backend._redis.delete(key)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+	"""Time of `CacheManager` entries, moved by the test."""
+	now = [1_000_000.0]
+	monkeypatch.setattr(cache_module.time, "time", lambda: now[0])
+	return now
+
+
+def test_backend_stores_entries(backend):
+	assert backend.get("key") is None
+	backend.set("key", b"value")
+	assert backend.get("key") == b"value"
+	backend.set("key", b"other")
+	assert backend.get("key") == b"other"
+	assert backend.usage()[0] == 1
+	backend.delete("key")
+	assert backend.get("key") is None
+
+
+def test_backend_lock_is_exclusive(backend):
+	results = []
+
+	def try_lock():
+		with backend.lock("key", blocking=False) as acquired:
+			results.append(acquired)
+
+	with backend.lock("key") as acquired:
+		assert acquired
+		thread = threading.Thread(target=try_lock)
+		thread.start()
+		thread.join()
+	try_lock()
+	assert results == [False, True]
+
+
+def test_blocking_lock_waits_for_release(backend):
+	events = []
+	locked = threading.Event()
+
+	def hold():
+		with backend.lock("key"):
+			locked.set()
+			time.sleep(0.2)
+			events.append("released")
+
+	thread = threading.Thread(target=hold)
+	thread.start()
+	locked.wait()
+	with backend.lock("key") as acquired:
+		events.append("acquired")
+	thread.join()
+	assert acquired
+	assert events == ["released", "acquired"]
+
+
+def test_memory_backend_evicts_least_recently_used():
+	backend = MemoryBackend()
+	for key in ("a", "b", "c"):
+		backend.set(key, b"x" * 10)
+	backend.touch("a")
+	assert backend.evict(20) == 1
+	assert backend.get("b") is None
+	assert backend.get("a") is not None and backend.get("c") is not None
+
+
+def test_disk_backend_evicts_least_recently_used(tmp_path):
+	backend = DiskBackend(str(tmp_path))
+	for mtime, key in enumerate(("a", "b", "c"), start=1):
+		backend.set(key, b"x" * 10)
+		os.utime(tmp_path / key, (mtime, mtime))
+	backend.touch("a")
+	assert backend.evict(20) == 1
+	assert backend.get("b") is None
+	assert backend.get("a") is not None and backend.get("c") is not None
+
+
+def test_entry_is_fresh_then_stale_then_missing(clock):
+	cache = CacheManager("test", backend=MemoryBackend(), ttl=10, stale_ttl=20)
+	cache.set("key", {"value": 1})
+	entry = cache.get("key")
+	assert entry.value == {"value": 1} and not entry.stale
+
+	clock[0] += 15
+	entry = cache.get("key")
+	assert entry.value == {"value": 1} and entry.stale
+
+	clock[0] += 20
+	assert cache.get("key") is None
+	assert cache.stats() == {"hits": 1, "stale_hits": 1, "misses": 1, "evictions": 0, "entries": 0, "bytes": 0}
+
+
+def test_negative_entry_has_no_stale_window(clock):
+	cache = CacheManager("test", backend=MemoryBackend(), ttl=100, stale_ttl=100, negative_ttl=5)
+	cache.set("key", [], negative=True)
+	assert not cache.get("key").stale
+	clock[0] += 6
+	assert cache.get("key") is None
+
+
+def test_rechecks_are_not_counted():
+	cache = CacheManager("test", backend=MemoryBackend())
+	cache.get("key", record=False)
+	cache.set("key", 1)
+	cache.get("key", record=False)
+	assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+def test_unreadable_entry_is_a_miss():
+	backend = MemoryBackend()
+	backend.set("key", b"not a pickle")
+	assert CacheManager("test", backend=backend).get("key") is None
+
+
+def test_size_cap_evicts_least_recently_used():
+	value = b"x" * 1000
+	size = len(pickle.dumps({"value": value, "created_at": 0.0, "expires_at": 0.0, "stale_until": 0.0}))
+	cache = CacheManager("test", backend=MemoryBackend(), max_bytes=int(size * 2.5))
+	cache.set("a", value)
+	cache.set("b", value)
+	cache.get("a")
+	cache.set("c", value)
+	assert cache.get("b") is None
+	assert cache.get("a") is not None and cache.get("c") is not None
+	assert cache.stats()["evictions"] == 1
+
+
+def test_managers_of_a_backend_share_entries_and_locks():
+	backend = MemoryBackend()
+	node_a, node_b = CacheManager("test", backend=backend), CacheManager("test", backend=backend)
+	node_a.set("key", "crawled by a")
+	assert node_b.get("key").value == "crawled by a"
+
+	results = []
+
+	def try_lock():
+		with node_b.lock("key", blocking=False) as acquired:
+			results.append(acquired)
+
+	with node_a.lock("key"):
+		thread = threading.Thread(target=try_lock)
+		thread.start()
+		thread.join()
+	assert results == [False]
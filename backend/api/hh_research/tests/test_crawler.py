@@ -0,0 +1,56 @@
+import json
+
+import pytest
+
+
+@pytest.fixture
+def crawler(fake_api):
+	from api.hh_research import crawler
+
+	return crawler
+
+
+def test_queries_are_read_for_every_area(tmp_path, crawler):
+	path = tmp_path / "queries.txt"
+	path.write_text('# comment\npython\njava\tКазань\n\n{"text": "go", "per_page": 20}\n', encoding="utf-8")
+	assert crawler.read_queries(str(path), ["Москва", "Томск"]) == [
+		{"text": "python", "area": "Москва"},
+		{"text": "python", "area": "Томск"},
+		{"text": "java", "area": "Казань"},
+		{"text": "go", "per_page": 20, "area": "Москва"},
+		{"text": "go", "per_page": 20, "area": "Томск"},
+	]
+
+
+def test_checkpoint_skips_finished_queries(tmp_path, crawler):
+	checkpoint = str(tmp_path / "queries.txt.checkpoint")
+	queries = [{"text": "rust"}, {"text": "scala"}, {"text": "kotlin"}]
+	ids = [crawler.query_id(x, ["hh"]) for x in queries]
+	# The first query is done, the record of the second one was cut off by an interruption
+	with open(checkpoint, "w", encoding="utf-8") as f:
+		f.write(json.dumps({"query": ids[0], "status": "done"}) + "\n" + '{"query": "' + ids[1][:10])
+	assert crawler.read_checkpoint(checkpoint) == {ids[0]}
+
+	results = crawler.crawl(queries, processes=2, num_workers=4, checkpoint=checkpoint)
+	assert sorted(x["query"] for x in results) == sorted(ids[1:])
+	assert all(x["status"] == "done" and x["vacancies"] == 120 for x in results)
+	assert crawler.read_checkpoint(checkpoint) == set(ids)
+
+	# A rerun has nothing to do
+	assert crawler.crawl(queries, processes=2, checkpoint=checkpoint) == []
+
+
+def test_failed_queries_are_retried_by_a_rerun(tmp_path, crawler, fake_api):
+	checkpoint = str(tmp_path / "queries.txt.checkpoint")
+	queries = [{"text": "haskell"}]
+	fake_api.error_rate = 1.0
+	try:
+		results = crawler.crawl_shard(queries, ["hh"], 4, False, checkpoint)
+	finally:
+		fake_api.error_rate = 0.0
+	assert [x["status"] for x in results] == ["failed"]
+	assert crawler.read_checkpoint(checkpoint) == set()
+
+	results = crawler.crawl(queries, num_workers=4, checkpoint=checkpoint)
+	assert [x["status"] for x in results] == ["done"]
+	assert crawler.read_checkpoint(checkpoint) == {crawler.query_id(queries[0], ["hh"])}
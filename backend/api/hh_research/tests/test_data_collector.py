@@ -0,0 +1,176 @@
+import threading
+from typing import Callable, Dict, List
+
+import pytest
+
+from benchmarks.fake_hh import make_superjob_vacancy, make_vacancy
+from src.cache import CacheManager, MemoryBackend
+from src.data_collector import DataCollector
+from src.sources import VacancySource, transform_superjob_to_hh
+from src.storage import VacancyStore
+
+from .conftest import RATES
+
+QUERY = {"text": "python", "area": 1, "per_page": 50}
+
+
+def superjob_vacancy(vacancy_id: int) -> Dict:
+	"""SuperJob vacancy as `SuperJobSource` returns it. Odd IDs repeat HH vacancies."""
+	return {**transform_superjob_to_hh(make_superjob_vacancy(vacancy_id)), "id": f"sj-{vacancy_id}"}
+
+
+class FakeSource(VacancySource):
+	"""Source of `size` synthetic vacancies which records the IDs whose details are fetched."""
+
+	def __init__(self, size: int, name: str = "hh", prefix: str = "", make: Callable[[int], Dict] = make_vacancy):
+		self.name = name
+		self.size = size
+		self.prefix = prefix
+		self.make = make
+		self.fetched: List[str] = []
+
+	def fetch(self, query: Dict, num_workers: int = 1, limit=None, known=(), progress=None) -> List[Dict]:
+		ids = [f"{self.prefix}{x}" for x in range(1, self.size + 1)][:limit]
+		new = [x for x in ids if x not in known]
+		self.fetched.extend(new)
+		return [self.make(idx) if x in new else {"id": x} for idx, x in enumerate(ids, start=1)]
+
+
+def make_collector(sources: List[FakeSource], cache: CacheManager, store=None) -> DataCollector:
+	collector = DataCollector(RATES, store=store, cache=cache)
+	collector._sources = sources
+	return collector
+
+
+@pytest.fixture
+def cache():
+	return CacheManager("datasets", backend=MemoryBackend())
+
+
+
+def test_columns_of_parsed_vacancies():
+	vacancy = {**make_vacancy(1), "name": "Python Developer", "employer": {"name": "Acme"}}
+	dataset = DataCollector(RATES).parse_vacancies([vacancy])
+	assert (dataset["Ids"], dataset["Name"], dataset["Employer"]) == (["1"], ["Python Developer"], ["Acme"])
+
+def test_vacancies_of_several_sources_are_merged(cache):
+	hh, superjob = FakeSource(10), FakeSource(10, "superjob", "sj-", superjob_vacancy)
+	dataset = make_collector([hh, superjob], cache).collect_vacancies(QUERY)
+	# Odd SuperJob vacancies repeat HH ones, the vacancy of the first source is kept
+	assert dataset["Ids"] == [str(x) for x in range(1, 11)] + [f"sj-{x}" for x in range(2, 11, 2)]
+
+
+def test_duplicates_of_sources_need_similar_salaries():
+	#         id, name, employer, salary, from, to, experience, schedule, keys, description, area, published
+	hh = ("1", "Python Developer", "ООО Рога и копыта", True, 100_000, 150_000, "", "", ["Python"], "", "Москва", None)
+	near = ("sj-1", "python developer", "Рога и Копыта", True, 110_000, 150_000, "", "", ["Django"], "text", "Москва", None)
+	far = ("sj-2", "Python Developer", "Рога и копыта", True, 200_000, 250_000, "", "", [], "", "Москва", None)
+	merged = DataCollector.merge_duplicates([[hh], [near, far]])
+	assert [x[0] for x in merged] == ["1", "sj-2"]
+	# Key skills are united, an empty description is filled
+	assert merged[0][8] == ["Python", "Django"]
+	assert merged[0][9] == "text"
+
+
+def test_store_is_synced_with_a_dataset_of_another_node(cache):
+	# Two nodes share the dataset cache, every node has its own store
+	store_a, store_b = VacancyStore(":memory:"), VacancyStore(":memory:")
+	source_a = FakeSource(20)
+	node_a = make_collector([source_a], cache, store_a)
+	node_b = make_collector([FakeSource(20)], cache, store_b)
+	key = node_a.dataset_key(QUERY)
+
+	_, version = node_a.collect_dataset(QUERY)
+	assert store_a.dataset_version(key) == version
+	assert store_b.dataset_version(key) is None
+
+	dataset, synced = node_b.collect_dataset(QUERY)
+	assert synced == version == node_b.dataset_version(QUERY)
+	assert store_b.dataset_version(key) == version
+	assert store_b.count(key) == len(dataset["Ids"]) == 20
+	assert store_b.snapshots(key) == store_a.snapshots(key) == [{"version": version, "vacancy_count": 20}]
+
+	source_a.size = 25
+	_, refreshed = node_a.collect_dataset(QUERY, refresh=True)
+	assert refreshed > version
+	_, synced = node_b.collect_dataset(QUERY)
+	assert synced == refreshed == store_b.dataset_version(key)
+	assert store_b.count(key) == 25
+	assert store_b.diff_snapshots(key) == store_a.diff_snapshots(key)
+
+
+@pytest.mark.parametrize(
+	"cached_limit, limit, covers",
+	[(None, None, True), (None, 10, True), (10, None, False), (10, 5, True), (10, 10, True), (5, 10, False)],
+)
+def test_covers(cached_limit, limit, covers):
+	assert DataCollector._covers(cached_limit, limit) is covers
+
+
+def test_limited_dataset_is_extended(cache):
+	source = FakeSource(30)
+	collector = make_collector([source], cache)
+
+	assert collector.collect_vacancies(QUERY, limit=5)["Ids"] == [str(x) for x in range(1, 6)]
+	assert len(source.fetched) == 5
+
+	# A larger limit extends the cached dataset, details of cached vacancies are not fetched again
+	assert collector.collect_vacancies(QUERY, limit=10)["Ids"] == [str(x) for x in range(1, 11)]
+	assert source.fetched[5:] == [str(x) for x in range(6, 11)]
+
+	# A smaller limit is a slice of the cached dataset
+	assert collector.collect_vacancies(QUERY, limit=3)["Ids"] == ["1", "2", "3"]
+	assert len(source.fetched) == 10
+
+	# The complete dataset serves every limit
+	assert len(collector.collect_vacancies(QUERY)["Ids"]) == 30
+	assert len(source.fetched) == 30
+	assert collector.collect_vacancies(QUERY, limit=20)["Ids"] == [str(x) for x in range(1, 21)]
+	assert len(source.fetched) == 30
+
+
+def test_limit_larger_than_the_result_makes_a_complete_dataset(cache):
+	source = FakeSource(8)
+	collector = make_collector([source], cache)
+	collector.collect_vacancies(QUERY, limit=10)
+	assert len(collector.collect_vacancies(QUERY)["Ids"]) == 8
+	assert len(source.fetched) == 8
+
+
+class PausedSource(FakeSource):
+	"""Source which reports the first `pause_after` vacancies and waits for `resume` to fetch the rest."""
+
+	def __init__(self, size: int, pause_after: int):
+		super().__init__(size)
+		self.pause_after = pause_after
+		self.resume = threading.Event()
+
+	def fetch(self, query: Dict, num_workers: int = 1, limit=None, known=(), progress=None) -> List[Dict]:
+		vacancies = super().fetch(query, num_workers, limit, known)
+		if progress is not None:
+			progress.expect(self.name, len(vacancies))
+		for idx, vacancy in enumerate(vacancies):
+			if idx == self.pause_after:
+				self.resume.wait(10)
+			if progress is not None:
+				progress.add(vacancy)
+		return vacancies
+
+
+def test_collection_within_budget_returns_a_partial_dataset(cache):
+	source = PausedSource(40, pause_after=10)
+	collector = make_collector([source], cache)
+	try:
+		dataset, coverage, version = collector.collect_within(QUERY, budget=0.5)
+	finally:
+		source.resume.set()
+	assert dataset["Ids"] == [str(x) for x in range(1, 11)]
+	assert coverage == {"fetched": 10, "expected": 40, "ratio": 0.25}
+	assert version is None
+
+	# The crawl goes on after the budget and completes the cached dataset
+	dataset, version = collector.collect_in_background(QUERY).result(timeout=10)
+	dataset, coverage, version = collector.collect_within(QUERY, budget=0.5)
+	assert len(dataset["Ids"]) == 40
+	assert coverage is None and version is not None
+	assert len(source.fetched) == 40
@@ -0,0 +1,61 @@
+import random
+
+import pytest
+
+from src import dedup
+from src.dedup import LSHIndex, MinHasher, find_duplicates, lsh_bands
+
+
+def words(count: int, seed: int):
+	rnd = random.Random(seed)
+	return [f"w{rnd.randrange(5000)}" for _ in range(count)]
+
+
+def test_near_duplicates_are_found():
+	text = " ".join(words(300, seed=1))
+	edited = text.replace(text.split()[100], "edited", 1)
+	other = " ".join(words(300, seed=2))
+	assert find_duplicates(["a", "b", "c"], [text, other, edited]) == {"c": "a"}
+
+
+def test_empty_texts_are_not_duplicates():
+	assert find_duplicates(["x", "y", "z"], ["", "", "real text here ok"]) == {}
+	assert find_duplicates(["x", "y"], [None, " \n "]) == {}
+
+
+@pytest.mark.parametrize("threshold", [0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+def test_banding_follows_the_threshold(threshold):
+	bands = lsh_bands(threshold)
+	rows = 128 // bands
+	assert bands * rows == 128
+	# Texts at the threshold share a band with a high probability
+	assert 1 - (1 - threshold ** rows) ** bands > 0.9
+	assert LSHIndex(threshold=threshold).bands == bands
+
+
+def test_bands_decrease_with_the_threshold():
+	bands = [lsh_bands(x / 20) for x in range(10, 21)]
+	assert bands == sorted(bands, reverse=True)
+
+
+def test_low_threshold_finds_less_similar_texts():
+	text = words(300, seed=1)
+	similar = text[:230] + [f"z{x}" for x in range(40)]
+	hasher = MinHasher()
+	similarity = (hasher.signature(" ".join(text)) == hasher.signature(" ".join(similar))).mean()
+	assert 0.5 < similarity < 0.6
+	assert find_duplicates(["a", "b"], [" ".join(text), " ".join(similar)], threshold=0.5) == {"b": "a"}
+	assert find_duplicates(["a", "b"], [" ".join(text), " ".join(similar)], threshold=0.8) == {}
+
+
+def test_signatures_are_cached_by_dataset(monkeypatch):
+	texts = [" ".join(words(100, seed=x)) for x in range(5)]
+	ids = [str(x) for x in range(5)]
+	find_duplicates(ids, texts, dataset_key="dataset")
+	assert set(dedup.load_signatures("dataset")) == set(ids)
+
+	def signature(self, text):
+		raise AssertionError("Signature of a cached text is computed again")
+
+	monkeypatch.setattr(MinHasher, "signature", signature)
+	assert find_duplicates(ids, texts, dataset_key="dataset") == {}
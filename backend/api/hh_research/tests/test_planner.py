@@ -0,0 +1,41 @@
+import pytest
+
+from benchmarks.fake_hh import AREAS, FakeHHServer
+from src.planner import QueryPlanner
+
+
+@pytest.fixture(scope="module")
+def server():
+	# Vacancy counts are taken from the search handler directly, without HTTP requests
+	with FakeHHServer(vacancies=1500, filters=True) as server:
+		yield server
+
+
+def found_ids(server, query):
+	ids = server._filter(query)
+	return set(range(1, server.vacancies + 1)) if ids is None else set(ids)
+
+
+def test_partitions_fit_depth_limit_and_cover_query(server):
+	def count(query):
+		return server.search({**query, "per_page": 1})["found"]
+
+	planner = QueryPlanner(count, AREAS, depth_limit=200)
+	partitions = planner.plan({"text": "python"})
+	assert len(partitions) > 1
+	assert not planner.truncated
+	assert all(count(x) <= 200 for x in partitions)
+	assert set().union(*(found_ids(server, x) for x in partitions)) == set(range(1, 1501))
+
+
+def test_small_and_empty_queries_are_not_split():
+	planner = QueryPlanner(lambda query: 0, AREAS, depth_limit=200)
+	assert planner.plan({"text": "python"}, found=150) == [{"text": "python"}]
+	assert planner.plan({"text": "python"}) == []
+
+
+def test_query_which_can_not_be_split_is_truncated():
+	planner = QueryPlanner(lambda query: 500, [], depth_limit=200)
+	query = {"text": "python", "date_from": "2025-01-01T00:00:00+0000", "date_to": "2025-01-01T00:01:00+0000"}
+	assert planner.plan(query) == [query]
+	assert planner.truncated == [query]
@@ -0,0 +1,53 @@
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.metrics import stage
+from src.profiling import RequestProfile, profile_request
+
+
+def busy_crawl_worker(seconds: float):
+	with stage("detail_fetch"):
+		deadline = time.monotonic() + seconds
+		while time.monotonic() < deadline:
+			pass
+
+
+def busy_other_request(stop: threading.Event):
+	while not stop.is_set():
+		pass
+
+
+def test_only_threads_of_the_profiled_request_are_sampled():
+	stop = threading.Event()
+	other = threading.Thread(target=busy_other_request, args=(stop,), name="other-request")
+	try:
+		with profile_request(interval=0.001) as prof:
+			# Started while profiling, but serves another request
+			other.start()
+			with ThreadPoolExecutor(max_workers=2, thread_name_prefix="crawl") as executor:
+				futures = [executor.submit(contextvars.copy_context().run, busy_crawl_worker, 0.1) for _ in range(2)]
+				for future in futures:
+					future.result()
+	finally:
+		stop.set()
+		other.join()
+
+	roots = {line.split(";")[0] for line in prof.profiler.folded().splitlines()}
+	assert threading.current_thread().name in roots
+	assert any(x.startswith("crawl") for x in roots)
+	assert "other-request" not in roots
+	assert prof.stages and prof.stages[0][0] == "detail_fetch"
+
+
+def test_old_profiles_are_pruned(tmp_path):
+	paths = []
+	for mtime in range(5):
+		path = RequestProfile(0.01).save(str(tmp_path), keep=3)
+		os.utime(path, (mtime, mtime))
+		paths.append(path)
+	RequestProfile(0.01).save(str(tmp_path), keep=3)
+	assert len(os.listdir(tmp_path)) == 3
+	assert not any(os.path.exists(x) for x in paths[:3])
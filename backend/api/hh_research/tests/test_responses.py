@@ -0,0 +1,56 @@
+import gzip
+import json
+from types import SimpleNamespace
+
+from starlette.requests import Request
+
+from src import responses
+from src.responses import MIN_COMPRESS_SIZE, json_response, negotiate_encoding
+
+DATA = {"items": [{"id": str(x), "name": "Python developer"} for x in range(100)]}
+
+
+def request_with(accept_encoding: str) -> Request:
+	headers = [(b"accept-encoding", accept_encoding.encode())] if accept_encoding else []
+	return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": headers})
+
+
+def test_gzip_is_used_without_brotli(monkeypatch):
+	monkeypatch.setattr(responses, "brotli", None)
+	assert negotiate_encoding("gzip, deflate, br") == "gzip"
+	assert negotiate_encoding("br") is None
+	assert negotiate_encoding("gzip;q=0, *") is None
+	assert negotiate_encoding("*") == "gzip"
+	assert negotiate_encoding("identity") is None
+
+	response = json_response(DATA, request_with("gzip, deflate, br"))
+	assert response.headers["content-encoding"] == "gzip"
+	assert response.headers["vary"] == "Accept-Encoding"
+	assert json.loads(gzip.decompress(response.body)) == DATA
+
+
+def test_brotli_is_preferred(monkeypatch):
+	# Negotiation only needs the module to be installed: a stand-in compressor is used without it
+	try:
+		import brotli
+	except ImportError:
+		brotli = SimpleNamespace(compress=lambda body, quality: b"br" + body, decompress=lambda body: body[2:])
+	monkeypatch.setattr(responses, "brotli", brotli)
+	assert negotiate_encoding("gzip, br") == "br"
+	assert negotiate_encoding("gzip, br;q=0") == "gzip"
+
+	response = json_response(DATA, request_with("gzip, br"))
+	assert response.headers["content-encoding"] == "br"
+	assert json.loads(brotli.decompress(response.body)) == DATA
+
+
+def test_small_and_not_negotiated_bodies_are_not_compressed():
+	small = {"id": "1"}
+	assert len(responses.dumps(small)) < MIN_COMPRESS_SIZE
+	for response in (
+		json_response(small, request_with("gzip")),
+		json_response(DATA, request_with("")),
+		json_response(DATA),
+	):
+		assert "content-encoding" not in response.headers
+		assert json.loads(response.body) in (small, DATA)
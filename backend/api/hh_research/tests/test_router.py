@@ -0,0 +1,75 @@
+import json
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def client(fake_api):
+	from api.hh_research.router import router
+
+	app = FastAPI()
+	app.include_router(router)
+	with TestClient(app) as client:
+		yield client
+
+
+def requests_made() -> float:
+	from api.hh_research.src.metrics import METRICS
+
+	return METRICS.total("hh_http_requests_total")
+
+
+def test_statistics_are_not_modified_until_the_dataset_changes(client):
+	params = {"text": "python", "per_page": 50}
+	response = client.get("/get_statistics", params=params)
+	assert response.status_code == 200
+	etag = response.headers["ETag"]
+	assert response.headers["Last-Modified"]
+
+	served = requests_made()
+	response = client.get("/get_statistics", params=params, headers={"If-None-Match": etag})
+	assert response.status_code == 304
+	assert response.headers["ETag"] == etag
+	assert not response.content
+	assert requests_made() == served
+
+	# Other parameters of the same dataset have another ETag
+	response = client.get("/get_statistics", params={**params, "bins": 20}, headers={"If-None-Match": etag})
+	assert response.status_code == 200
+	assert response.headers["ETag"] != etag
+
+	# A refreshed dataset is a new version
+	client.get("/get_statistics", params={**params, "refresh": True})
+	response = client.get("/get_statistics", params=params, headers={"If-None-Match": etag})
+	assert response.status_code == 200
+	assert response.headers["ETag"] != etag
+
+
+def read_events(response):
+	events = []
+	for block in response.text.strip().split("\n\n"):
+		lines = dict(x.split(": ", 1) for x in block.split("\n"))
+		events.append((lines["event"], json.loads(lines["data"])))
+	return events
+
+
+def test_statistics_stream_reports_progress_then_result(client):
+	params = {"text": "golang", "per_page": 50, "every": 20, "interval": 60}
+	response = client.get("/get_statistics/stream", params=params)
+	assert response.status_code == 200
+	assert response.headers["content-type"].startswith("text/event-stream")
+	events = read_events(response)
+	progress = [data for event, data in events[:-1] if event == "progress"]
+	assert [event for event, _ in events] == ["progress"] * len(progress) + ["result"]
+	assert progress
+	counts = [x["vacancy_count"] for x in progress]
+	assert counts == sorted(counts) and counts[-1] <= 120
+	assert all(0 < x["coverage"]["ratio"] <= 1 for x in progress)
+	assert events[-1][1]["vacancy_count"] == 120
+
+	# The dataset is cached now: the result is sent at once
+	events = read_events(client.get("/get_statistics/stream", params=params))
+	assert [event for event, _ in events] == ["result"]
+	assert events[-1][1]["vacancy_count"] == 120
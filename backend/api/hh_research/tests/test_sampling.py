@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+
+from src.sampling import allocate, estimate, stratified_sample
+
+
+def population(size: int = 3000, seed: int = 0):
+	"""Salaries of three strata (e.g. experience) with different levels, a third of them unknown."""
+	rng = np.random.default_rng(seed)
+	strata = rng.choice(["junior", "middle", "senior"], size=size, p=[0.5, 0.3, 0.2])
+	levels = {"junior": 60000, "middle": 150000, "senior": 300000}
+	salaries = np.array([rng.normal(levels[x], levels[x] * 0.2) for x in strata])
+	salaries[rng.random(size) < 0.3] = np.nan
+	return strata, salaries
+
+
+def test_allocation_is_proportional_and_keeps_every_stratum():
+	counts = allocate([500, 300, 195, 5], 100)
+	assert counts.sum() == 100
+	assert list(counts) == [50, 30, 19, 1]
+	assert list(allocate([10, 0, 3], 100)) == [10, 0, 3]
+
+
+def test_sample_weights_restore_stratum_sizes():
+	strata, _ = population()
+	indices, codes, weights, fraction = stratified_sample(strata, 300, seed=1)
+	assert len(set(indices)) == 300
+	assert fraction == pytest.approx(0.1)
+	for code, name in enumerate(sorted(set(strata))):
+		assert weights[codes == code].sum() == pytest.approx((strata == name).sum())
+	assert np.array_equal(indices, stratified_sample(strata, 300, seed=1)[0])
+
+
+def test_confidence_intervals_cover_the_population_value():
+	strata, salaries = population()
+	true_mean, true_median = np.nanmean(salaries), np.nanmedian(salaries)
+	covered = {"mean": 0, "median": 0}
+	runs = 40
+	for seed in range(runs):
+		indices, codes, weights, fraction = stratified_sample(strata, 300, seed=seed)
+		for statistic, true_value in (("mean", true_mean), ("median", true_median)):
+			result = estimate(salaries[indices], codes, weights, statistic, fraction, n_boot=300, seed=seed)
+			assert result["low"] <= result["estimate"] <= result["high"]
+			covered[statistic] += result["low"] <= true_value <= result["high"]
+	# 95% intervals: a few misses of 40 are expected
+	assert covered["mean"] >= 0.85 * runs
+	assert covered["median"] >= 0.85 * runs
+
+
+def test_census_has_no_sampling_error():
+	strata, salaries = population(300)
+	indices, codes, weights, fraction = stratified_sample(strata, 300)
+	assert fraction == 1.0
+	result = estimate(salaries[indices], codes, weights, fraction=fraction)
+	assert result["low"] == pytest.approx(np.nanmean(salaries))
+	assert result["high"] == pytest.approx(np.nanmean(salaries))
+
+
+def test_empty_domain_gives_nan():
+	strata, _ = population(300)
+	indices, codes, weights, fraction = stratified_sample(strata, 30)
+	result = estimate(np.full(len(indices), np.nan), codes, weights, fraction=fraction)
+	assert np.isnan(result["estimate"]) and np.isnan(result["low"]) and np.isnan(result["high"])
@@ -0,0 +1,36 @@
+import pytest
+import requests
+
+from benchmarks.fake_hh import FakeHHServer
+from src.metrics import METRICS
+from src.sources import HHSource
+
+
+@pytest.fixture
+def server():
+	with FakeHHServer(vacancies=250) as server:
+		yield server
+
+
+def test_pages_are_listed_without_requests_past_the_end(server):
+	source = HHSource(api_url=server.url, archive=None)
+	labels = {"target": "vacancies", "status": "200"}
+	requests_made = METRICS.get("hh_http_requests_total", labels)
+	ids = source.list_ids({"text": "python", "per_page": 100})
+	assert ids == [str(x) for x in range(1, 251)]
+	# Count, number of pages and 3 pages
+	assert METRICS.get("hh_http_requests_total", labels) == requests_made + 5
+
+
+def test_removed_vacancy_is_an_error_stub(server):
+	source = HHSource(api_url=server.url, archive=None)
+	assert source.get("1")["id"] == "1"
+	assert source.get("999") == {"id": "999", "errors": [{"type": "not_found"}]}
+
+
+def test_error_status_fails_the_request_and_is_counted(server):
+	server.error_rate = 1.0
+	failures = METRICS.get("hh_http_requests_total", {"target": "vacancy", "status": "503"})
+	with pytest.raises(requests.HTTPError):
+		HHSource(api_url=server.url, archive=None).get("1")
+	assert METRICS.get("hh_http_requests_total", {"target": "vacancy", "status": "503"}) == failures + 1
@@ -0,0 +1,181 @@
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from src.storage import VacancyStore, utc_now
+
+
+@pytest.fixture
+def store():
+	store = VacancyStore(":memory:")
+	yield store
+	store.close()
+
+
+def expected_stats(values):
+	values = [x for x in values if x is not None]
+	return {"min": int(min(values)), "max": int(max(values)), "mean": int(np.mean(values)), "median": int(np.median(values))}
+
+
+def salary_values(dataset):
+	averages, froms, tos = [], [], []
+	for has_salary, salary_from, salary_to in zip(dataset["Salary"], dataset["From"], dataset["To"]):
+		bounds = [x for x in (salary_from, salary_to) if x is not None]
+		if has_salary and bounds:
+			averages.append(sum(bounds) / len(bounds))
+		froms.append(salary_from)
+		tos.append(salary_to)
+	return averages, froms, tos
+
+
+@pytest.mark.parametrize("size", [1, 50, 51])
+def test_salary_stats_match_numpy(store, dataset_of, size):
+	dataset = dataset_of(range(1, size + 1))
+	store.upsert(dataset)
+	store.record_query("query", "", dataset["Ids"])
+
+	averages, froms, tos = salary_values(dataset)
+	stats = store.salary_stats("query")
+	assert {x: stats[x] for x in ("min", "max", "mean", "median")} == (
+		expected_stats(averages) if averages else dict.fromkeys(("min", "max", "mean", "median"))
+	)
+	if any(x is not None for x in froms):
+		assert stats["from_stats"] == expected_stats(froms)
+	if any(x is not None for x in tos):
+		assert stats["to_stats"] == expected_stats(tos)
+	assert store.count("query") == size
+
+
+def test_salary_stats_exclude_ids(store, dataset_of):
+	dataset = dataset_of(range(1, 41))
+	store.upsert(dataset)
+	store.record_query("query", "", dataset["Ids"])
+	excluded = set(dataset["Ids"][:10])
+	rest = {key: values[10:] for key, values in dataset.items()}
+
+	averages, _, _ = salary_values(rest)
+	stats = store.salary_stats("query", exclude=excluded)
+	assert stats["median"] == expected_stats(averages)["median"]
+	assert store.count("query", exclude=excluded) == 30
+
+
+def test_aggregates_use_the_current_dataset_only(store, dataset_of):
+	old, new = dataset_of(range(1, 31)), dataset_of(range(21, 41))
+	store.upsert(old)
+	store.record_query("query", "", old["Ids"], crawled_at="2026-01-01 00:00:00.000000")
+	store.upsert(new)
+	store.record_query("query", "", new["Ids"], crawled_at="2026-01-02 00:00:00.000000")
+
+	assert store.dataset_version("query") == "2026-01-02 00:00:00.000000"
+	assert store.count("query") == 20
+	assert store.salary_stats("query")["median"] == expected_stats(salary_values(new)[0])["median"]
+
+
+
+def skill_counts(dataset, skip=0):
+	return Counter(x for keys in dataset["Keys"][skip:] for x in {key.lower().replace("'", "") for key in keys if key})
+
+
+def test_top_skills_are_counted_by_the_store(store, dataset_of):
+	dataset = dataset_of(range(1, 41))
+	store.upsert(dataset)
+	store.record_query("query", "", dataset["Ids"])
+
+	top = store.top_skills("query", top_n=5)
+	assert list(top.values()) == sorted(skill_counts(dataset).values(), reverse=True)[:5]
+	assert all(skill_counts(dataset)[x] == count for x, count in top.items())
+	excluded = store.top_skills("query", top_n=100, exclude=dataset["Ids"][:10])
+	assert excluded == {x: count for x, count in skill_counts(dataset, skip=10).items() if count}
+
+
+def test_skills_are_replaced_on_update(store, dataset_of):
+	dataset = dataset_of([1])
+	store.upsert(dataset)
+	store.upsert({**dataset, "Keys": [["Rust", "rust", "Go'lang"]]})
+	store.record_query("query", "", dataset["Ids"])
+	assert store.top_skills("query") == {"golang": 1, "rust": 1}
+
+
+def test_skills_of_an_old_store_are_filled(tmp_path, dataset_of):
+	path = str(tmp_path / "vacancies.sqlite3")
+	dataset = dataset_of(range(1, 11))
+	store = VacancyStore(path)
+	store.upsert(dataset)
+	store.record_query("query", "", dataset["Ids"])
+	expected = store.top_skills("query")
+	# A store written before the skills table existed
+	store._conn.execute("DROP TABLE vacancy_skills")
+	store._conn.commit()
+	store.close()
+
+	store = VacancyStore(path)
+	assert store.top_skills("query") == expected
+	store.close()
+
+def test_equal_dataset_does_not_make_a_version(store, dataset_of):
+	dataset = dataset_of(range(1, 11))
+	store.record_query("query", "", dataset["Ids"], crawled_at="2026-01-01 00:00:00.000000")
+	assert store.save_snapshot("query", dataset) == "2026-01-01 00:00:00.000000"
+	store.record_query("query", "", dataset["Ids"], crawled_at="2026-01-02 00:00:00.000000")
+	assert store.save_snapshot("query", dataset) == "2026-01-01 00:00:00.000000"
+	assert store.snapshots("query") == [{"version": "2026-01-01 00:00:00.000000", "vacancy_count": 10}]
+
+
+def test_versions_are_shared_by_stores(dataset_of):
+	# Stores of two nodes save the dataset of the shared cache with its version
+	old, new = dataset_of(range(1, 11)), dataset_of(range(5, 16))
+	stores = VacancyStore(":memory:"), VacancyStore(":memory:")
+	for store in stores:
+		store.save_snapshot("query", old, version="2026-01-01 00:00:00.000000")
+		store.save_snapshot("query", new, version="2026-01-02 00:00:00.000000")
+	diffs = [x.diff_snapshots("query", "2026-01-01 00:00:00.000000", "2026-01-02 00:00:00.000000") for x in stores]
+	assert diffs[0] == diffs[1]
+	assert diffs[0]["counts"]["added"] == 5
+
+
+def test_diff_snapshots(store, dataset_of):
+	old = dataset_of(range(1, 11))
+	new = dataset_of([x for x in range(3, 13) if x != 5])
+	changed = dataset_of([5], seed=1)
+	new = {key: values + changed[key] for key, values in new.items()}
+	store.record_query("query", "", old["Ids"], crawled_at=utc_now())
+	first = store.save_snapshot("query", old)
+	store.record_query("query", "", new["Ids"], crawled_at=utc_now())
+	second = store.save_snapshot("query", new)
+
+	diff = store.diff_snapshots("query")
+	assert first < second
+	assert (diff["from"]["version"], diff["to"]["version"]) == (first, second)
+	assert diff == store.diff_snapshots("query", to_version=second) == store.diff_snapshots("query", first, second)
+	assert sorted(diff["added"]) == ["11", "12"]
+	assert sorted(diff["removed"]) == ["1", "2"]
+	assert diff["changed"] == ["5"]
+	assert diff["counts"] == {"added": 2, "removed": 2, "changed": 1, "unchanged": 7}
+
+	old_averages, new_averages = salary_values(old)[0], salary_values(new)[0]
+	assert diff["salary_count"] == {
+		"from": len(old_averages), "to": len(new_averages), "delta": len(new_averages) - len(old_averages)
+	}
+	assert diff["salary_quantiles"]["p50"]["to"] == round(float(np.quantile(new_averages, 0.5)))
+	for skill, change in diff["top_keywords"].items():
+		count = sum(skill in (x.lower() for x in keys) for keys in new["Keys"])
+		assert change["to"] == count and change["delta"] == change["to"] - change["from"]
+
+
+def test_diff_of_missing_version(store, dataset_of):
+	dataset = dataset_of(range(1, 5))
+	store.record_query("query", "", dataset["Ids"])
+	version = store.save_snapshot("query", dataset)
+	assert store.diff_snapshots("query") is None
+	assert store.diff_snapshots("query", version, "2000-01-01 00:00:00.000000") is None
+	assert store.diff_snapshots("other") is None
+
+
+def test_old_versions_are_pruned(store, dataset_of):
+	versions = []
+	for last in range(2, 6):
+		dataset = dataset_of(range(1, last))
+		store.record_query("query", "", dataset["Ids"])
+		versions.append(store.save_snapshot("query", dataset, keep=2))
+	assert [x["version"] for x in store.snapshots("query")] == versions[:-3:-1]
@@ -0,0 +1,103 @@
+import threading
+from datetime import datetime
+from typing import Dict, List, Sequence
+
+import pytest
+
+from benchmarks.fake_hh import FakeHHServer
+from src.cache import CacheManager, MemoryBackend
+from src.http_client import get_json
+from src.storage import VacancyStore
+from src.warmer import CacheWarmer, parse_hours
+
+
+@pytest.fixture(scope="module")
+def server():
+	with FakeHHServer(vacancies=10) as server:
+		yield server
+
+
+@pytest.fixture
+def store():
+	store = VacancyStore(":memory:")
+	# Popularity: python 3 requests, java 2, go 1
+	for text, requests in (("python", 3), ("java", 2), ("go", 1)):
+		for _ in range(requests):
+			store.record_request(text, {"text": text, "per_page": 50}, ["hh"])
+	yield store
+	store.close()
+
+
+class Warm:
+	"""Warming which makes `costs[text]` requests to the fake API and records the warmed queries."""
+
+	def __init__(self, url: str, costs: Dict[str, int]):
+		self.url = url
+		self.costs = costs
+		self.warmed: List[str] = []
+
+	def __call__(self, options: Dict, sources: Sequence[str]):
+		for _ in range(self.costs[options["text"]]):
+			get_json(f"{self.url}/vacancies/", {"per_page": 1}, target="vacancies")
+		self.warmed.append(options["text"])
+
+
+def test_off_peak_hours():
+	assert parse_hours("2-6") == (2, 6)
+	warmer = CacheWarmer(warm=lambda *args: None, hours="23-5")
+	hours = [hour for hour in range(24) if warmer.in_window(datetime(2026, 1, 1, hour))]
+	assert hours == [0, 1, 2, 3, 4, 23]
+	with pytest.raises(ValueError):
+		parse_hours("2-25")
+
+
+def test_popular_queries_are_warmed_within_the_budget(server, store):
+	warm = Warm(server.url, {"python": 3, "java": 5, "go": 1})
+	warmer = CacheWarmer(warm=warm, store=store, top_n=10, budget=7)
+	summary = warmer.run_once()
+	# java is stopped by the budget, go does not fit into the rest of it
+	assert warm.warmed == ["python"]
+	assert summary["warmed"] == ["python"]
+	assert summary["skipped"] == ["java", "go"]
+	assert summary["failed"] == []
+	assert summary["requests"] == 7
+
+
+def test_failed_query_does_not_stop_the_run(server, store):
+	def warm(options: Dict, sources: Sequence[str]):
+		if options["text"] == "python":
+			raise ValueError("crawl failed")
+
+	summary = CacheWarmer(warm=warm, store=store, top_n=2).run_once()
+	assert summary["failed"] == ["python"] and summary["warmed"] == ["java"]
+
+
+def test_processes_sharing_a_backend_warm_once_a_day(server, store):
+	cache = CacheManager("warmer-test", backend=MemoryBackend())
+	started, resume = threading.Event(), threading.Event()
+	warm = Warm(server.url, {"python": 1, "java": 1, "go": 1})
+
+	def slow_warm(options: Dict, sources: Sequence[str]):
+		started.set()
+		resume.wait(10)
+		warm(options, sources)
+
+	first = CacheWarmer(warm=slow_warm, store=store, top_n=1, cache=cache)
+	second = CacheWarmer(warm=warm, store=store, top_n=1, cache=cache)
+	thread = threading.Thread(target=first.run_daily, args=("2026-10-19",))
+	thread.start()
+	try:
+		assert started.wait(10)
+		# The run of another process holds the lock
+		assert second.run_daily("2026-10-19") is None
+	finally:
+		resume.set()
+		thread.join()
+	assert warm.warmed == ["python"]
+	assert first.last_run["warmed"] == ["python"]
+
+	# The day is marked as warmed
+	assert second.run_daily("2026-10-19") is None
+	assert warm.warmed == ["python"]
+	assert second.run_daily("2026-10-20")["warmed"] == ["python"]
+	assert warm.warmed == ["python", "python"]